@@ -2,7 +2,8 @@
 from django.contrib import admin
 from .models import (
     School, Department, Course, Student, Lecturer, Unit, NominalRoll,
-    Response, LecturerUnit, Result, Complaint, System_User, AcademicYear, PasswordResetToken
+    Response, LecturerUnit, Result, Complaint, System_User, AcademicYear, PasswordResetToken, UploadJob,
+    ComplaintCounter, OutboxMessage, OverdueDigest
 )
 
 @admin.register(School)
@@ -12,7 +13,7 @@ class SchoolAdmin(admin.ModelAdmin):
 
 @admin.register(Department)
 class DepartmentAdmin(admin.ModelAdmin):
-    list_display = ('dep_code', 'dep_name', 'school_code')
+    list_display = ('dep_code', 'dep_name', 'school_code', 'complaint_sla_hours')
     list_filter = ('school_code',)
     search_fields = ('dep_name', 'dep_code')
 
@@ -88,3 +89,27 @@ class PasswordResetTokenAdmin(admin.ModelAdmin):
     list_display = ('username', 'token', 'created_at')
     list_filter = ('username',)
     search_fields = ('username', 'token', 'created_at')
+
+@admin.register(UploadJob)
+class UploadJobAdmin(admin.ModelAdmin):
+    list_display = ('job_id', 'kind', 'lec_no', 'status', 'attempts', 'processed', 'inserted', 'updated', 'rejected', 'created_at')
+    list_filter = ('kind', 'status')
+    search_fields = ('job_id', 'lec_no__lec_no')
+
+@admin.register(ComplaintCounter)
+class ComplaintCounterAdmin(admin.ModelAdmin):
+    list_display = ('dep_code', 'unit_code', 'academic_year', 'open_complaints', 'overdue_complaints')
+    list_filter = ('dep_code', 'academic_year')
+    search_fields = ('unit_code__unit_code',)
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ('message_id', 'subject', 'to_email', 'status', 'attempts', 'next_attempt_at', 'expires_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('to_email', 'subject')
+
+@admin.register(OverdueDigest)
+class OverdueDigestAdmin(admin.ModelAdmin):
+    list_display = ('lec_no', 'digest_date', 'complaint_count', 'message', 'created_at')
+    list_filter = ('digest_date',)
+    search_fields = ('lec_no__lec_no', 'lec_no__email_address')
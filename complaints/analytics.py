@@ -0,0 +1,224 @@
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db.models import Aggregate, Func, IntegerField, TextField
+
+from .grades import grade_bands
+from .models import Result, Unit
+
+VERSION_KEY = 'analytics:version'
+
+# Totals run 0-100 (CAT out of 30, exam out of 70); the last bin also takes 100
+HISTOGRAM_BIN_WIDTH = 10
+HISTOGRAM_BINS = 10
+HISTOGRAM_LABELS = [
+    f'{start}-{start + HISTOGRAM_BIN_WIDTH - 1}' for start in range(0, 90, HISTOGRAM_BIN_WIDTH)
+] + ['90-100']
+
+# Why a result is listed for review, in the order the template shows them
+FLAGS = {
+    'zero': 'Recorded 0',
+    'exam_missing': 'Exam missing, CAT present',
+    'cat_missing': 'CAT missing, exam present',
+    'outlier': 'Far from unit mean',
+}
+
+
+def analytics_version():
+    # Bumped whenever results are uploaded or edited; part of every cache key. It lives in the shared
+    # cache so an upload finished by the worker reaches every web process's local copy
+    return caches['shared'].get_or_set(VERSION_KEY, 1, None)
+
+
+def invalidate_analytics():
+    try:
+        caches['shared'].incr(VERSION_KEY)
+    except ValueError:
+        caches['shared'].set(VERSION_KEY, 1, None)
+
+
+class MissingAsMinusOne(Func):
+    # A mark column with NULL written as -1, which no real mark can be
+    function = 'COALESCE'
+    template = '%(function)s(%(expressions)s, -1)'
+    output_field = IntegerField()
+
+
+class PackedColumn(Aggregate):
+    """
+    Every value of an integer column in a group, as one comma-separated
+    string. A unit's marks then leave the database as a few values, which
+    NumPy parses in C, instead of one Python tuple per result. Several of
+    these in one query stay aligned: each row of the group feeds all of them.
+    """
+    function = 'GROUP_CONCAT'
+    output_field = TextField()
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection, function='STRING_AGG', template="%(function)s(%(expressions)s::text, ',')", **extra_context
+        )
+
+
+def unpack(column):
+    return np.fromstring(column, dtype=np.int64, sep=',')
+
+
+def scope_units(dep_code=None, school_code=None):
+    # One department's units, or every unit in a school (faculty)
+    if dep_code:
+        return Unit.objects.filter(dep_code=dep_code).values('unit_code')
+    return Unit.objects.filter(dep_code__school_code=school_code).values('unit_code')
+
+
+def load_marks(academic_year, dep_code=None, school_code=None):
+    """
+    Results on the department's (or school's) units in one academic year,
+    from a single query grouped by unit that result_year_unit_marks_idx
+    answers on its own. Returns the unit codes, the number of results on
+    each, and the pk, CAT and exam of every result as arrays ordered by unit;
+    a missing mark is NaN.
+    """
+    groups = Result.objects.filter(
+        academic_year=academic_year, unit_code__in=scope_units(dep_code, school_code)
+    ).values('unit_code').annotate(
+        pks=PackedColumn('pk'), cats=PackedColumn(MissingAsMinusOne('cat')), exams=PackedColumn(MissingAsMinusOne('exam'))
+    ).order_by('unit_code').values_list('unit_code', 'pks', 'cats', 'exams')
+
+    codes, units = [], []
+    for unit_code, *columns in groups:
+        codes.append(unit_code)
+        units.append([unpack(column) for column in columns])
+    if not codes:
+        return [], np.array([], dtype=np.intp), np.array([], dtype=np.int64), np.array([]), np.array([])
+
+    counts = np.array([len(unit_pks) for unit_pks, _, _ in units], dtype=np.intp)
+    pks, cat, exam = (np.concatenate(column) for column in zip(*units))
+    cat, exam = cat.astype(float), exam.astype(float)
+    cat[cat < 0] = np.nan
+    exam[exam < 0] = np.nan
+    return codes, counts, pks, cat, exam
+
+
+def group_median(values, groups, counts):
+    # Sort by group then value; each group's median sits in the middle of its run
+    order = np.lexsort((values, groups))
+    ordered = values[order]
+    starts = np.cumsum(counts) - counts
+    low = ordered[starts + (counts - 1) // 2]
+    high = ordered[starts + counts // 2]
+    return (low + high) / 2, ordered[starts], ordered[starts + counts - 1], order
+
+
+def group_histogram(bins, groups, units, width):
+    # One bincount over (group, bin) pairs, reshaped to a row of `width` counts per unit
+    return np.bincount(groups * width + bins, minlength=units * width).reshape(units, width)
+
+
+def unit_statistics(codes, counts, pks, cat, exam):
+    """
+    Per-unit statistics on result totals (CAT + exam, a missing mark counted
+    as 0 as in grades.RESULT_TOTAL) from load_marks' arrays, computed over all
+    units at once: each statistic is a bincount or a gather over the rows
+    sorted by unit, so the cost grows with the number of marks, not the
+    number of units.
+    """
+    units = len(codes)
+    groups = np.repeat(np.arange(units), counts)
+    cat_recorded, exam_recorded = ~np.isnan(cat), ~np.isnan(exam)
+    total = np.nan_to_num(cat) + np.nan_to_num(exam)
+
+    mean = np.bincount(groups, weights=total, minlength=units) / counts
+    deviation = total - mean[groups]
+    std = np.sqrt(np.bincount(groups, weights=deviation ** 2, minlength=units) / counts)
+    median, lowest, highest, order = group_median(total, groups, counts)
+    cat_counts = np.bincount(groups, weights=cat_recorded, minlength=units)
+    exam_counts = np.bincount(groups, weights=exam_recorded, minlength=units)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cat_mean = np.bincount(groups, weights=np.nan_to_num(cat), minlength=units) / cat_counts
+        exam_mean = np.bincount(groups, weights=np.nan_to_num(exam), minlength=units) / exam_counts
+
+    pass_mark = getattr(settings, 'RESULT_PASS_MARK', 40)
+    passed = np.bincount(groups, weights=total >= pass_mark, minlength=units)
+
+    bins = np.minimum(total // HISTOGRAM_BIN_WIDTH, HISTOGRAM_BINS - 1).astype(np.intp)
+    histogram = group_histogram(bins, groups, units, HISTOGRAM_BINS)
+
+    # Bands lowest first for searchsorted; the lowest band also takes anything below its floor
+    bands = grade_bands()[::-1]
+    floors = np.array([lowest for _, lowest in bands])
+    band = np.maximum(np.searchsorted(floors, total, side='right') - 1, 0)
+    grades = group_histogram(band, groups, units, len(bands))[:, ::-1]
+
+    flags = {
+        'zero': (cat == 0) | (exam == 0),
+        'exam_missing': cat_recorded & ~exam_recorded,
+        'cat_missing': exam_recorded & ~cat_recorded,
+        'outlier': (std[groups] > 0) & (np.abs(deviation) > getattr(settings, 'ANALYTICS_OUTLIER_Z', 3) * std[groups]),
+    }
+    flag_counts = {name: np.bincount(groups, weights=flag, minlength=units) for name, flag in flags.items()}
+
+    statistics = []
+    for index, code in enumerate(codes):
+        count = int(counts[index])
+        statistics.append({
+            'unit_code': code,
+            'count': count,
+            'mean': float(mean[index]),
+            'median': float(median[index]),
+            'std': float(std[index]),
+            'min': int(lowest[index]),
+            'max': int(highest[index]),
+            'cat_mean': None if np.isnan(cat_mean[index]) else float(cat_mean[index]),
+            'exam_mean': None if np.isnan(exam_mean[index]) else float(exam_mean[index]),
+            'pass_rate': float(passed[index] / count * 100),
+            'histogram': histogram[index].tolist(),
+            'grades': grades[index].tolist(),
+            'flags': [int(per_unit[index]) for per_unit in flag_counts.values()],
+        })
+
+    # Flagged results grouped by unit, lowest total first, capped so the page stays small;
+    # result_analytics adds their registration numbers
+    flagged = np.zeros(len(total), dtype=bool)
+    for flag in flags.values():
+        flagged |= flag
+    limit = getattr(settings, 'ANALYTICS_FLAGGED_ROWS', 200)
+    rows = []
+    for row in order[flagged[order]][:limit].tolist():
+        rows.append({
+            'pk': int(pks[row]),
+            'unit_code': codes[groups[row]],
+            'cat': None if np.isnan(cat[row]) else int(cat[row]),
+            'exam': None if np.isnan(exam[row]) else int(exam[row]),
+            'total': int(total[row]),
+            'reasons': [FLAGS[name] for name, flag in flags.items() if flag[row]],
+        })
+
+    return {
+        'units': statistics,
+        'result_count': int(len(total)),
+        'flagged': rows,
+        'flagged_count': int(flagged.sum()),
+    }
+
+
+def result_analytics(academic_year, dep_code=None, school_code=None):
+    """
+    unit_statistics for a department's, or with only `school_code` a whole
+    school's, results in one academic year. Cached in this process until the
+    next result upload or edit bumps the analytics version, and for at most
+    ANALYTICS_CACHE_TTL seconds in case the shared version was evicted and
+    restarted.
+    """
+    scope = f'dep:{dep_code}' if dep_code else f'school:{school_code}'
+    key = f'analytics:{analytics_version()}:{scope}:{academic_year}'
+    analytics = cache.get(key)
+    if analytics is None:
+        analytics = unit_statistics(*load_marks(academic_year, dep_code, school_code))
+        reg_nos = dict(Result.objects.filter(
+            pk__in=[row['pk'] for row in analytics['flagged']]
+        ).values_list('pk', 'reg_no'))
+        for row in analytics['flagged']:
+            row['reg_no'] = reg_nos.get(row['pk'])
+        cache.set(key, analytics, getattr(settings, 'ANALYTICS_CACHE_TTL', None))
+    return analytics
@@ -0,0 +1,81 @@
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import setup_databases, teardown_databases
+
+from .models import AcademicYear, Course, Department, School, Student, Unit
+
+
+@contextmanager
+def scratch_database():
+    """
+    Point the default database, and any test mirror of it such as the
+    replica, at a freshly migrated database for the length of a benchmark,
+    the way the test runner does, so the code being measured runs unchanged.
+    On SQLite the database is a file in a temporary directory rather than
+    in memory, so threads get their own connections as in production.
+    """
+    names = {alias: connections[alias].settings_dict['NAME'] for alias in connections}
+    test_settings = connections[DEFAULT_DB_ALIAS].settings_dict['TEST']
+    test_name = test_settings['NAME']
+    directory = tempfile.mkdtemp(prefix='benchmark-')
+    if connections[DEFAULT_DB_ALIAS].vendor == 'sqlite':
+        test_settings['NAME'] = os.path.join(directory, 'benchmark.sqlite3')
+    try:
+        old_config = setup_databases(verbosity=0, interactive=False, aliases={DEFAULT_DB_ALIAS}, serialized_aliases=set())
+        try:
+            yield
+        finally:
+            connections.close_all()
+            teardown_databases(old_config, verbosity=0)
+    finally:
+        test_settings['NAME'] = test_name
+        for alias, name in names.items():
+            connections[alias].settings_dict['NAME'] = name
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def seed_students(count, course, start=0):
+    # Students numbered from `start`, so several calls can seed several courses
+    return Student.objects.bulk_create([
+        Student(
+            reg_no=f'COM/B/01-{number:05d}/2023', username=f'student{number}', first_name='Jane', last_name='Roe',
+            email_address=f'student{number}@mmust.ac.ke', phone_number='0712345678', course_code=course
+        )
+        for number in range(start, start + count)
+    ], batch_size=1000)
+
+
+def seed_department(dep_code='CS', units=1, courses=1):
+    """
+    A department with `courses` courses, `units` units and one academic year.
+    Returns (department, courses, units, academic year).
+    """
+    [school] = School.objects.bulk_create([School(school_code=f'S{dep_code}', school_name='Science')])
+    [department] = Department.objects.bulk_create([
+        Department(dep_code=dep_code, dep_name=f'Department {dep_code}', school_code=school)
+    ])
+    course_rows = Course.objects.bulk_create([
+        Course(course_code=f'{dep_code}{number:03d}', course_name=f'Course {number}', dep_code=department)
+        for number in range(courses)
+    ])
+    unit_rows = Unit.objects.bulk_create([
+        Unit(unit_code=f'{dep_code}U{number:03d}', unit_name=f'Unit {number}', dep_code=department)
+        for number in range(units)
+    ])
+    [year] = AcademicYear.objects.bulk_create([AcademicYear(academic_year='2023/2024')])
+    return department, course_rows, unit_rows, year
+
+
+def timed(function, repeat=1):
+    # Median wall time of `repeat` calls, in milliseconds, and the last call's return value
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        value = function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return sorted(timings)[len(timings) // 2], value
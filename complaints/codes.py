@@ -0,0 +1,123 @@
+import functools
+import hashlib
+import hmac
+import string
+import threading
+
+from django.conf import settings
+from django.db.models import F
+
+from .db import write_transaction
+from .models import CodeSequence
+
+LETTERS = 3
+DIGITS = 3
+FEISTEL_ROUNDS = 6
+
+
+class CodeAllocator:
+    """
+    Hands out sequence numbers from a block reserved in the CodeSequence table,
+    so a process touches the database once per CODE_BLOCK_SIZE codes instead of
+    once per code. Numbers left in a block when the process exits are skipped,
+    never reused.
+
+    A reservation commits on its own: inside a caller's transaction a
+    rollback would return the block to CodeSequence while this process kept
+    handing it out, and the next process would issue the same codes. Take
+    codes before entering atomic(); reserve() raises RuntimeError otherwise.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.next = 0
+        self.end = 0
+        self._lock = threading.Lock()
+
+    def reserve(self, size):
+        # durable: refuses to run nested in another atomic block, so the bump is committed when this returns.
+        # get_or_create reads before the UPDATE writes, hence a write_transaction
+        with write_transaction(durable=True):
+            CodeSequence.objects.get_or_create(name=self.name)
+            # The UPDATE locks the row until commit, so concurrent reservations get disjoint blocks
+            CodeSequence.objects.filter(name=self.name).update(next_value=F('next_value') + size)
+            end = CodeSequence.objects.values_list('next_value', flat=True).get(name=self.name)
+        return end - size, end
+
+    def take(self):
+        with self._lock:
+            if self.next >= self.end:
+                self.next, self.end = self.reserve(getattr(settings, 'CODE_BLOCK_SIZE', 100))
+            value = self.next
+            self.next += 1
+            return value
+
+
+def tier_of(number):
+    """
+    Split a sequence number into (extra digits, offset). The first 26^3 * 10^3
+    numbers are plain ABC123 codes; after that each tier adds one digit.
+    """
+    extra = 0
+    capacity = 26 ** LETTERS * 10 ** DIGITS
+    while number >= capacity:
+        number -= capacity
+        extra += 1
+        capacity *= 10
+    return extra, number
+
+
+def round_value(key, round_number, half):
+    digest = hashlib.blake2b(half.to_bytes(8, 'big'), digest_size=8, key=key, person=bytes([round_number])).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def permute(key, letters, number, digits):
+    """
+    Keyed bijection on (letters, number) pairs, letters in range(26^3) and
+    number in range(10^digits). Each round of this unbalanced Feistel network
+    adds a keyed hash of one half to the other, modulo that half's size, so
+    every output is a valid code and no cycle-walking is needed.
+    """
+    letter_space, number_space = 26 ** LETTERS, 10 ** digits
+    for round_number in range(FEISTEL_ROUNDS):
+        if round_number % 2 == 0:
+            letters = (letters + round_value(key, round_number, number)) % letter_space
+        else:
+            number = (number + round_value(key, round_number, letters)) % number_space
+    return letters, number
+
+
+def format_code(letters, number, digits):
+    prefix = ''
+    for _ in range(LETTERS):
+        letters, index = divmod(letters, 26)
+        prefix = string.ascii_uppercase[index] + prefix
+    return f'{prefix}{number:0{digits}d}'
+
+
+@functools.lru_cache(maxsize=None)
+def series_key(name, digits):
+    # Each series and code width gets its own permutation, derived from SECRET_KEY
+    return hmac.new(settings.SECRET_KEY.encode(), f'complaints.codes:{name}:{digits}'.encode(), hashlib.sha256).digest()
+
+
+def code_for(name, number):
+    # Deterministic: the same sequence number always maps to the same code
+    extra, offset = tier_of(number)
+    digits = DIGITS + extra
+    letters, number = divmod(offset, 10 ** digits)
+    letters, number = permute(series_key(name, digits), letters, number, digits)
+    return format_code(letters, number, digits)
+
+
+allocators = {name: CodeAllocator(name) for name in ('complaint', 'response')}
+
+
+def next_code(name):
+    """
+    Next unused code for `name` ('complaint' or 'response'), e.g. 'QXD481'.
+    Distinct sequence numbers always give distinct codes, so no lookup is
+    needed to rule out a clash with a code this generator issued before.
+    """
+    return code_for(name, allocators[name].take())
@@ -0,0 +1,104 @@
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from . import refdata
+from .db import write_lock
+from .dashboard import invalidate_dashboards
+from .models import ComplaintCounter, Complaint, Response
+
+# Counter column for each Response.response choice
+RESPONSE_FIELDS = {
+    'No Result': 'no_result_responses',
+    'No CAT Mark': 'no_cat_mark_responses',
+    'No Exam Mark': 'no_exam_mark_responses',
+    'Result Loaded': 'result_loaded_responses',
+}
+
+
+def was_counted_overdue(complaint, counter):
+    # Overdue counts only grow in rebuild_counters, so only complaints posted and overdue by then were counted
+    counted_at = counter.overdue_counted_at
+    return counted_at is not None and complaint.created_at < counted_at and complaint.due_at < counted_at
+
+
+def student_department(student):
+    return refdata.courses.get(student.course_code_id).dep_code_id
+
+
+def counter_for(complaint):
+    # The counter row of the complaint's student department, unit and academic year
+    counter, _ = ComplaintCounter.objects.get_or_create(
+        dep_code_id=student_department(complaint.reg_no),
+        unit_code_id=complaint.unit_code_id,
+        academic_year_id=complaint.academic_year_id,
+    )
+    return counter
+
+
+def adjust(complaint, counter=None, **deltas):
+    """
+    Apply `deltas` to the complaint's counter row. Call inside the transaction
+    that changes the complaint so the counters commit or roll back with it.
+    """
+    counter = counter or counter_for(complaint)
+    ComplaintCounter.objects.filter(pk=counter.pk).update(
+        **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+
+
+def complaint_posted(complaint):
+    adjust(complaint, open_complaints=1)
+
+
+def complaint_answered(complaint, response):
+    counter = counter_for(complaint)
+    deltas = {'open_complaints': -1, RESPONSE_FIELDS[response.response]: 1}
+    if was_counted_overdue(complaint, counter):
+        deltas['overdue_complaints'] = -1
+    adjust(complaint, counter, **deltas)
+
+
+def rebuild_counters():
+    """
+    Recompute every counter from the complaint and response tables. Also the
+    only place overdue counts grow, since complaints become overdue with time
+    rather than through a write. The tables are read in the write_lock
+    transaction that replaces the counters, so the counts and the rows written
+    come from one transaction; on SQLite a complaint posted or answered
+    meanwhile waits for the rebuild instead of being overwritten by it.
+    """
+    counters = {}
+
+    with write_lock():
+        now = timezone.now()
+
+        def counter(dep_code, unit_code, academic_year):
+            key = (dep_code, unit_code, academic_year)
+            if key not in counters:
+                counters[key] = ComplaintCounter(
+                    dep_code_id=dep_code, unit_code_id=unit_code, academic_year_id=academic_year, overdue_counted_at=now
+                )
+            return counters[key]
+
+        complaints = Complaint.objects.values(
+            'reg_no__course_code__dep_code', 'unit_code', 'academic_year'
+        ).annotate(
+            open_complaints=Count('pk'),
+            overdue_complaints=Count('pk', filter=Q(due_at__lt=now)),
+        ).order_by()
+        for row in complaints:
+            entry = counter(row['reg_no__course_code__dep_code'], row['unit_code'], row['academic_year'])
+            entry.open_complaints = row['open_complaints']
+            entry.overdue_complaints = row['overdue_complaints']
+
+        responses = Response.objects.values(
+            'reg_no__course_code__dep_code', 'unit_code', 'academic_year', 'response'
+        ).annotate(total=Count('pk')).order_by()
+        for row in responses:
+            entry = counter(row['reg_no__course_code__dep_code'], row['unit_code'], row['academic_year'])
+            setattr(entry, RESPONSE_FIELDS[row['response']], row['total'])
+
+        ComplaintCounter.objects.all().delete()
+        ComplaintCounter.objects.bulk_create(counters.values(), batch_size=500)
+    invalidate_dashboards()
+    return len(counters)
@@ -0,0 +1,167 @@
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db.models import Exists, F, FilteredRelation, IntegerField, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from . import refdata
+from .models import Department, Student, Lecturer, LecturerUnit, Complaint, ComplaintCounter
+
+VERSION_KEY = 'dashboard:version'
+
+
+class SubqueryCount(Subquery):
+    # COUNT(*) over an arbitrary correlated queryset, usable as an annotation
+    template = '(SELECT COUNT(*) FROM (%(subquery)s) _count)'
+    output_field = IntegerField()
+
+
+def counter_total(field):
+    # Sum of one ComplaintCounter column over the department's rows, 0 when it has none
+    totals = ComplaintCounter.objects.filter(dep_code=OuterRef('pk')).values('dep_code').annotate(
+        total=Sum(field)
+    ).values('total')
+    return Coalesce(Subquery(totals, output_field=IntegerField()), 0)
+
+
+def dashboard_version():
+    # Bumped whenever complaints, responses or unit assignments change; part of every cache key. It lives
+    # in the shared cache so a change made by another process (e.g. the upload worker) reaches this one
+    return caches['shared'].get_or_set(VERSION_KEY, 1, None)
+
+
+def invalidate_dashboards():
+    try:
+        caches['shared'].incr(VERSION_KEY)
+    except ValueError:
+        caches['shared'].set(VERSION_KEY, 1, None)
+
+
+def lecturer_complaints(lecturer):
+    """
+    Complaints the lecturer is assigned to answer: one LecturerUnit row must
+    match the complaint's unit, academic year and the student's course
+    together, rather than each column matching some assignment separately.
+    """
+    assignments = LecturerUnit.objects.filter(lec_no=lecturer)
+    return Complaint.objects.filter(
+        # Lets the database seek complaint_unit_year_date_idx instead of scanning every complaint
+        unit_code__in=assignments.values('unit_code'),
+    ).filter(Exists(
+        assignments.filter(
+            unit_code=OuterRef('unit_code'),
+            academic_year=OuterRef('academic_year'),
+            course_code=OuterRef('reg_no__course_code'),
+        )
+    ))
+
+
+# Columns of an overdue complaint row and of each lecturer paired with it
+OVERDUE_COMPLAINT_FIELDS = {
+    'complaint_code': 'complaint_code',
+    'unit_code': 'unit_code',
+    'reg_no': 'reg_no',
+    'course_code': 'reg_no__course_code',
+    'dep_code': 'dep_code',
+    'academic_year': 'academic_year__academic_year',
+    'due_at': 'due_at',
+}
+OVERDUE_LECTURER_FIELDS = {
+    'lec_no': 'assignment__lec_no',
+    'first_name': 'assignment__lec_no__first_name',
+    'last_name': 'assignment__lec_no__last_name',
+    'email_address': 'assignment__lec_no__email_address',
+    'phone_number': 'assignment__lec_no__phone_number',
+}
+
+
+def with_assignments(complaints):
+    """
+    Annotate complaints with an `assignment` relation: a LEFT JOIN to the
+    LecturerUnit rows matching the complaint's unit, academic year and the
+    student's course together, as in lecturer_complaints.
+    """
+    return complaints.filter(
+        # Joins Student ahead of the assignment join, whose ON clause reads the student's course
+        reg_no__course_code__isnull=False,
+    ).annotate(assignment=FilteredRelation(
+        'unit_code__lecturerunit',
+        condition=Q(
+            unit_code__lecturerunit__academic_year=F('academic_year'),
+            unit_code__lecturerunit__course_code=F('reg_no__course_code'),
+        ),
+    ))
+
+
+def complaints_with_lecturers(complaints):
+    """
+    Each complaint as a dict with a `lecturers` list of the lecturers
+    responsible for it (empty when nobody is assigned), read in one query.
+    `complaints` must come from with_assignments().
+    """
+    rows = complaints.values_list(
+        *OVERDUE_COMPLAINT_FIELDS.values(), *OVERDUE_LECTURER_FIELDS.values()
+    ).order_by('due_at', 'complaint_code', 'assignment__lec_no')
+    paired = {}
+    split = len(OVERDUE_COMPLAINT_FIELDS)
+    for values in rows:
+        complaint = paired.get(values[0])
+        if complaint is None:
+            complaint = paired[values[0]] = dict(zip(OVERDUE_COMPLAINT_FIELDS, values[:split]), lecturers=[])
+        lecturer = dict(zip(OVERDUE_LECTURER_FIELDS, values[split:]))
+        if lecturer['lec_no'] is not None:
+            complaint['lecturers'].append(lecturer)
+    return list(paired.values())
+
+
+def department_stats(dep_code, version):
+    key = f'dashboard:{version}:department:{dep_code}'
+    stats = cache.get(key)
+    if stats is None:
+        # All department-wide counts in a single query
+        stats = Department.objects.filter(pk=dep_code).annotate(
+            total_students=SubqueryCount(
+                Student.objects.filter(course_code__dep_code=OuterRef('pk')).values('pk')
+            ),
+            total_lecturers_in_department=SubqueryCount(
+                Lecturer.objects.filter(dep_code=OuterRef('pk')).values('pk')
+            ),
+            department_open_complaints=counter_total('open_complaints'),
+        ).values(
+            'total_students', 'total_lecturers_in_department', 'department_open_complaints'
+        ).get()
+        cache.set(key, stats, settings.DASHBOARD_DEPARTMENT_CACHE_TTL)
+    # Complaints turn overdue with time rather than through a write, so this count is never cached;
+    # it is an index-only range scan on complaint_dep_due_idx
+    stats = dict(stats, department_overdue_complaints=Complaint.objects.overdue().filter(dep_code=dep_code).count())
+    return stats
+
+
+def lecturer_stats(lecturer, version):
+    key = f'dashboard:{version}:lecturer:{lecturer.lec_no}'
+    stats = cache.get(key)
+    if stats is None:
+        unit_codes = list(LecturerUnit.objects.filter(lec_no=lecturer).values_list('unit_code', flat=True))
+        stats = {
+            'total_units_for_lecturer': len(unit_codes),
+            'related_complaints_count': lecturer_complaints(lecturer).count(),
+            'unit_codes': unit_codes,
+        }
+        cache.set(key, stats, settings.DASHBOARD_LECTURER_CACHE_TTL)
+    return stats
+
+
+def dashboard_context(lecturer):
+    """
+    Counts and lists shared by the lecturer, exam officer and COD dashboards.
+    A cold cache costs four queries; a warm one only the overdue count. Both
+    also read the dashboard version from the shared cache, once.
+    """
+    version = dashboard_version()
+    context = dict(department_stats(lecturer.dep_code_id, version))
+    stats = lecturer_stats(lecturer, version)
+    context['total_units_for_lecturer'] = stats['total_units_for_lecturer']
+    context['related_complaints_count'] = stats['related_complaints_count']
+    context['units'] = [refdata.units.get(code) for code in stats['unit_codes']]
+    context['courses'] = [course for course in refdata.courses.all() if course.dep_code_id == lecturer.dep_code_id]
+    context['department_name'] = refdata.departments.get(lecturer.dep_code_id).dep_name
+    return context
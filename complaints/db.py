@@ -0,0 +1,94 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+# One lock per database alias; bulk writers in this process (e.g. the threads of process_uploads) queue on it
+_write_locks = {}
+_write_locks_guard = threading.Lock()
+
+# Key of the PostgreSQL advisory lock that bulk writers in different processes queue on
+WRITE_LOCK_KEY = 0x636f6d70
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """
+    connection_created receiver: applies SQLITE_PRAGMAS to each new SQLite
+    connection and lets write_transaction open its transaction with
+    SQLITE_TRANSACTION_MODE. Every other transaction keeps Django's plain
+    BEGIN.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+            cursor.execute(f'PRAGMA {pragma} = {value}')
+
+    # Django 4.2 always issues a plain BEGIN (5.1 takes OPTIONS['transaction_mode'], for every transaction).
+    # Wrapped once per connection object, which outlives reconnects
+    if '_start_transaction_under_autocommit' not in vars(connection):
+        begin = connection._start_transaction_under_autocommit
+
+        def start_transaction():
+            mode = getattr(settings, 'SQLITE_TRANSACTION_MODE', None)
+            if mode and getattr(connection, 'begin_write_transaction', False):
+                connection.cursor().execute(f'BEGIN {mode}')
+            else:
+                begin()
+
+        connection._start_transaction_under_autocommit = start_transaction
+
+
+@contextmanager
+def write_transaction(using=None, durable=False):
+    """
+    atomic() for a transaction that reads before it writes. On SQLite it
+    starts with BEGIN SQLITE_TRANSACTION_MODE and so takes the write lock
+    up front, waiting busy_timeout for it. Under a plain BEGIN the first
+    read takes a shared lock that cannot be upgraded once another
+    connection has written, and the write fails at once with "database is
+    locked". Nested inside another atomic block it is a plain savepoint.
+    """
+    connection = connections[using or DEFAULT_DB_ALIAS]
+    connection.begin_write_transaction = True
+    try:
+        with transaction.atomic(using=using, durable=durable):
+            connection.begin_write_transaction = False
+            yield
+    finally:
+        connection.begin_write_transaction = False
+
+
+@contextmanager
+def write_lock(using=None):
+    """
+    A transaction for a long bulk write. Bulk writers in one process run one
+    at a time, and each waits BULK_WRITE_PAUSE seconds after committing
+    before the next may start, so short writes such as posting a complaint
+    (polling SQLite's busy handler) get the database lock in between rather
+    than queueing behind every chunk of every upload. Keep each block to one
+    chunk.
+
+    Across processes the database does the queueing. On SQLite the
+    transaction is a write_transaction, so a bulk writer in another
+    process waits for the write lock up front, but only for busy_timeout:
+    past that it fails with "database is locked". On PostgreSQL the
+    transaction takes an advisory lock held until commit. Nested inside
+    another atomic block, only the in-process lock and the advisory lock
+    apply.
+    """
+    using = using or DEFAULT_DB_ALIAS
+    connection = connections[using]
+    with _write_locks_guard:
+        lock = _write_locks.setdefault(using, threading.Lock())
+    with lock:
+        try:
+            with write_transaction(using):
+                if connection.vendor == 'postgresql':
+                    with connection.cursor() as cursor:
+                        cursor.execute('SELECT pg_advisory_xact_lock(%s)', [WRITE_LOCK_KEY])
+                yield
+        finally:
+            time.sleep(getattr(settings, 'BULK_WRITE_PAUSE', 0.2))
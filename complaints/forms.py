@@ -1,11 +1,56 @@
 from django import forms
-import random
-import string
+from django.core.exceptions import ValidationError
+from django.forms.models import ModelChoiceIterator
+from . import refdata
+from .codes import next_code
 from .models import (
 School, Department, Course, Student, Lecturer, Unit, NominalRoll, PasswordResetToken,
 Response, LecturerUnit, Result, Complaint, System_User, AcademicYear
 )
 
+class ReferenceChoiceIterator(ModelChoiceIterator):
+    # Options come from the in-process reference cache rather than a query per render
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ("", self.field.empty_label)
+        for obj in self.field.choice_objects():
+            yield self.choice(obj)
+
+    def __len__(self):
+        return len(self.field.choice_objects()) + (1 if self.field.empty_label is not None else 0)
+
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(self.field.choice_objects())
+
+class ReferenceChoiceField(forms.ModelChoiceField):
+    """ModelChoiceField backed by a refdata.ReferenceTable for both rendering and validation."""
+    iterator = ReferenceChoiceIterator
+
+    def __init__(self, table, **kwargs):
+        self.table = table
+        # Optional set of pks the choices are narrowed to, see limit_to()
+        self.allowed = None
+        super().__init__(queryset=table.model.objects.all(), **kwargs)
+
+    def limit_to(self, pks):
+        self.allowed = set(pks)
+
+    def choice_objects(self):
+        if self.allowed is None:
+            return self.table.all()
+        return [obj for obj in self.table.all() if obj.pk in self.allowed]
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            obj = self.table.get(self.table.model._meta.pk.to_python(value))
+        except ValidationError:
+            obj = None
+        if obj is None or (self.allowed is not None and obj.pk not in self.allowed):
+            raise ValidationError(self.error_messages['invalid_choice'], code='invalid_choice', params={'value': value})
+        return obj
+
 class SignUpForm(forms.ModelForm):
     confirm_password = forms.CharField(
         widget=forms.PasswordInput(attrs={'placeholder': 'Confirm Password', 'class': 'form-control'})
@@ -63,20 +108,27 @@ class StudentRegNoForm(forms.Form):
         widget=forms.TextInput(attrs={'placeholder': 'Enter Registration Number'})
     )
 
+def student_units(student, academic_year=None):
+    # Codes of the units on the student's nominal roll, optionally for one academic year only
+    entries = NominalRoll.objects.filter(reg_no=student)
+    if academic_year:
+        entries = entries.filter(academic_year=academic_year)
+    return set(entries.values_list('unit_code', flat=True))
+
 class PostComplaintForm(forms.ModelForm):
     exam_date = forms.DateField(
         widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
         label="Exam Date"
     )
 
-    academic_year = forms.ModelChoiceField(
-        queryset=AcademicYear.objects.all(),
+    academic_year = ReferenceChoiceField(
+        refdata.academic_years,
         empty_label="Select Academic Year",
         widget=forms.Select(attrs={'class': 'form-control'}),
         label="Academic Year"
     )
-    unit_code = forms.ModelChoiceField(
-        queryset=Unit.objects.all(),  # Load all units
+    unit_code = ReferenceChoiceField(
+        refdata.units,
         empty_label="Select Unit",
         widget=forms.Select(attrs={'class': 'form-control'}),
         label="Unit Code"
@@ -97,13 +149,15 @@ class PostComplaintForm(forms.ModelForm):
         # Load `missing_mark` choices from model
         self.fields['missing_mark'].choices = Complaint._meta.get_field('missing_mark').choices
 
+        # Only offer units the student sat, for the chosen academic year once one is picked
+        if self.student is not None:
+            academic_year = self.data.get('academic_year') if self.is_bound else None
+            if academic_year and not str(academic_year).isdigit():
+                academic_year = None
+            self.fields['unit_code'].limit_to(student_units(self.student, academic_year))
+
     def generate_complaint_code(self):
-        while True:
-            letters = ''.join(random.choices(string.ascii_uppercase, k=3))
-            numbers = ''.join(random.choices(string.digits, k=3))
-            code = letters + numbers
-            if not Complaint.objects.filter(complaint_code=code).exists():
-                return code
+        return next_code('complaint')
 
     def save(self, commit=True):
         if not self.instance.complaint_code:
@@ -139,6 +193,13 @@ class ResponseForm(forms.ModelForm):
 class UploadFileForm(forms.Form):
     file = forms.FileField(label='Select a CSV or Excel file')
 
+class UploadResultForm(UploadFileForm):
+    replace_existing = forms.BooleanField(
+        required=False,
+        label='Replace existing marks',
+        help_text='Overwrite marks already on record instead of skipping them'
+    )
+
 
 class PasswordResetForm(forms.Form):
     username = forms.EmailField(
@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.db.models import Case, CharField, Func, IntegerField, Value, When
+
+
+class ZeroIfNull(Func):
+    # COALESCE(x, 0) with the 0 written into the SQL; Coalesce(x, 0) binds it as a parameter,
+    # and SQLite only uses an expression index when the query spells the expression the same way
+    function = 'COALESCE'
+    template = '%(function)s(%(expressions)s, 0)'
+    output_field = IntegerField()
+
+
+# CAT + exam, with a missing mark counted as 0. Result's total index is built on this exact expression,
+# so filters and orderings must use it (through Result.objects.with_totals()) for the index to apply
+RESULT_TOTAL = ZeroIfNull('cat') + ZeroIfNull('exam')
+
+
+def grade_bands():
+    # (grade, lowest total) pairs, best grade first
+    return sorted(settings.RESULT_GRADE_BANDS, key=lambda band: band[1], reverse=True)
+
+
+def grade_names():
+    return [grade for grade, _ in grade_bands()]
+
+
+def grade_for(total):
+    for grade, lowest in grade_bands():
+        if total >= lowest:
+            return grade
+    return grade_bands()[-1][0]
+
+
+def grade_case(total):
+    # The same banding as grade_for, in SQL; the lowest band catches everything below it too
+    bands = grade_bands()
+    return Case(
+        *[When(**{f'{total}__gte': lowest}, then=Value(grade)) for grade, lowest in bands[:-1]],
+        default=Value(bands[-1][0]),
+        output_field=CharField(),
+    )
+
+
+def grade_range(grade):
+    """
+    (lowest, highest exclusive) totals for `grade`, either end None when open,
+    so a grade filter is a range on the total index rather than a CASE test
+    on every row. None for an unknown grade.
+    """
+    bands = grade_bands()
+    for position, (name, lowest) in enumerate(bands):
+        if name == grade:
+            highest = bands[position - 1][1] if position else None
+            return (lowest if position < len(bands) - 1 else None), highest
+    return None
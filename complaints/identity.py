@@ -0,0 +1,72 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import router
+
+from .models import Lecturer
+
+SESSION_KEY = 'lecturer'
+
+# Lecturer columns copied into the session at login; enough for every view's filters and greetings
+FIELDS = ('lec_no', 'username', 'first_name', 'last_name', 'role', 'dep_code_id')
+
+
+def version_key(username):
+    return f'lecturer-identity:{username}'
+
+
+def identity_version(username):
+    # Counts saves of the lecturer row, in the cache every process shares; an evicted entry starts again
+    # at 0, which costs sessions holding a higher version one reload
+    return caches['shared'].get_or_set(version_key(username), 0, None)
+
+
+def invalidate_identity(username):
+    try:
+        caches['shared'].incr(version_key(username))
+    except ValueError:
+        caches['shared'].set(version_key(username), 1, None)
+
+
+def remember_lecturer(session, lecturer):
+    identity = {field: getattr(lecturer, field) for field in FIELDS}
+    identity['version'] = identity_version(lecturer.username)
+    identity['cached_at'] = time.time()
+    session[SESSION_KEY] = identity
+
+
+def identity_is_current(session, identity):
+    # Within the TTL the session copy is trusted without a round trip; past it, one read of the shared
+    # version decides between renewing the copy and reloading the lecturer
+    if time.time() - identity.get('cached_at', 0) <= getattr(settings, 'LECTURER_IDENTITY_TTL', 300):
+        return True
+    if identity.get('version') != identity_version(identity['username']):
+        return False
+    session[SESSION_KEY] = dict(identity, cached_at=time.time())
+    return True
+
+
+def session_lecturer(request):
+    """
+    The signed-in lecturer, built from the identity stored in the session at
+    login. Every LECTURER_IDENTITY_TTL seconds the copy is checked against
+    the version bumped by saves of the Lecturer row (role or department
+    change) and refreshed from the database if it has moved.
+    Returns None when nobody is signed in or the lecturer no longer exists.
+    """
+    username = request.session.get('username')
+    if not username:
+        return None
+
+    identity = request.session.get(SESSION_KEY)
+    if identity is None or identity.get('username') != username or not identity_is_current(request.session, identity):
+        lecturer = Lecturer.objects.filter(username=username).first()
+        if lecturer is None:
+            request.session.pop(SESSION_KEY, None)
+            return None
+        remember_lecturer(request.session, lecturer)
+        return lecturer
+
+    # Columns not in FIELDS are deferred and load on first access, like .only()
+    return Lecturer.from_db(router.db_for_read(Lecturer), FIELDS, [identity[field] for field in FIELDS])
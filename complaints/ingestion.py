@@ -0,0 +1,362 @@
+import codecs
+import csv
+import os
+
+import pandas as pd
+
+from . import refdata
+from .analytics import invalidate_analytics
+from .db import write_lock
+from .models import Student, LecturerUnit, NominalRoll, Result
+
+NOMINAL_ROLL_COLUMNS = ['unit_code', 'reg_no', 'academic_year']
+RESULT_COLUMNS = NOMINAL_ROLL_COLUMNS + ['cat', 'exam']
+
+# Inclusive bounds for each mark column, mirroring the Result model validators
+MARK_RANGES = {'cat': (0, 30), 'exam': (0, 70)}
+
+# SQLite caps the number of bound parameters per statement, so large IN lists are split
+IN_BATCH_SIZE = 500
+BULK_BATCH_SIZE = 500
+
+# Rows validated and written per transaction when streaming a sheet
+CHUNK_SIZE = 5000
+
+UPLOAD_EXTENSIONS = ('.csv', '.xls', '.xlsx')
+
+
+class UploadReport:
+    """Running summary of an upload: counts plus one entry per skipped row."""
+
+    def __init__(self):
+        self.processed = 0
+        self.inserted = 0
+        self.updated = 0
+        self.skipped = []
+        self.peak_memory = None
+        # (unit, reg_no, academic year) of every row kept so far, so duplicates are caught across chunks
+        self.seen_keys = set()
+
+    @property
+    def rejected(self):
+        return len(self.skipped)
+
+    def skip(self, row_number, reason, level='error'):
+        self.skipped.append({'row': row_number, 'level': level, 'reason': reason})
+
+
+class UploadReader:
+    """
+    Iterate over an uploaded CSV or Excel sheet as DataFrames of at most
+    `chunksize` rows, so memory is bounded by the chunk rather than the file.
+    The header row is read up front and exposed as `columns`.
+    """
+
+    def __init__(self, file, chunksize=CHUNK_SIZE):
+        self.chunksize = chunksize
+        name = file.name.lower()
+        if name.endswith('.csv'):
+            self._rows = self.csv_rows(file)
+        elif name.endswith('.xlsx'):
+            self._rows = self.xlsx_rows(file)
+        elif name.endswith('.xls'):
+            self._rows = self.xls_rows(file)
+        else:
+            raise ValueError("Invalid file format. Upload CSV or Excel file.")
+
+        header = next(self._rows, None) or []
+        self.columns = ['' if value is None else str(value).strip() for value in header]
+
+    @staticmethod
+    def csv_rows(file):
+        # Decode line by line; csv.reader stitches quoted multi-line cells back together
+        yield from csv.reader(codecs.iterdecode(file, 'utf-8-sig'))
+
+    @staticmethod
+    def xlsx_rows(file):
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(file, read_only=True, data_only=True)
+        try:
+            yield from workbook.active.iter_rows(values_only=True)
+        finally:
+            workbook.close()
+
+    @staticmethod
+    def xls_rows(file):
+        # openpyxl cannot read the legacy format, so .xls sheets are still loaded whole
+        df = pd.read_excel(file, dtype=str)
+        yield list(df.columns)
+        yield from df.itertuples(index=False, name=None)
+
+    def __iter__(self):
+        width = len(self.columns)
+        rows, index = [], []
+        for position, values in enumerate(self._rows):
+            values = list(values)[:width]
+            if all(value is None or str(value).strip() == '' for value in values):
+                continue
+            rows.append(values + [None] * (width - len(values)))
+            # Index by position so report row numbers match the sheet
+            index.append(position)
+            if len(rows) == self.chunksize:
+                yield pd.DataFrame(rows, columns=self.columns, index=index)
+                rows, index = [], []
+        if rows:
+            yield pd.DataFrame(rows, columns=self.columns, index=index)
+
+
+def in_batches(values, size=IN_BATCH_SIZE):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def normalise_frame(df, columns):
+    # Work on text columns only; blank cells become empty strings instead of NaN
+    df = df[columns].copy()
+    for column in columns:
+        df[column] = df[column].fillna('').astype(str).str.strip()
+    return df
+
+
+def existing_students(reg_nos):
+    found = set()
+    for batch in in_batches(set(reg_nos)):
+        found.update(Student.objects.filter(reg_no__in=batch).values_list('reg_no', flat=True))
+    return found
+
+
+def existing_units(unit_codes):
+    return refdata.units.present(unit_codes)
+
+
+def academic_year_ids(names):
+    years = {}
+    for name in set(names):
+        year = refdata.academic_years.get(name, 'academic_year')
+        if year is not None:
+            years[name] = year.year_id
+    return years
+
+
+def lecturer_assignments(lecturer, unit_codes):
+    return set(
+        LecturerUnit.objects.filter(lec_no=lecturer, unit_code__in=set(unit_codes))
+        .values_list('unit_code_id', 'academic_year_id')
+    )
+
+
+def row_number(index):
+    # Spreadsheet row as the uploader sees it: header is row 1
+    return int(index) + 2
+
+
+def apply_checks(df, checks, report, rejected=None):
+    # Each check is (mask, message template); the first failing check wins for a row
+    if rejected is None:
+        rejected = pd.Series(False, index=df.index)
+    for mask, template in checks:
+        failed = mask & ~rejected
+        for index, row in df[failed].iterrows():
+            report.skip(row_number(index), template.format(**row))
+        rejected |= failed
+    return rejected
+
+
+def resolve_rows(df, lecturer, report):
+    """
+    Check every row of a normalised frame against the reference tables in a
+    handful of queries. Returns the surviving rows with `year_id` filled in;
+    rejected rows are recorded on the report.
+    """
+    units = existing_units(df['unit_code'])
+    students = existing_students(df['reg_no'])
+    years = academic_year_ids(df['academic_year'])
+    assignments = lecturer_assignments(lecturer, units)
+
+    df = df.assign(year_id=df['academic_year'].map(years))
+    assigned = pd.Series(
+        [(unit, year) in assignments for unit, year in zip(df['unit_code'], df['year_id'])],
+        index=df.index, dtype=bool
+    )
+
+    # Checks run in the same order the per-row loop used, first failure wins
+    checks = [
+        (~df['unit_code'].isin(units), "Unit '{unit_code}' not found."),
+        (~df['reg_no'].isin(students), "Student '{reg_no}' not found."),
+        (df['year_id'].isna(), "Academic year '{academic_year}' not found."),
+        (~assigned, "You are not assigned to unit '{unit_code}' for {academic_year}."),
+    ]
+    rejected = apply_checks(df, checks, report)
+
+    df = df[~rejected]
+    return df.assign(year_id=df['year_id'].astype(int))
+
+
+def drop_file_duplicates(df, report, label):
+    keys = pd.Series(list(zip(*(df[column] for column in NOMINAL_ROLL_COLUMNS))), index=df.index, dtype=object)
+    duplicated = keys.duplicated(keep='first') | keys.map(report.seen_keys.__contains__).astype(bool)
+    report.seen_keys.update(keys[~duplicated])
+    for index, row in df[duplicated].iterrows():
+        report.skip(
+            row_number(index),
+            f"Duplicate {label} for {row['reg_no']} in {row['unit_code']} ({row['academic_year']}) further up the file.",
+            level='warning'
+        )
+    return df[~duplicated]
+
+
+def frame_rows(model, df):
+    # Rows of `model` for the units and academic years present in the frame
+    return model.objects.filter(unit_code_id__in=set(df['unit_code']), academic_year_id__in=set(df['year_id']))
+
+
+def existing_keys(model, df):
+    # One query over the (unit, year) pairs present in the frame, keyed like the unique constraints
+    rows = frame_rows(model, df).values_list('unit_code_id', 'reg_no_id', 'academic_year_id', 'pk')
+    return {(unit_code, reg_no, year_id): pk for unit_code, reg_no, year_id, pk in rows}
+
+
+def bulk_write(model, df, objs, **options):
+    """
+    bulk_create `objs` under write_lock and return the number of rows added,
+    counted rather than assumed: conflict handling drops or updates rows that
+    another upload inserted since existing_keys() read the table.
+    """
+    if not objs:
+        return 0
+    rows = frame_rows(model, df)
+    with write_lock():
+        before = rows.count()
+        model.objects.bulk_create(objs, batch_size=BULK_BATCH_SIZE, **options)
+        return rows.count() - before
+
+
+def ingest_nominal_roll(df, lecturer, report=None):
+    """
+    Load a nominal roll frame for `lecturer` with a fixed number of queries and
+    a single bulk insert. Pass an existing report to accumulate across chunks.
+    """
+    if report is None:
+        report = UploadReport()
+
+    df = normalise_frame(df, NOMINAL_ROLL_COLUMNS)
+    report.processed += len(df)
+
+    df = resolve_rows(df, lecturer, report)
+    df = drop_file_duplicates(df, report, 'entry')
+
+    existing = existing_keys(NominalRoll, df)
+    entries = []
+    for index, unit_code, reg_no, academic_year, year_id in df[NOMINAL_ROLL_COLUMNS + ['year_id']].itertuples():
+        if (unit_code, reg_no, year_id) in existing:
+            report.skip(
+                row_number(index),
+                f"Entry for {reg_no} in {unit_code} ({academic_year}) already exists.",
+                level='warning'
+            )
+            continue
+        entries.append(NominalRoll(unit_code_id=unit_code, reg_no_id=reg_no, academic_year_id=year_id))
+
+    # ignore_conflicts covers rows inserted by a concurrent upload since `existing` was read
+    report.inserted += bulk_write(NominalRoll, df, entries, ignore_conflicts=True)
+    report.skipped.sort(key=lambda entry: entry['row'])
+
+    return report
+
+
+def coerce_marks(df, report):
+    """
+    Turn the cat/exam text columns into integers column-wise, rejecting blanks,
+    non-numbers, fractions and out-of-range marks.
+    """
+    marks = df[['cat', 'exam']].apply(pd.to_numeric, errors='coerce')
+    not_whole = marks.isna().any(axis=1) | (marks % 1 != 0).any(axis=1)
+    checks = [(not_whole, "Invalid numeric value for CAT or exam in unit '{unit_code}'.")]
+    for column, (low, high) in MARK_RANGES.items():
+        label = 'CAT' if column == 'cat' else 'exam'
+        checks.append((
+            ~marks[column].between(low, high),
+            f"Invalid {label} mark ({{{column}}}) for student '{{reg_no}}' in '{{unit_code}}'. Should be between {low}-{high}."
+        ))
+    rejected = apply_checks(df, checks, report)
+
+    df = df[~rejected]
+    return df.assign(cat=marks.loc[df.index, 'cat'].astype(int), exam=marks.loc[df.index, 'exam'].astype(int))
+
+
+def ingest_results(df, lecturer, replace=False, report=None):
+    """
+    Load a result sheet for `lecturer`. Marks already on record are skipped with
+    a warning unless `replace` is set, in which case they are overwritten by the
+    same bulk upsert that inserts the new rows.
+    """
+    if report is None:
+        report = UploadReport()
+
+    df = normalise_frame(df, RESULT_COLUMNS)
+    report.processed += len(df)
+
+    df = resolve_rows(df, lecturer, report)
+    df = coerce_marks(df, report)
+    df = drop_file_duplicates(df, report, 'result')
+
+    existing = existing_keys(Result, df)
+    results = []
+    for index, unit_code, reg_no, academic_year, cat, exam, year_id in df[RESULT_COLUMNS + ['year_id']].itertuples():
+        if (unit_code, reg_no, year_id) in existing:
+            if not replace:
+                report.skip(
+                    row_number(index),
+                    f"Result for {reg_no} in {unit_code} ({academic_year}) already exists.",
+                    level='warning'
+                )
+                continue
+        results.append(Result(unit_code_id=unit_code, reg_no_id=reg_no, academic_year_id=year_id, cat=cat, exam=exam))
+
+    # Upsert keyed on unique_result_per_unit_student_year; bulk_create skips Result.clean(),
+    # which the column checks above replace
+    if replace:
+        inserted = bulk_write(
+            Result, df, results, update_conflicts=True,
+            unique_fields=['unit_code', 'reg_no', 'academic_year'], update_fields=['cat', 'exam']
+        )
+        # Every row not inserted overwrote one already on record
+        report.updated += len(results) - inserted
+    else:
+        inserted = bulk_write(Result, df, results, ignore_conflicts=True)
+    # bulk_create sends no post_save signals, so the cached unit analytics are dropped here
+    invalidate_analytics()
+    report.inserted += inserted
+    report.skipped.sort(key=lambda entry: entry['row'])
+
+    return report
+
+
+def resident_memory():
+    # Current resident set size of the worker; only available where /proc exists
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def ingest_upload(reader, ingest, *args, on_chunk=None, **kwargs):
+    """
+    Feed each chunk of `reader` to `ingest` (ingest_nominal_roll or
+    ingest_results), one transaction per chunk. Resident memory is sampled
+    while each chunk is still alive and the highest reading is kept as the
+    upload's peak. `on_chunk` is called with the running report after each
+    chunk, e.g. to publish progress.
+    """
+    report = UploadReport()
+    for chunk in reader:
+        ingest(chunk, *args, report=report, **kwargs)
+        memory = resident_memory()
+        if memory is not None:
+            report.peak_memory = max(report.peak_memory or 0, memory)
+        if on_chunk is not None:
+            on_chunk(report)
+    return report
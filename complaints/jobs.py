@@ -0,0 +1,127 @@
+import csv
+import io
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db.models import F
+from django.utils import timezone
+
+from .ingestion import (
+    UploadReader, NOMINAL_ROLL_COLUMNS, RESULT_COLUMNS, ingest_upload, ingest_nominal_roll, ingest_results
+)
+from .models import UploadJob
+
+# Required sheet columns and ingestion function for each kind of upload
+JOB_KINDS = {
+    'Nominal Roll': (NOMINAL_ROLL_COLUMNS, ingest_nominal_roll),
+    'Result': (RESULT_COLUMNS, ingest_results),
+}
+
+
+def enqueue_upload(kind, lecturer, file, replace_existing=False):
+    # Persist the upload to MEDIA_ROOT and leave it for a `process_uploads` worker
+    return UploadJob.objects.create(kind=kind, lec_no=lecturer, file=file, replace_existing=replace_existing)
+
+
+def recover_stale_jobs(now=None):
+    """
+    Like an outbox lease: a job still Running UPLOAD_JOB_LEASE seconds after
+    it was claimed lost its worker, so it goes back to Pending, or is marked
+    Failed once it has been claimed UPLOAD_JOB_MAX_ATTEMPTS times. Running a
+    sheet again is safe: rows already written are skipped or upserted.
+    Returns the number of jobs recovered.
+    """
+    now = now or timezone.now()
+    stale = UploadJob.objects.filter(
+        status='Running', started_at__lt=now - timedelta(seconds=getattr(settings, 'UPLOAD_JOB_LEASE', 3600))
+    )
+    failed = stale.filter(attempts__gte=getattr(settings, 'UPLOAD_JOB_MAX_ATTEMPTS', 2)).update(
+        status='Failed', error_message="Processing stopped before the upload finished.", finished_at=now
+    )
+    requeued = stale.update(status='Pending', started_at=None)
+    return failed + requeued
+
+
+def claim_next_job():
+    """
+    Atomically move the oldest pending job to Running. Several workers can poll
+    the same table: only the one whose conditional update hits the row wins it.
+    """
+    recover_stale_jobs()
+    while True:
+        job = UploadJob.objects.filter(status='Pending').order_by('created_at', 'job_id').first()
+        if job is None:
+            return None
+        claimed = UploadJob.objects.filter(job_id=job.job_id, status='Pending').update(
+            status='Running', started_at=timezone.now(), attempts=F('attempts') + 1
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+
+
+def purge_upload_files(now=None):
+    """
+    Delete the uploaded sheet and skipped-row report of every job that
+    finished more than UPLOAD_RETENTION_DAYS ago. The job rows, with their
+    counts, are kept. Returns the number of jobs purged.
+    """
+    now = now or timezone.now()
+    cutoff = now - timedelta(days=getattr(settings, 'UPLOAD_RETENTION_DAYS', 30))
+    jobs = UploadJob.objects.filter(status__in=('Done', 'Failed'), finished_at__lt=cutoff).exclude(file='', error_report='')
+    purged = 0
+    for job in jobs.iterator():
+        # Storage.delete ignores files that are already gone
+        for field in (job.file, job.error_report):
+            if field:
+                field.delete(save=False)
+        job.save(update_fields=['file', 'error_report'])
+        purged += 1
+    return purged
+
+
+def save_progress(job, report):
+    job.processed = report.processed
+    job.inserted = report.inserted
+    job.updated = report.updated
+    job.rejected = report.rejected
+    job.peak_memory = report.peak_memory
+    job.save(update_fields=['processed', 'inserted', 'updated', 'rejected', 'peak_memory'])
+
+
+def error_report_csv(report):
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(['row', 'level', 'reason'])
+    for entry in report.skipped:
+        writer.writerow([entry['row'], entry['level'], entry['reason']])
+    return output.getvalue()
+
+
+def run_job(job):
+    columns, ingest = JOB_KINDS[job.kind]
+    kwargs = {'replace': job.replace_existing} if job.kind == 'Result' else {}
+
+    try:
+        with job.file.open('rb') as file:
+            reader = UploadReader(file)
+            if not set(columns).issubset(reader.columns):
+                raise ValueError("Invalid file format. Ensure all required columns are present.")
+            report = ingest_upload(
+                reader, ingest, job.lec_no, on_chunk=lambda report: save_progress(job, report), **kwargs
+            )
+    except Exception as e:
+        job.status = 'Failed'
+        job.error_message = f"Error processing file: {e}"
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error_message', 'finished_at'])
+        return job
+
+    save_progress(job, report)
+    if report.skipped:
+        job.error_report.save(f'job-{job.job_id}-errors.csv', ContentFile(error_report_csv(report)), save=False)
+    job.status = 'Done'
+    job.finished_at = timezone.now()
+    job.save(update_fields=['error_report', 'status', 'finished_at'])
+    return job
@@ -0,0 +1,56 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+
+from complaints.benchmarking import scratch_database, timed
+from complaints.codes import CodeAllocator, code_for
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure complaint code generation on a scratch database: the keyed permutation alone, "
+        "then codes per second from one thread and from several threads sharing one allocator"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--codes', type=int, default=20000, help="Codes generated per measurement")
+        parser.add_argument('--threads', type=int, default=8, help="Threads sharing the allocator")
+        parser.add_argument('--block-size', type=int, default=None, help="CODE_BLOCK_SIZE to use (default: settings)")
+
+    def handle(self, *args, **options):
+        count = options['codes']
+        block_size = override_settings(CODE_BLOCK_SIZE=options['block_size']) if options['block_size'] else override_settings()
+        with scratch_database(), block_size:
+            elapsed, _ = timed(lambda: [code_for('complaint', number) for number in range(count)])
+            self.report("Permutation only", count, elapsed)
+
+            # A fresh allocator per run, as a new process would have, on a sequence name of its own
+            allocator = CodeAllocator('benchmark-single')
+            elapsed, codes = timed(lambda: [code_for(allocator.name, allocator.take()) for _ in range(count)])
+            self.report("One thread", count, elapsed, codes)
+
+            allocator = CodeAllocator('benchmark-threads')
+            threads = max(options['threads'], 1)
+
+            def take(share):
+                try:
+                    return [code_for(allocator.name, allocator.take()) for _ in range(share)]
+                finally:
+                    # Each thread holds its own connection
+                    connection.close()
+
+            def run():
+                with ThreadPoolExecutor(max_workers=threads) as pool:
+                    shares = [count // threads + (index < count % threads) for index in range(threads)]
+                    return [code for codes in pool.map(take, shares) for code in codes]
+
+            elapsed, codes = timed(run)
+            self.report(f"{threads} threads", count, elapsed, codes)
+
+    def report(self, label, count, elapsed, codes=None):
+        line = f"{label}: {count} codes in {elapsed:.0f} ms, {count / elapsed * 1000:,.0f} codes/s"
+        if codes is not None:
+            line += f", {len(codes) - len(set(codes))} duplicates"
+        self.stdout.write(line)
@@ -0,0 +1,89 @@
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from complaints.benchmarking import scratch_database, seed_department, seed_students, timed
+from complaints.dashboard import lecturer_complaints
+from complaints.models import AcademicYear, Complaint, Lecturer, LecturerUnit, Student
+from complaints.pagination import COMPLAINT_ORDERING
+
+YEARS = ['2020/2021', '2021/2022', '2022/2023']
+
+
+def independent_in_complaints(lecturer):
+    # The scoping lecturer_complaints replaced: unit, year and student course each matched separately
+    assignments = LecturerUnit.objects.filter(lec_no=lecturer)
+    course_codes = assignments.values_list('course_code', flat=True).distinct()
+    return Complaint.objects.filter(
+        reg_no__in=Student.objects.filter(course_code__in=course_codes).values_list('reg_no', flat=True),
+        unit_code__in=assignments.values_list('unit_code', flat=True).distinct(),
+        academic_year__in=assignments.values_list('academic_year', flat=True).distinct(),
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the lecturer complaint listing on a scratch database, scoped by a correlated assignment check "
+        "(lecturer_complaints) and by the independent IN filters it replaced"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--complaints', type=int, default=100000, help="Complaints in the scratch database")
+        parser.add_argument('--students', type=int, default=50000, help="Students in the scratch database")
+        parser.add_argument('--lecturers', type=int, default=50, help="Lecturers, each with --assignments assignments")
+        parser.add_argument('--assignments', type=int, default=4, help="Unit assignments per lecturer")
+        parser.add_argument('--repeat', type=int, default=20, help="Timed runs of each query; the median is reported")
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            self.stdout.write(
+                f"Seeding {options['complaints']} complaints, {options['students']} students and "
+                f"{options['lecturers'] * options['assignments']} assignments ..."
+            )
+            lecturer = self.seed(options)
+            for name, scope in [('independent IN', independent_in_complaints), ('assignment check', lecturer_complaints)]:
+                count_ms, count = timed(lambda: scope(lecturer).count(), options['repeat'])
+                page_ms, _ = timed(
+                    lambda: list(scope(lecturer).order_by(*COMPLAINT_ORDERING)[:settings.LIST_PAGE_SIZE]),
+                    options['repeat']
+                )
+                self.stdout.write(f"{name}: {count} rows, count {count_ms:.1f} ms, first page {page_ms:.1f} ms")
+
+    def seed(self, options):
+        rng = random.Random(0)
+        department, courses, units, year = seed_department(units=100, courses=10)
+        years = [year, *AcademicYear.objects.bulk_create([AcademicYear(academic_year=name) for name in YEARS])]
+        share = options['students'] // len(courses)
+        students = []
+        for index, course in enumerate(courses):
+            students.extend(seed_students(share, course, start=index * share))
+
+        now = timezone.now()
+        due_at = now + timedelta(hours=department.complaint_sla_hours)
+        # (unit, student) is unique, so complaint n goes to student n % students on a unit shifted per pass
+        Complaint.objects.bulk_create([
+            Complaint(
+                complaint_code=f'C{number:07d}', unit_code=units[(number + number // len(students) * 7) % len(units)],
+                reg_no=students[number % len(students)], academic_year=years[number % len(years)],
+                missing_mark='CAT', exam_date=now.date(), description='My CAT mark is missing.',
+                dep_code=department, created_at=now - timedelta(minutes=number), due_at=due_at,
+            )
+            for number in range(options['complaints'])
+        ], batch_size=1000)
+
+        lecturers = Lecturer.objects.bulk_create([
+            Lecturer(
+                lec_no=f'L{number:03d}', email_address=f'lecturer{number}@mmust.ac.ke', username=f'lecturer{number}@mmust.ac.ke',
+                first_name='John', last_name='Doe', phone_number='0712345678', role='Member', dep_code=department,
+            )
+            for number in range(options['lecturers'])
+        ])
+        LecturerUnit.objects.bulk_create([
+            LecturerUnit(lec_no=lecturer, unit_code=rng.choice(units), academic_year=rng.choice(years), course_code=rng.choice(courses))
+            for lecturer in lecturers
+            for _ in range(options['assignments'])
+        ])
+        return lecturers[0]
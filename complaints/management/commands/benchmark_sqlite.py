@@ -0,0 +1,165 @@
+import itertools
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from complaints.db import write_lock
+from complaints.models import AcademicYear, Complaint, Course, Department, Result, School, Student, Unit
+
+# The scratch database is registered under this alias for the length of the run
+ALIAS = 'benchmark'
+MODELS = [School, Department, Course, Unit, AcademicYear, Student, Complaint, Result]
+UNITS = 20
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure SQLite under mixed load on a scratch copy of the schema: threads reading the complaint list, "
+        "posting complaints and upserting result chunks at once"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=10, help="How long the load runs")
+        parser.add_argument('--readers', type=int, default=4, help="Threads reading the complaint list")
+        parser.add_argument('--writers', type=int, default=4, help="Threads posting complaints")
+        parser.add_argument('--bulk-writers', type=int, default=2, help="Threads upserting result chunks")
+        parser.add_argument('--students', type=int, default=20000, help="Students in the scratch database")
+        parser.add_argument('--chunk-size', type=int, default=5000, help="Results per upserted chunk")
+        parser.add_argument(
+            '--stock', action='store_true',
+            help="No pragmas, plain BEGIN and no write_lock, for comparison with the configured profile"
+        )
+
+    def handle(self, *args, **options):
+        if connections[DEFAULT_DB_ALIAS].vendor != 'sqlite':
+            raise CommandError("The benchmark only runs when the default database is SQLite.")
+
+        directory = tempfile.mkdtemp(prefix='benchmark-sqlite-')
+        connections.settings[ALIAS] = dict(
+            connections.settings[DEFAULT_DB_ALIAS], NAME=os.path.join(directory, 'benchmark.sqlite3')
+        )
+        profile = override_settings(SQLITE_PRAGMAS={}, SQLITE_TRANSACTION_MODE=None) if options['stock'] else override_settings()
+        try:
+            with profile:
+                self.stdout.write(f"Seeding {options['students']} students ...")
+                self.seed(options['students'])
+                report = self.run_load(options)
+        finally:
+            connections[ALIAS].close()
+            del connections[ALIAS]
+            del connections.settings[ALIAS]
+            shutil.rmtree(directory, ignore_errors=True)
+
+        reads = sorted(report['reads'])
+        p95 = reads[int(len(reads) * 0.95)] * 1000 if reads else 0
+        self.stdout.write(f"Profile: {'stock' if options['stock'] else 'configured'}")
+        self.stdout.write(f"Complaint list reads: {len(reads)}, p95 {p95:.0f} ms")
+        self.stdout.write(f"Complaints posted: {report['posted']}")
+        self.stdout.write(f"Result chunks upserted: {report['chunks']}")
+        self.stdout.write(f'"database is locked" errors: {report["locked"]}')
+
+    def seed(self, students):
+        with connections[ALIAS].schema_editor() as editor:
+            for model in MODELS:
+                editor.create_model(model)
+
+        # bulk_create throughout: it sends no post_save, whose receivers work on the default database
+        with transaction.atomic(using=ALIAS):
+            [school] = School.objects.using(ALIAS).bulk_create([School(school_code='SCI', school_name='Science')])
+            [department] = Department.objects.using(ALIAS).bulk_create([
+                Department(dep_code='CS', dep_name='Computer Science', school_code=school)
+            ])
+            [course] = Course.objects.using(ALIAS).bulk_create([
+                Course(course_code='BCS', course_name='BSc Computer Science', dep_code=department)
+            ])
+            Unit.objects.using(ALIAS).bulk_create([
+                Unit(unit_code=f'SCO{number:03d}', unit_name=f'Unit {number}', dep_code=department) for number in range(UNITS)
+            ])
+            AcademicYear.objects.using(ALIAS).bulk_create([AcademicYear(academic_year='2023/2024')])
+            Student.objects.using(ALIAS).bulk_create([
+                Student(
+                    reg_no=f'COM/B/01-{number:05d}/2023', username=f'student{number}', first_name='Jane', last_name='Roe',
+                    email_address=f'student{number}@mmust.ac.ke', phone_number='0712345678', course_code=course
+                )
+                for number in range(students)
+            ], batch_size=1000)
+
+    def run_load(self, options):
+        department = Department.objects.using(ALIAS).get()
+        units = list(Unit.objects.using(ALIAS).order_by('unit_code'))
+        year = AcademicYear.objects.using(ALIAS).get()
+        students = list(Student.objects.using(ALIAS).order_by('reg_no'))
+        # Each posted complaint takes the next (unit, student) pair, so none clash on unique_complaint_per_unit_student
+        pairs = itertools.product(units, students)
+        numbers = itertools.count()
+        chunks = itertools.count()
+        deadline = time.monotonic() + options['seconds']
+
+        def read():
+            list(Complaint.objects.using(ALIAS).select_related('unit_code', 'reg_no').order_by('-created_at')[:50])
+
+        def post():
+            unit, student = next(pairs)
+            now = timezone.now()
+            complaint = Complaint(
+                complaint_code=f'B{next(numbers):07d}', unit_code=unit, reg_no=student, academic_year=year,
+                missing_mark='CAT', exam_date=now.date(), description='My CAT mark is missing.',
+                dep_code=department, created_at=now, due_at=now + timedelta(hours=department.complaint_sla_hours),
+            )
+            with transaction.atomic(using=ALIAS):
+                Complaint.objects.using(ALIAS).bulk_create([complaint])
+
+        def upsert():
+            chunk = next(chunks)
+            unit = units[chunk % len(units)]
+            start = chunk * options['chunk_size'] % len(students)
+            rows = [
+                Result(unit_code=unit, reg_no=student, academic_year=year, cat=chunk % 31, exam=chunk % 71)
+                for student in students[start:start + options['chunk_size']]
+            ]
+            with (transaction.atomic(using=ALIAS) if options['stock'] else write_lock(using=ALIAS)):
+                Result.objects.using(ALIAS).bulk_create(
+                    rows, batch_size=500, update_conflicts=True,
+                    unique_fields=['unit_code', 'reg_no', 'academic_year'], update_fields=['cat', 'exam'],
+                )
+
+        def worker(work):
+            timings, locked = [], 0
+            try:
+                while time.monotonic() < deadline:
+                    started = time.monotonic()
+                    try:
+                        work()
+                    except OperationalError as e:
+                        if 'locked' not in str(e):
+                            raise
+                        locked += 1
+                        continue
+                    timings.append(time.monotonic() - started)
+            finally:
+                # Each thread holds its own connection
+                connections[ALIAS].close()
+            return work, timings, locked
+
+        tasks = [read] * options['readers'] + [post] * options['writers'] + [upsert] * options['bulk_writers']
+        with ThreadPoolExecutor(max_workers=len(tasks)) as pool:
+            outcomes = [future.result() for future in [pool.submit(worker, task) for task in tasks]]
+
+        report = {'reads': [], 'posted': 0, 'chunks': 0, 'locked': 0}
+        for work, timings, locked in outcomes:
+            report['locked'] += locked
+            if work is read:
+                report['reads'].extend(timings)
+            elif work is post:
+                report['posted'] += len(timings)
+            else:
+                report['chunks'] += len(timings)
+        return report
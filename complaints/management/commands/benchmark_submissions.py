@@ -0,0 +1,76 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone
+
+from complaints.benchmarking import scratch_database, seed_department, seed_students
+from complaints.models import Complaint, NominalRoll
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test for complaint submission on a scratch database: students post complaints through "
+        "PostComplaint from several threads at once"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--submissions', type=int, default=2000, help="Complaints posted, one per student")
+        parser.add_argument('--threads', type=int, default=4, help="Threads posting at once")
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        try:
+            with scratch_database():
+                self.run(options['submissions'], max(options['threads'], 1))
+        finally:
+            teardown_test_environment()
+
+    def run(self, submissions, threads):
+        _, [course], [unit], year = seed_department()
+        # Two extra students: one warms the reference data and code caches, one is measured warm
+        students = seed_students(submissions + 2, course)
+        NominalRoll.objects.bulk_create(
+            [NominalRoll(unit_code=unit, reg_no=student, academic_year=year) for student in students], batch_size=1000
+        )
+        data = {
+            'unit_code': unit.pk, 'academic_year': year.pk, 'missing_mark': 'CAT',
+            'description': 'My CAT mark is missing.', 'exam_date': timezone.localdate().isoformat(),
+        }
+
+        def post(client, student):
+            session = client.session
+            session['registration_number'] = student.reg_no
+            session.save()
+            client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+            return client.post(reverse('post-complaint'), data)
+
+        post(Client(), students[0])
+        with CaptureQueriesContext(connection) as queries:
+            post(Client(), students[1])
+        self.stdout.write(f"Queries per warm submission: {len(queries)}")
+
+        def submit(share):
+            client = Client()
+            try:
+                for student in share:
+                    post(client, student)
+            finally:
+                # Each thread holds its own connection
+                connection.close()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(submit, [students[2 + index::threads] for index in range(threads)]))
+        elapsed = time.perf_counter() - started
+
+        posted = Complaint.objects.count() - 2
+        self.stdout.write(
+            f"{threads} threads: {posted} of {submissions} complaints posted in {elapsed:.1f} s, "
+            f"{posted / elapsed:.0f} submissions/s"
+        )
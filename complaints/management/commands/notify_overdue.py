@@ -0,0 +1,37 @@
+import time
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+
+from complaints.notifications import queue_overdue_digests
+from complaints.outbox import claim_batch, close_quietly, send_batch
+
+
+class Command(BaseCommand):
+    help = "Email each lecturer one daily digest of their overdue complaints"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queue-only', action='store_true', help="Queue the digests and leave delivery to send_outbox")
+        parser.add_argument('--batch-size', type=int, default=settings.OUTBOX_BATCH_SIZE, help="Messages claimed per batch")
+        parser.add_argument('--rate', type=float, default=settings.OUTBOX_SEND_RATE, help="Messages per second, 0 for no limit")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        queued = queue_overdue_digests()
+        self.stdout.write(f"Queued {queued} overdue complaint digests in {time.monotonic() - started:.1f}s")
+        if options['queue_only'] or not queued:
+            return
+
+        # Deliver everything due now (digests and any other queued mail) over a single SMTP connection
+        connection = get_connection()
+        sent = 0
+        try:
+            while True:
+                messages = claim_batch(max(options['batch_size'], 1))
+                if not messages:
+                    break
+                sent += send_batch(messages, connection, rate=options['rate'])
+        finally:
+            close_quietly(connection)
+        self.stdout.write(f"Sent {sent} queued emails")
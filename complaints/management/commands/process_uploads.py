@@ -0,0 +1,67 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from complaints.jobs import claim_next_job, purge_upload_files, run_job
+
+# Seconds between sweeps for uploaded files past their retention period
+PURGE_INTERVAL = 3600
+
+
+class Command(BaseCommand):
+    help = "Process queued nominal roll and result uploads"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1, help="Number of uploads processed in parallel")
+        parser.add_argument('--poll-interval', type=float, default=2.0, help="Seconds to wait when the queue is empty")
+        parser.add_argument('--once', action='store_true', help="Exit once the queue is empty")
+
+    def handle(self, *args, **options):
+        self.purge_lock = threading.Lock()
+        self.next_purge = 0
+        workers = max(options['workers'], 1)
+        if workers == 1:
+            self.work(options['poll_interval'], options['once'])
+            return
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(self.work, options['poll_interval'], options['once']) for _ in range(workers)]
+            for future in futures:
+                # Re-raise anything that killed a worker thread
+                future.result()
+
+    def work(self, poll_interval, once):
+        try:
+            while True:
+                close_old_connections()
+                job = claim_next_job()
+                if job is None:
+                    self.purge()
+                    if once:
+                        return
+                    time.sleep(poll_interval)
+                    continue
+
+                self.stdout.write(f"Processing {job}")
+                job = run_job(job)
+                self.stdout.write(f"Finished {job}: {job.inserted} added, {job.updated} updated, {job.rejected} skipped")
+        finally:
+            # Each pool thread holds its own connection
+            connection.close()
+
+    def purge(self):
+        # Run by whichever idle worker finds the sweep due; the others carry on polling
+        if not self.purge_lock.acquire(blocking=False):
+            return
+        try:
+            if time.monotonic() < self.next_purge:
+                return
+            purged = purge_upload_files()
+            if purged:
+                self.stdout.write(f"Deleted the files of {purged} finished upload(s)")
+            self.next_purge = time.monotonic() + PURGE_INTERVAL
+        finally:
+            self.purge_lock.release()
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from complaints.counters import rebuild_counters
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-department complaint counters from scratch. Schedule it to refresh overdue counts."
+
+    def handle(self, *args, **options):
+        rows = rebuild_counters()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} complaint counter rows."))
@@ -0,0 +1,37 @@
+import time
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from complaints.outbox import claim_batch, close_quietly, send_batch
+
+
+class Command(BaseCommand):
+    help = "Send queued outbox emails, such as password reset links"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.OUTBOX_BATCH_SIZE, help="Messages claimed per batch")
+        parser.add_argument('--poll-interval', type=float, default=2.0, help="Seconds to wait when nothing is due")
+        parser.add_argument('--once', action='store_true', help="Exit once nothing is due")
+        parser.add_argument('--rate', type=float, default=settings.OUTBOX_SEND_RATE, help="Messages per second, 0 for no limit")
+
+    def handle(self, *args, **options):
+        # One SMTP connection is reused while there is mail to send and dropped while idle
+        connection = get_connection()
+        try:
+            while True:
+                close_old_connections()
+                messages = claim_batch(max(options['batch_size'], 1))
+                if not messages:
+                    close_quietly(connection)
+                    if options['once']:
+                        return
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                sent = send_batch(messages, connection, rate=options['rate'])
+                self.stdout.write(f"Sent {sent} of {len(messages)} queued emails")
+        finally:
+            close_quietly(connection)
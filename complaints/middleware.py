@@ -0,0 +1,70 @@
+from django.http import Http404
+from django.utils.functional import cached_property
+
+from . import refdata
+from .identity import session_lecturer
+from .models import Lecturer, LecturerUnit
+
+
+class LecturerContext:
+    """
+    The signed-in lecturer, their department and unit assignments for one
+    request. Each piece is loaded the first time a view asks for it and then
+    reused, so a view can consult it as often as it likes.
+    """
+
+    def __init__(self, request):
+        self.request = request
+
+    @cached_property
+    def lecturer(self):
+        return session_lecturer(self.request)
+
+    def get(self):
+        # Like Lecturer.objects.get(username=...): raises DoesNotExist when nobody is signed in
+        if self.lecturer is None:
+            raise Lecturer.DoesNotExist("Lecturer matching query does not exist.")
+        return self.lecturer
+
+    def get_or_404(self):
+        if self.lecturer is None:
+            raise Http404("No Lecturer matches the given query.")
+        return self.lecturer
+
+    @cached_property
+    def department(self):
+        if self.lecturer is None:
+            return None
+        return refdata.departments.get(self.lecturer.dep_code_id)
+
+    @cached_property
+    def assignments(self):
+        if self.lecturer is None:
+            return []
+        return list(LecturerUnit.objects.filter(lec_no=self.lecturer.pk))
+
+    def assignments_for(self, academic_year=None):
+        # `academic_year` may be a year_id or the raw ?academic_year= string
+        if not academic_year:
+            return self.assignments
+        return [unit for unit in self.assignments if str(unit.academic_year_id) == str(academic_year)]
+
+    def unit_codes(self, academic_year=None):
+        return {unit.unit_code_id for unit in self.assignments_for(academic_year)}
+
+    def academic_years(self):
+        return {unit.academic_year_id for unit in self.assignments}
+
+    def course_codes(self):
+        return {unit.course_code_id for unit in self.assignments}
+
+
+class LecturerContextMiddleware:
+    """Attach a lazily loaded LecturerContext to every request as `request.lecturer_context`."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.lecturer_context = LecturerContext(request)
+        return self.get_response(request)
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.30 on 2026-10-18 19:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0003_passwordresettoken_delete_payment'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='lecturer',
+            name='first_name',
+            field=models.CharField(help_text='Please Enter Lecturer First Name', max_length=200),
+        ),
+        migrations.AlterField(
+            model_name='lecturer',
+            name='last_name',
+            field=models.CharField(help_text='Please Enter Lecturer Last Name', max_length=200),
+        ),
+        migrations.CreateModel(
+            name='UploadJob',
+            fields=[
+                ('job_id', models.AutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('Nominal Roll', 'Nominal Roll'), ('Result', 'Result')], max_length=20)),
+                ('file', models.FileField(upload_to='uploads/')),
+                ('replace_existing', models.BooleanField(default=False)),
+                ('status', models.CharField(choices=[('Pending', 'Pending'), ('Running', 'Running'), ('Done', 'Done'), ('Failed', 'Failed')], default='Pending', max_length=20)),
+                ('processed', models.PositiveIntegerField(default=0)),
+                ('inserted', models.PositiveIntegerField(default=0)),
+                ('updated', models.PositiveIntegerField(default=0)),
+                ('rejected', models.PositiveIntegerField(default=0)),
+                ('peak_memory', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('error_message', models.TextField(blank=True)),
+                ('error_report', models.FileField(blank=True, upload_to='upload_reports/')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('lec_no', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='complaints.lecturer')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'created_at'], name='upload_job_queue_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-18 20:04
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0004_uploadjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplaintCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('open_complaints', models.IntegerField(default=0)),
+                ('overdue_complaints', models.IntegerField(default=0)),
+                ('no_result_responses', models.IntegerField(default=0)),
+                ('no_cat_mark_responses', models.IntegerField(default=0)),
+                ('no_exam_mark_responses', models.IntegerField(default=0)),
+                ('result_loaded_responses', models.IntegerField(default=0)),
+                ('academic_year', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='complaints.academicyear')),
+                ('dep_code', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='complaints.department')),
+                ('unit_code', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='complaints.unit')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='complaintcounter',
+            constraint=models.UniqueConstraint(fields=('dep_code', 'unit_code', 'academic_year'), name='unique_counter_per_department_unit_year'),
+        ),
+    ]
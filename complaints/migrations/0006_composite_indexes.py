@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-18 20:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0005_complaintcounter'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['unit_code', 'academic_year', 'date'], name='complaint_unit_year_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lecturerunit',
+            index=models.Index(fields=['lec_no', 'academic_year', 'unit_code'], name='lecturer_unit_lec_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='response',
+            index=models.Index(fields=['responder', 'date'], name='response_responder_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['course_code', 'reg_no'], name='student_course_reg_idx'),
+        ),
+    ]
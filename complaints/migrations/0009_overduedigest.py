@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-18 20:23
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0008_outboxmessage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OverdueDigest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest_date', models.DateField()),
+                ('complaint_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('lec_no', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='complaints.lecturer')),
+                ('message', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='complaints.outboxmessage')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='overduedigest',
+            constraint=models.UniqueConstraint(fields=('lec_no', 'digest_date'), name='unique_overdue_digest_per_lecturer_day'),
+        ),
+    ]
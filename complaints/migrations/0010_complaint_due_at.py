@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-18 20:25
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0009_overduedigest'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='dep_code',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to='complaints.department'),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='due_at',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='department',
+            name='complaint_sla_hours',
+            field=models.PositiveIntegerField(default=24, help_text="Hours a complaint from this department's students may wait for a response before it is overdue", validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+    ]
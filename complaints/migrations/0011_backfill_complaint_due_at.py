@@ -0,0 +1,38 @@
+from datetime import datetime, time, timedelta
+
+from django.db import migrations
+from django.utils import timezone
+
+
+def backfill_due_at(apps, schema_editor):
+    # Existing complaints only recorded the day they were posted; treat it as midnight that day
+    Complaint = apps.get_model('complaints', 'Complaint')
+    Department = apps.get_model('complaints', 'Department')
+    sla_hours = dict(Department.objects.values_list('dep_code', 'complaint_sla_hours'))
+    tz = timezone.get_current_timezone()
+
+    batch = []
+    rows = Complaint.objects.values_list('pk', 'date', 'reg_no__course_code__dep_code').order_by()
+    for pk, posted, dep_code in rows.iterator(chunk_size=2000):
+        created_at = timezone.make_aware(datetime.combine(posted, time.min), tz)
+        batch.append(Complaint(
+            pk=pk,
+            created_at=created_at,
+            dep_code_id=dep_code,
+            due_at=created_at + timedelta(hours=sla_hours.get(dep_code, 24)),
+        ))
+        if len(batch) == 1000:
+            Complaint.objects.bulk_update(batch, ['created_at', 'dep_code', 'due_at'])
+            batch = []
+    Complaint.objects.bulk_update(batch, ['created_at', 'dep_code', 'due_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0010_complaint_due_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_due_at, migrations.RunPython.noop),
+    ]
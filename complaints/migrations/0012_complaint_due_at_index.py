@@ -0,0 +1,24 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0011_backfill_complaint_due_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='complaint',
+            name='due_at',
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['due_at'], name='complaint_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['dep_code', 'due_at'], name='complaint_dep_due_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-18 20:53
+
+import complaints.grades
+from django.db import migrations, models
+import django.db.models.expressions
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0012_complaint_due_at_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='result',
+            index=models.Index(django.db.models.expressions.CombinedExpression(complaints.grades.ZeroIfNull('cat'), '+', complaints.grades.ZeroIfNull('exam')), models.F('unit_code'), models.F('reg_no'), models.F('academic_year'), name='result_total_idx'),
+        ),
+    ]
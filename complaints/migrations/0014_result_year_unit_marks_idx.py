@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 21:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0013_result_total_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='result',
+            index=models.Index(fields=['academic_year', 'unit_code', 'cat', 'exam'], name='result_year_unit_marks_idx'),
+        ),
+    ]
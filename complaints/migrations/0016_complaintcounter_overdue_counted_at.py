@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 21:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0015_uploadjob_attempts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaintcounter',
+            name='overdue_counted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 21:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0016_complaintcounter_overdue_counted_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboxmessage',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import F
 from datetime import date
 from django.utils import timezone
 import random
@@ -6,6 +7,7 @@ import string
 from datetime import timedelta
 from django.core.exceptions import ValidationError
 from django.contrib.auth.hashers import make_password, check_password
+from .grades import RESULT_TOTAL, grade_case, grade_for, grade_range
 from .validators import validate_reg_no, validate_kenyan_phone_number
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.core.exceptions import ValidationError
@@ -22,6 +24,11 @@ class Department(models.Model):
     dep_code = models.CharField(primary_key=True, unique=True, max_length=20, help_text="Please Enter Department Code")
     dep_name = models.CharField(max_length=200, help_text="Please Enter Department Name")
     school_code = models.ForeignKey(School, on_delete=models.CASCADE)
+    complaint_sla_hours = models.PositiveIntegerField(
+        default=24,
+        validators=[MinValueValidator(1)],
+        help_text="Hours a complaint from this department's students may wait for a response before it is overdue"
+    )
     
     def __str__(self):
         return f"{self.dep_name}"
@@ -42,6 +49,12 @@ class Student(models.Model):
     email_address = models.EmailField(max_length=200, help_text="Please Enter Student Email Address")
     phone_number = models.CharField(max_length=13, validators=[validate_kenyan_phone_number], help_text="Enter phone number in the format 0798073204 or +254798073404")
     course_code = models.ForeignKey(Course, on_delete=models.CASCADE)
+
+    class Meta:
+        indexes = [
+            # Department listings select the reg_no of every student on a course without reading the table
+            models.Index(fields=['course_code', 'reg_no'], name='student_course_reg_idx')
+        ]
     
     def __str__(self):
         return f"{self.reg_no}"
@@ -79,6 +92,12 @@ class LecturerUnit(models.Model):
     lec_no = models.ForeignKey(Lecturer, on_delete=models.CASCADE)
     academic_year = models.ForeignKey(AcademicYear, on_delete=models.CASCADE)
     course_code = models.ForeignKey(Course, on_delete=models.CASCADE)
+
+    class Meta:
+        indexes = [
+            # Every lecturer view starts from the lecturer's assignments, usually narrowed by year
+            models.Index(fields=['lec_no', 'academic_year', 'unit_code'], name='lecturer_unit_lec_year_idx')
+        ]
     
     def __str__(self):
         return f"{self.lec_no}"
@@ -110,6 +129,25 @@ class NominalRoll(models.Model):
         self.clean()
         super().save(*args, **kwargs)
 
+class ResultQuerySet(models.QuerySet):
+    def with_totals(self):
+        # Computed by the database so lists can filter, sort and page on them (see result_total_idx)
+        return self.annotate(total=RESULT_TOTAL).annotate(grade=grade_case('total'))
+
+    def in_grade(self, grade):
+        # Call after with_totals(); unknown grades match nothing
+        bounds = grade_range(grade)
+        if bounds is None:
+            return self.none()
+        lowest, highest = bounds
+        results = self
+        if lowest is not None:
+            results = results.filter(total__gte=lowest)
+        if highest is not None:
+            results = results.filter(total__lt=highest)
+        return results
+
+
 class Result(models.Model):
     unit_code = models.ForeignKey(Unit, on_delete=models.CASCADE)
     reg_no = models.ForeignKey(Student, on_delete=models.CASCADE)
@@ -125,6 +163,8 @@ class Result(models.Model):
         validators=[MinValueValidator(0), MaxValueValidator(70)]
     )
 
+    objects = ResultQuerySet.as_manager()
+
     class Meta:
         constraints = [
             models.UniqueConstraint(
@@ -132,11 +172,36 @@ class Result(models.Model):
                 name='unique_result_per_unit_student_year'
             )
         ]
+        indexes = [
+            # ?min_total=, ?grade= and ordering by total; the trailing columns make it the keyset order
+            models.Index(
+                RESULT_TOTAL, F('unit_code'), F('reg_no'), F('academic_year'), name='result_total_idx'
+            ),
+            # Unit analytics read a year's marks unit by unit from this index alone, without touching the table
+            models.Index(fields=['academic_year', 'unit_code', 'cat', 'exam'], name='result_year_unit_marks_idx'),
+        ]
 
     @property
     def total(self):
+        # Rows loaded through Result.objects.with_totals() carry the database's value
+        if self.__dict__.get('_total') is not None:
+            return self._total
         return (self.cat or 0) + (self.exam or 0)
 
+    @total.setter
+    def total(self, value):
+        self._total = value
+
+    @property
+    def grade(self):
+        if self.__dict__.get('_grade') is not None:
+            return self._grade
+        return grade_for(self.total)
+
+    @grade.setter
+    def grade(self, value):
+        self._grade = value
+
     def __str__(self):
         return f"{self.reg_no} - {self.unit_code} - {self.academic_year}"
 
@@ -154,6 +219,12 @@ class Result(models.Model):
         self.clean()
         super().save(*args, **kwargs)
 
+class ComplaintQuerySet(models.QuerySet):
+    def overdue(self, now=None):
+        # Past the response deadline: a range scan on due_at instead of date arithmetic on every row
+        return self.filter(due_at__lt=now or timezone.now())
+
+
 class Complaint(models.Model):
     complaint_code = models.CharField(
         max_length=100,
@@ -178,6 +249,13 @@ class Complaint(models.Model):
     exam_date = models.DateField(help_text="Enter Main Exam Date, [dd, mm, yy]")
     description = models.TextField(help_text="Please Enter Description")
     date = models.DateField(default=timezone.now)
+    created_at = models.DateTimeField(default=timezone.now)
+    # Set on save from the student's department and its complaint_sla_hours, so overdue
+    # lookups by department touch only this table
+    dep_code = models.ForeignKey(Department, on_delete=models.SET_NULL, null=True, blank=True, editable=False)
+    due_at = models.DateTimeField(editable=False)
+
+    objects = ComplaintQuerySet.as_manager()
 
     class Meta:
         constraints = [
@@ -186,13 +264,33 @@ class Complaint(models.Model):
                 name='unique_complaint_per_unit_student'
             )
         ]
+        indexes = [
+            # Complaint listings and overdue checks: unit and year equality, then a date range
+            models.Index(fields=['unit_code', 'academic_year', 'date'], name='complaint_unit_year_date_idx'),
+            # Overdue complaints, across all departments and within one
+            models.Index(fields=['due_at'], name='complaint_due_idx'),
+            models.Index(fields=['dep_code', 'due_at'], name='complaint_dep_due_idx'),
+        ]
 
     def __str__(self):
         return f"{self.complaint_code}"
 
+    def set_deadline(self):
+        # Imported here because refdata imports this module
+        from . import refdata
+        course = refdata.courses.get(self.reg_no.course_code_id)
+        department = refdata.departments.get(course.dep_code_id) if course is not None else None
+        if department is None:
+            # refdata came back empty-handed: follow the student's foreign keys rather than fail on None
+            department = self.reg_no.course_code.dep_code
+        self.dep_code = department
+        self.due_at = self.created_at + timedelta(hours=department.complaint_sla_hours)
+
     def save(self, *args, **kwargs):
         # Ensure clean validations are run before saving
         self.clean()
+        if self.due_at is None:
+            self.set_deadline()
         super().save(*args, **kwargs)
 
 class Response(models.Model):
@@ -223,6 +321,10 @@ class Response(models.Model):
                 name='unique_response_per_student_unit'
             )
         ]
+        indexes = [
+            # Responses given by a lecturer, newest first
+            models.Index(fields=['responder', 'date'], name='response_responder_date_idx')
+        ]
 
     def __str__(self):
         return f"{self.response_code}"
@@ -263,6 +365,8 @@ class System_User(models.Model):
         return self.username   
 
 class PasswordResetToken(models.Model):
+    LIFETIME = timedelta(minutes=5)
+
     username = models.ForeignKey(System_User, on_delete=models.CASCADE)
     token = models.CharField(max_length=32)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -270,6 +374,124 @@ class PasswordResetToken(models.Model):
     def __str__(self):
         return f"Token for {self.username}"
 
+    @property
+    def expires_at(self):
+        return self.created_at + self.LIFETIME
+
     def is_expired(self):
-        expiration_time = self.created_at + timedelta(minutes=5)
-        return timezone.now() > expiration_time
\ No newline at end of file
+        return timezone.now() > self.expires_at
+
+class ComplaintCounter(models.Model):
+    # Running totals per student department, unit and academic year, kept in step with complaints and responses
+    dep_code = models.ForeignKey(Department, on_delete=models.CASCADE)
+    unit_code = models.ForeignKey(Unit, on_delete=models.CASCADE)
+    academic_year = models.ForeignKey(AcademicYear, on_delete=models.CASCADE, null=True, blank=True)
+    open_complaints = models.IntegerField(default=0)
+    overdue_complaints = models.IntegerField(default=0)
+    no_result_responses = models.IntegerField(default=0)
+    no_cat_mark_responses = models.IntegerField(default=0)
+    no_exam_mark_responses = models.IntegerField(default=0)
+    result_loaded_responses = models.IntegerField(default=0)
+    # When rebuild_counters last counted overdue complaints into this row; null for rows created since
+    overdue_counted_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dep_code', 'unit_code', 'academic_year'],
+                name='unique_counter_per_department_unit_year'
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.dep_code_id} - {self.unit_code_id} - {self.academic_year_id}"
+
+class CodeSequence(models.Model):
+    # Next unreserved number for each generated code series ('complaint', 'response')
+    name = models.CharField(primary_key=True, max_length=50)
+    next_value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}: {self.next_value}"
+
+class UploadJob(models.Model):
+    job_id = models.AutoField(primary_key=True)
+    kind = models.CharField(max_length=20, choices=[('Nominal Roll', 'Nominal Roll'), ('Result', 'Result')])
+    lec_no = models.ForeignKey(Lecturer, on_delete=models.CASCADE)
+    file = models.FileField(upload_to='uploads/')
+    replace_existing = models.BooleanField(default=False)
+    status = models.CharField(
+        max_length=20,
+        choices=[('Pending', 'Pending'), ('Running', 'Running'), ('Done', 'Done'), ('Failed', 'Failed')],
+        default='Pending'
+    )
+    processed = models.PositiveIntegerField(default=0)
+    inserted = models.PositiveIntegerField(default=0)
+    updated = models.PositiveIntegerField(default=0)
+    rejected = models.PositiveIntegerField(default=0)
+    peak_memory = models.PositiveBigIntegerField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error_message = models.TextField(blank=True)
+    error_report = models.FileField(upload_to='upload_reports/', blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='upload_job_queue_idx')
+        ]
+
+    def __str__(self):
+        return f"{self.kind} upload #{self.job_id} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in ('Done', 'Failed')
+
+class OutboxMessage(models.Model):
+    message_id = models.AutoField(primary_key=True)
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=255)
+    to_email = models.EmailField(max_length=200)
+    status = models.CharField(
+        max_length=20,
+        choices=[('Pending', 'Pending'), ('Sent', 'Sent'), ('Failed', 'Failed')],
+        default='Pending'
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    # A claimed message is pushed into the future while it is being sent, so a crashed sender's batch comes due again
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    # Past this the message is useless (e.g. its reset link has expired): it fails instead of being retried
+    expires_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx')
+        ]
+
+    def __str__(self):
+        return f"{self.subject} to {self.to_email} ({self.status})"
+
+class OverdueDigest(models.Model):
+    # One overdue-complaints email per lecturer per day; the constraint makes re-runs on the same day no-ops
+    lec_no = models.ForeignKey(Lecturer, on_delete=models.CASCADE)
+    digest_date = models.DateField()
+    complaint_count = models.PositiveIntegerField(default=0)
+    message = models.ForeignKey(OutboxMessage, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['lec_no', 'digest_date'],
+                name='unique_overdue_digest_per_lecturer_day'
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.lec_no_id} - {self.digest_date} ({self.complaint_count})"
@@ -0,0 +1,85 @@
+from itertools import groupby
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .dashboard import with_assignments
+from .models import Complaint, OverdueDigest
+from .outbox import enqueue_email
+
+# Lecturer and complaint columns read by the digest query, keyed by the name used in the email
+DIGEST_FIELDS = {
+    'lec_no': 'assignment__lec_no',
+    'email_address': 'assignment__lec_no__email_address',
+    'last_name': 'assignment__lec_no__last_name',
+    'complaint_code': 'complaint_code',
+    'unit_code': 'unit_code',
+    'reg_no': 'reg_no',
+    'academic_year': 'academic_year__academic_year',
+    'missing_mark': 'missing_mark',
+    'date': 'date',
+    'due_at': 'due_at',
+}
+
+
+def overdue_rows():
+    """
+    Every (lecturer, overdue complaint) pair in one query, ordered by lecturer.
+    Lecturers are joined through dashboard.with_assignments, so an assignment
+    matches on the complaint's unit, academic year and student course
+    together; complaints nobody is assigned to are left out.
+    """
+    rows = with_assignments(Complaint.objects.overdue()).filter(
+        assignment__lec_no__isnull=False,
+    ).values_list(*DIGEST_FIELDS.values()).order_by(
+        'assignment__lec_no', 'unit_code', 'due_at'
+    ).distinct()
+    for values in rows.iterator(chunk_size=2000):
+        yield dict(zip(DIGEST_FIELDS, values))
+
+
+def digest_body(lecturer, complaints):
+    lines = [
+        f"Dear {lecturer['last_name']},",
+        "",
+        f"The following {len(complaints)} complaint(s) on your units are past their response deadline:",
+        "",
+    ]
+    for complaint in complaints:
+        lines.append(
+            f"- {complaint['unit_code']} ({complaint['academic_year']}): {complaint['reg_no']}, "
+            f"missing {complaint['missing_mark']}, posted {complaint['date']:%d %b %Y}, due {timezone.localtime(complaint['due_at']):%d %b %Y %H:%M} [{complaint['complaint_code']}]"
+        )
+    lines += ["", "Please respond to them from your dashboard."]
+    return "\n".join(lines)
+
+
+def queue_overdue_digests(today=None):
+    """
+    Queue one digest email per lecturer with overdue complaints. Lecturers
+    already sent a digest today are skipped, so the command can run again (or
+    twice concurrently) without emailing anyone twice. Returns the number of
+    digests queued.
+    """
+    today = today or timezone.localdate()
+    already_sent = set(OverdueDigest.objects.filter(digest_date=today).values_list('lec_no', flat=True))
+    queued = 0
+    for lec_no, rows in groupby(overdue_rows(), key=lambda row: row['lec_no']):
+        complaints = list(rows)
+        if lec_no in already_sent:
+            continue
+        try:
+            with transaction.atomic():
+                message = enqueue_email(
+                    f"{len(complaints)} overdue complaint(s) awaiting your response",
+                    digest_body(complaints[0], complaints),
+                    complaints[0]['email_address'],
+                )
+                OverdueDigest.objects.create(
+                    lec_no_id=lec_no, digest_date=today, complaint_count=len(complaints), message=message
+                )
+        except IntegrityError:
+            # Another run queued this lecturer's digest first; its email stands
+            continue
+        queued += 1
+    return queued
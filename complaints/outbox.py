@@ -0,0 +1,108 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OutboxMessage
+
+
+def enqueue_email(subject, body, to_email, from_email=None, expires_at=None):
+    # Queue a message for the `send_outbox` worker; call inside the transaction that makes it necessary.
+    # A message with `expires_at` is never delivered after that time
+    return OutboxMessage.objects.create(
+        subject=subject,
+        body=body,
+        from_email=from_email or settings.EMAIL_HOST_USER,
+        to_email=to_email,
+        expires_at=expires_at,
+    )
+
+
+def expire_messages(now=None):
+    # Pending messages whose content is out of date fail without another attempt
+    return OutboxMessage.objects.filter(status='Pending', expires_at__lte=now or timezone.now()).update(
+        status='Failed', last_error='Expired before it could be delivered.'
+    )
+
+
+def claim_batch(size):
+    """
+    Lease up to `size` due messages to this sender. Like claim_next_job, each
+    row is taken with a conditional update so concurrent senders never share
+    one; the lease pushes next_attempt_at forward so a batch abandoned by a
+    crashed sender comes due again once OUTBOX_LEASE seconds pass.
+    """
+    now = timezone.now()
+    expire_messages(now)
+    lease_until = now + timedelta(seconds=settings.OUTBOX_LEASE)
+    due = OutboxMessage.objects.filter(status='Pending', next_attempt_at__lte=now).order_by('next_attempt_at', 'message_id')
+    claimed = []
+    for message in due[:size]:
+        taken = OutboxMessage.objects.filter(
+            message_id=message.message_id, status='Pending', next_attempt_at=message.next_attempt_at
+        ).update(next_attempt_at=lease_until, attempts=F('attempts') + 1)
+        if taken:
+            message.attempts += 1
+            claimed.append(message)
+    return claimed
+
+
+def retry_delay(attempts):
+    # Exponential backoff: base, 2 x base, 4 x base, ...
+    return timedelta(seconds=settings.OUTBOX_RETRY_BASE_DELAY * 2 ** (attempts - 1))
+
+
+def mark_failed(message, error):
+    message.last_error = str(error)
+    next_attempt_at = timezone.now() + retry_delay(message.attempts)
+    if message.attempts >= settings.OUTBOX_MAX_ATTEMPTS or (message.expires_at and next_attempt_at >= message.expires_at):
+        message.status = 'Failed'
+    else:
+        message.next_attempt_at = next_attempt_at
+    message.save(update_fields=['status', 'next_attempt_at', 'last_error'])
+
+
+def send_batch(messages, connection=None, rate=None):
+    """
+    Deliver `messages` over one SMTP connection, opened on first use and kept
+    open for the caller to reuse, and record each outcome. At most `rate`
+    messages go out per second (default OUTBOX_SEND_RATE, 0 for no limit). A
+    message that fails is retried later with backoff; after
+    OUTBOX_MAX_ATTEMPTS, or when the retry would come after the message's
+    expires_at, it is left as Failed. Returns the number sent.
+    """
+    connection = connection or get_connection()
+    rate = getattr(settings, 'OUTBOX_SEND_RATE', 0) if rate is None else rate
+    interval = 1 / rate if rate > 0 else 0
+    sent = 0
+    last_send = None
+    for message in messages:
+        if interval and last_send is not None:
+            time.sleep(max(0, last_send + interval - time.monotonic()))
+        last_send = time.monotonic()
+        try:
+            # No-op while the connection is up; reconnects after a failure closed it
+            connection.open()
+            EmailMessage(
+                message.subject, message.body, message.from_email, [message.to_email], connection=connection
+            ).send(fail_silently=False)
+        except Exception as e:
+            mark_failed(message, e)
+            close_quietly(connection)
+            continue
+        message.status = 'Sent'
+        message.sent_at = timezone.now()
+        message.last_error = ''
+        message.save(update_fields=['status', 'sent_at', 'last_error'])
+        sent += 1
+    return sent
+
+
+def close_quietly(connection):
+    try:
+        connection.close()
+    except Exception:
+        pass
@@ -0,0 +1,152 @@
+import base64
+import json
+
+from django.conf import settings
+from django.core.exceptions import FieldError, ValidationError
+from django.db.models import Q
+
+# Keyset orderings for the list pages. Each matches the leading columns of the
+# model's unique constraint, so the index both identifies rows and serves the sort
+COMPLAINT_ORDERING = ('unit_code_id', 'reg_no_id')
+RECORD_ORDERING = ('unit_code_id', 'reg_no_id', 'academic_year_id')  # Result and NominalRoll
+# Results by total (annotated by Result.objects.with_totals()), served by result_total_idx
+RESULT_TOTAL_ORDERING = ('total',) + RECORD_ORDERING
+
+def encode_cursor(direction, values):
+    # Opaque, URL-safe token: 'n' pages forward after `values`, 'p' pages back before them
+    payload = json.dumps([direction, list(values)], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, width):
+    # Anything malformed or from a different ordering falls back to the first page
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        direction, values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        return None
+    if direction not in ('n', 'p') or not isinstance(values, list) or len(values) != width:
+        return None
+    return direction, values
+
+
+def cursor_values(queryset, ordering, values):
+    """
+    `values` converted to the types of their `ordering` columns, or None when
+    one does not fit (e.g. a string where the total or an integer key goes),
+    so a tampered cursor gets the first page rather than a database error.
+    """
+    try:
+        return [
+            None if value is None else queryset.query.resolve_ref(field_name(field)).output_field.to_python(value)
+            for field, value in zip(ordering, values)
+        ]
+    except (ValidationError, FieldError, TypeError, ValueError):
+        return None
+
+
+def field_name(field):
+    # 'total' for both 'total' and '-total'
+    return field.lstrip('-')
+
+
+def reverse_ordering(ordering):
+    return [field_name(field) if field.startswith('-') else f'-{field}' for field in ordering]
+
+
+def keyset_filter(ordering, values, forward):
+    """
+    Rows strictly after (or before) `values` in `ordering`, spelled out as
+    (a > x) OR (a = x AND b > y) OR ... so the database can seek on an index
+    instead of counting past an OFFSET. A '-' prefixed (descending) field
+    flips its comparison.
+    """
+    condition = Q()
+    for position, field in enumerate(ordering):
+        lookup = 'gt' if forward != field.startswith('-') else 'lt'
+        term = Q(**{f'{field_name(field)}__{lookup}': values[position]})
+        for previous, value in zip(ordering[:position], values[:position]):
+            term &= Q(**{field_name(previous): value})
+        condition |= term
+    return condition
+
+
+def page_size(request):
+    default = getattr(settings, 'LIST_PAGE_SIZE', 50)
+    maximum = getattr(settings, 'LIST_PAGE_SIZE_MAX', 500)
+    try:
+        size = int(request.GET.get('page_size', default))
+    except ValueError:
+        size = default
+    return max(1, min(size, maximum))
+
+
+class KeysetPage:
+    """One page of rows plus the query strings for the neighbouring pages."""
+
+    def __init__(self, request, object_list, ordering, has_next, has_previous):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_query = self.query(request, 'n', object_list[-1], ordering) if has_next else ''
+        self.previous_query = self.query(request, 'p', object_list[0], ordering) if has_previous else ''
+
+    @staticmethod
+    def query(request, direction, row, ordering):
+        # Keep the current filters and page size; only the cursor changes
+        params = request.GET.copy()
+        params['cursor'] = encode_cursor(direction, [getattr(row, field_name(field)) for field in ordering])
+        return params.urlencode()
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def paginate(request, queryset, ordering):
+    """
+    Slice `queryset` by keyset on `ordering`, a tuple of concrete column names
+    (e.g. 'unit_code_id') or annotations, optionally '-' prefixed, that
+    together identify a row. Each page is a single index seek plus LIMIT, so
+    deep pages cost the same as the first.
+    """
+    size = page_size(request)
+    cursor = decode_cursor(request.GET.get('cursor', ''), len(ordering))
+    if cursor is not None:
+        direction, values = cursor
+        values = cursor_values(queryset, ordering, values)
+        cursor = None if values is None else (direction, values)
+
+    if cursor is None:
+        rows = list(queryset.order_by(*ordering)[:size + 1])
+        return KeysetPage(request, rows[:size], ordering, has_next=len(rows) > size, has_previous=False)
+
+    direction, values = cursor
+    if direction == 'n':
+        rows = list(queryset.filter(keyset_filter(ordering, values, True)).order_by(*ordering)[:size + 1])
+        return KeysetPage(request, rows[:size], ordering, has_next=len(rows) > size, has_previous=bool(rows))
+
+    # Walk backwards from the cursor, then restore the normal order for display
+    rows = list(queryset.filter(keyset_filter(ordering, values, False)).order_by(*reverse_ordering(ordering))[:size + 1])
+    has_previous = len(rows) > size
+    rows = rows[:size][::-1]
+    return KeysetPage(request, rows, ordering, has_next=bool(rows), has_previous=has_previous)
+
+
+class KeysetPaginationMixin:
+    """
+    For ListViews: render one keyset page of get_queryset() instead of the
+    whole table. The page is exposed to the template as `page`.
+    """
+    keyset_ordering = None
+
+    def get_keyset_ordering(self):
+        return self.keyset_ordering
+
+    def get_context_data(self, **kwargs):
+        page = paginate(self.request, self.object_list, self.get_keyset_ordering())
+        context = super().get_context_data(object_list=page.object_list, **kwargs)
+        context['page'] = page
+        return context
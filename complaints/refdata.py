@@ -0,0 +1,124 @@
+import bisect
+import threading
+import time
+
+from django.conf import settings
+
+from .models import Unit, AcademicYear, Course, Department
+
+
+class ReferenceTable:
+    """
+    Process-local copy of a small, rarely edited table. The copy is reloaded
+    when the table's version is bumped by a save/delete signal in this process,
+    or after REFERENCE_DATA_TTL seconds to pick up edits made by other processes.
+    A value missing from the copy is looked up in the database before it is
+    reported missing, so rows added by another process are found straight away.
+    """
+
+    def __init__(self, model, lookups=(), prefixes=()):
+        self.model = model
+        self.lookups = lookups
+        self.prefixes = prefixes
+        self.version = 0
+        self._state = None
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self.version += 1
+
+    def _load(self):
+        ttl = getattr(settings, 'REFERENCE_DATA_TTL', 300)
+        state = self._state
+        if state is not None and state['version'] == self.version and time.monotonic() - state['loaded_at'] < ttl:
+            return state
+
+        with self._lock:
+            # Another thread may have reloaded while this one waited
+            state = self._state
+            if state is not None and state['version'] == self.version and time.monotonic() - state['loaded_at'] < ttl:
+                return state
+
+            version = self.version
+            rows = list(self.model.objects.order_by('pk'))
+            state = {
+                'version': version,
+                'loaded_at': time.monotonic(),
+                'rows': rows,
+                'pk': {row.pk: row for row in rows},
+            }
+            for field in self.lookups:
+                # Lookup fields need not be unique; like .filter().first(), the lowest pk wins
+                index = state[field] = {}
+                for row in rows:
+                    index.setdefault(getattr(row, field), row)
+            # Sorted (lowercased value, pk) pairs over every prefix field, searched with bisect
+            state['prefix'] = sorted(
+                (str(getattr(row, field)).lower(), row.pk) for field in self.prefixes for row in rows
+            )
+            self._state = state
+            return state
+
+    def all(self):
+        return self._load()['rows']
+
+    def get(self, value, field='pk'):
+        row = self._load()[field].get(value)
+        if row is None and value is not None:
+            row = self.fetch(value, field)
+        return row
+
+    def fetch(self, value, field='pk'):
+        """
+        One row straight from the database, for a value the copy does not have.
+        Finding it means the copy is stale, so the next call reloads it.
+        """
+        try:
+            row = self.model.objects.filter(**{field: value}).order_by('pk').first()
+        except (TypeError, ValueError):
+            return None
+        if row is not None:
+            self.invalidate()
+        return row
+
+    def present(self, values, field='pk'):
+        # The subset of `values` on record; ones the copy lacks are checked in one query
+        values = set(values)
+        found = values & self._load()[field].keys()
+        missing = values - found
+        if missing:
+            on_record = set(self.model.objects.filter(**{f'{field}__in': missing}).values_list(field, flat=True))
+            if on_record:
+                self.invalidate()
+            found |= on_record
+        return found
+
+    def keys(self, field='pk'):
+        return self._load()[field].keys()
+
+    def startswith(self, prefix, limit=20, allowed=None):
+        """
+        Rows with any prefix field starting with `prefix` (case-insensitive), in
+        value order. `allowed`, if given, is a set of pks to keep.
+        """
+        state = self._load()
+        index = state['prefix']
+        prefix = prefix.lower()
+        matches = {}
+        position = bisect.bisect_left(index, (prefix,))
+        while position < len(index) and len(matches) < limit:
+            value, pk = index[position]
+            if not value.startswith(prefix):
+                break
+            if allowed is None or pk in allowed:
+                matches.setdefault(pk, state['pk'][pk])
+            position += 1
+        return list(matches.values())
+
+
+units = ReferenceTable(Unit, prefixes=('unit_code', 'unit_name'))
+academic_years = ReferenceTable(AcademicYear, lookups=('academic_year',))
+courses = ReferenceTable(Course)
+departments = ReferenceTable(Department)
+
+TABLES = {table.model: table for table in (units, academic_years, courses, departments)}
@@ -0,0 +1,62 @@
+import contextvars
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA = 'replica'
+
+# Set while a view marked with ReadReplicaMixin runs; a ContextVar so threads and async tasks don't share it
+_read_from_replica = contextvars.ContextVar('read_from_replica', default=False)
+
+
+@contextmanager
+def read_from_replica():
+    token = _read_from_replica.set(True)
+    try:
+        yield
+    finally:
+        _read_from_replica.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Sends reads made inside read_from_replica() to the 'replica' database
+    when one is configured, and everything else to the primary. Reads inside
+    a transaction on the primary stay there so they see its own writes.
+    """
+
+    def db_for_read(self, model, **hints):
+        if (
+            _read_from_replica.get()
+            and REPLICA in settings.DATABASES
+            and not connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return REPLICA
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica gets its schema through replication
+        return db != REPLICA
+
+
+class ReadReplicaMixin:
+    """
+    Serve a read-only view from the replica. The response is rendered here
+    so querysets evaluated by the template are read from the replica too.
+    Put it first in the bases.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        with read_from_replica():
+            response = super().dispatch(request, *args, **kwargs)
+            if hasattr(response, 'render') and not response.is_rendered:
+                response.render()
+        return response
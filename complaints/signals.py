@@ -0,0 +1,65 @@
+from datetime import timedelta
+
+from django.db.models import F
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete
+
+from . import refdata
+from .analytics import invalidate_analytics
+from .db import configure_sqlite
+from .dashboard import invalidate_dashboards
+from .identity import invalidate_identity
+from .models import Complaint, ComplaintCounter, Response, LecturerUnit, Lecturer, Department, Result, Unit
+
+
+connection_created.connect(configure_sqlite, dispatch_uid='sqlite-configure')
+
+
+def invalidate_reference_data(sender, **kwargs):
+    refdata.TABLES[sender].invalidate()
+
+
+for model in refdata.TABLES:
+    post_save.connect(invalidate_reference_data, sender=model, dispatch_uid=f'refdata-save-{model.__name__}')
+    post_delete.connect(invalidate_reference_data, sender=model, dispatch_uid=f'refdata-delete-{model.__name__}')
+
+
+def invalidate_dashboard_stats(sender, **kwargs):
+    invalidate_dashboards()
+
+
+def reschedule_complaints(sender, instance, **kwargs):
+    # Open complaints follow the department's current SLA, counted from when they were posted
+    Complaint.objects.filter(dep_code=instance).update(
+        due_at=F('created_at') + timedelta(hours=instance.complaint_sla_hours)
+    )
+    # The new deadlines no longer say which complaints the last rebuild counted as overdue;
+    # stop taking answered ones off until rebuild_counters counts them again
+    ComplaintCounter.objects.filter(dep_code=instance).update(overdue_counted_at=None)
+
+
+post_save.connect(reschedule_complaints, sender=Department, dispatch_uid='complaint-sla-Department')
+
+
+for model in (Complaint, Response, LecturerUnit):
+    post_save.connect(invalidate_dashboard_stats, sender=model, dispatch_uid=f'dashboard-save-{model.__name__}')
+    post_delete.connect(invalidate_dashboard_stats, sender=model, dispatch_uid=f'dashboard-delete-{model.__name__}')
+
+
+def invalidate_result_analytics(sender, **kwargs):
+    invalidate_analytics()
+
+
+# Results edited one at a time (e.g. in the admin), or a unit moved to another department
+for model in (Result, Unit):
+    post_save.connect(invalidate_result_analytics, sender=model, dispatch_uid=f'analytics-save-{model.__name__}')
+    post_delete.connect(invalidate_result_analytics, sender=model, dispatch_uid=f'analytics-delete-{model.__name__}')
+
+
+def invalidate_lecturer_identity(sender, instance, **kwargs):
+    # Sessions holding this lecturer's role or department reload it on their next request
+    invalidate_identity(instance.username)
+
+
+post_save.connect(invalidate_lecturer_identity, sender=Lecturer, dispatch_uid='identity-save-Lecturer')
+post_delete.connect(invalidate_lecturer_identity, sender=Lecturer, dispatch_uid='identity-delete-Lecturer')
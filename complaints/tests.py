@@ -1,3 +1,827 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import pandas as pd
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.template.loader import render_to_string
+from django.db import connection, connections, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import refdata
+from .analytics import load_marks, result_analytics
+from .counters import complaint_answered, complaint_posted, rebuild_counters
+from .codes import CodeAllocator
+from .dashboard import dashboard_context, dashboard_version
+from .db import write_lock
+from .identity import version_key
+from .ingestion import UploadReader, existing_units, ingest_nominal_roll, ingest_results, ingest_upload
+from .jobs import claim_next_job, purge_upload_files
+from .notifications import queue_overdue_digests
+from .outbox import claim_batch, enqueue_email, mark_failed
+from .pagination import encode_cursor
+from .routers import REPLICA, ReplicaRouter, read_from_replica
+
+from .models import (
+    School, Department, Course, Unit, AcademicYear, Student, Lecturer, LecturerUnit, UploadJob, Complaint,
+    ComplaintCounter, Response, Result, NominalRoll, OutboxMessage, OverdueDigest, PasswordResetToken, System_User,
+    CodeSequence
+)
+
+
+def create_department(dep_code='CS', school_code='SCI'):
+    school, _ = School.objects.get_or_create(school_code=school_code, defaults={'school_name': 'Science'})
+    return Department.objects.create(dep_code=dep_code, dep_name='Computer Science', school_code=school)
+
+
+class ComplaintsTestCase(TestCase):
+    """A department with one course, two units, two academic years and a COD teaching one of the units."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = create_department()
+        cls.course = Course.objects.create(course_code='BCS', course_name='BSc Computer Science', dep_code=cls.department)
+        cls.unit = Unit.objects.create(unit_code='SCO101', unit_name='Introduction', dep_code=cls.department)
+        cls.other_unit = Unit.objects.create(unit_code='SCO102', unit_name='Data Structures', dep_code=cls.department)
+        cls.year = AcademicYear.objects.create(academic_year='2023/2024')
+        cls.next_year = AcademicYear.objects.create(academic_year='2024/2025')
+        cls.lecturer = Lecturer.objects.create(
+            lec_no='L1', email_address='jdoe@mmust.ac.ke', username='jdoe@mmust.ac.ke', first_name='John',
+            last_name='Doe', phone_number='0712345678', role='COD', dep_code=cls.department
+        )
+        LecturerUnit.objects.create(unit_code=cls.unit, lec_no=cls.lecturer, academic_year=cls.year, course_code=cls.course)
+
+    @classmethod
+    def create_students(cls, count):
+        return Student.objects.bulk_create([
+            Student(
+                reg_no=f'COM/B/01-{number:05d}/2023', username=f'student{number}', first_name='Jane', last_name='Roe',
+                email_address=f'student{number}@mmust.ac.ke', phone_number='0712345678', course_code=cls.course
+            )
+            for number in range(count)
+        ])
+
+    def create_complaint(self, student, code, unit=None, **fields):
+        return Complaint.objects.create(
+            complaint_code=code, unit_code=unit or self.unit, reg_no=student, academic_year=self.year,
+            missing_mark='CAT', exam_date=timezone.localdate(), description='My CAT mark is missing.', **fields
+        )
+
+    def log_in(self, lecturer=None):
+        # Lecturer pages read the signed-in username from the session; some also need a Django user
+        self.client.force_login(User.objects.get_or_create(username='staff')[0])
+        session = self.client.session
+        session['username'] = (lecturer or self.lecturer).username
+        session.save()
+        # With signed-cookie sessions the session key is the cookie value itself
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+
+
+class UploadJobStatusTests(ComplaintsTestCase):
+    def test_peak_memory_is_reported(self):
+        job = UploadJob.objects.create(
+            kind='Result', lec_no=self.lecturer, file='uploads/results.csv', processed=10, inserted=8,
+            rejected=2, peak_memory=150 * 1024 * 1024
+        )
+        self.log_in()
+        status = self.client.get(reverse('upload-job-status', args=[job.job_id])).json()
+        self.assertEqual(status['peak_memory'], 150 * 1024 * 1024)
+        self.assertIn('150.0\xa0MB', render_to_string('upload_job_status.html', {'job': job}))
+
+    def test_peak_memory_before_first_chunk(self):
+        job = UploadJob.objects.create(kind='Result', lec_no=self.lecturer, file='uploads/results.csv')
+        self.assertIn('peak memory: <span id="upload-job-peak-memory">-</span>', render_to_string('upload_job_status.html', {'job': job}))
+
+
+@override_settings(UPLOAD_JOB_LEASE=600, UPLOAD_JOB_MAX_ATTEMPTS=2, UPLOAD_RETENTION_DAYS=30)
+class UploadJobQueueTests(ComplaintsTestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def test_job_abandoned_by_a_crashed_worker_is_claimed_again(self):
+        job = UploadJob.objects.create(kind='Result', lec_no=self.lecturer, file='uploads/results.csv')
+        self.assertEqual(claim_next_job(), job)
+        self.assertIsNone(claim_next_job())
+
+        UploadJob.objects.filter(pk=job.pk).update(started_at=timezone.now() - timedelta(seconds=601))
+        job = claim_next_job()
+        self.assertEqual((job.status, job.attempts), ('Running', 2))
+
+        # Out of attempts: the next crash fails the job instead of retrying it forever
+        UploadJob.objects.filter(pk=job.pk).update(started_at=timezone.now() - timedelta(seconds=601))
+        self.assertIsNone(claim_next_job())
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'Failed')
+        self.assertTrue(job.error_message)
+
+    def test_running_job_within_its_lease_is_left_alone(self):
+        job = UploadJob.objects.create(kind='Result', lec_no=self.lecturer, file='uploads/results.csv')
+        claim_next_job()
+        self.assertIsNone(claim_next_job())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('Running', 1))
+
+    def test_files_of_old_finished_jobs_are_deleted(self):
+        old, recent = [
+            UploadJob(kind='Result', lec_no=self.lecturer, status='Done', finished_at=timezone.now() - timedelta(days=days))
+            for days in (31, 29)
+        ]
+        for job in (old, recent):
+            job.file.save('results.csv', ContentFile(b'unit_code,reg_no'), save=False)
+            job.error_report.save('errors.csv', ContentFile(b'row,level,reason'), save=False)
+            job.save()
+        paths = [old.file.path, old.error_report.path, recent.file.path]
+
+        self.assertEqual(purge_upload_files(), 1)
+        old.refresh_from_db()
+        recent.refresh_from_db()
+        self.assertFalse(old.file or old.error_report)
+        self.assertEqual([os.path.exists(path) for path in paths], [False, False, True])
+        self.assertTrue(recent.file and recent.error_report)
+        self.assertEqual(purge_upload_files(), 0)
+
+
+class ReferenceDataTests(ComplaintsTestCase):
+    """Rows added by another process reach this one without signals; bulk_create stands in for that."""
+
+    def setUp(self):
+        for table in refdata.TABLES.values():
+            table.all()
+
+    def test_unit_added_elsewhere_is_found(self):
+        Unit.objects.bulk_create([Unit(unit_code='SCO201', unit_name='Networks', dep_code=self.department)])
+        self.assertEqual(existing_units(['SCO101', 'SCO201', 'NOPE']), {'SCO101', 'SCO201'})
+        self.assertEqual(refdata.units.get('SCO201').unit_name, 'Networks')
+        # Finding it marks the copy stale, so the next read reloads it
+        self.assertIn('SCO201', refdata.units.keys())
+
+    def test_academic_year_added_elsewhere_is_found(self):
+        AcademicYear.objects.bulk_create([AcademicYear(academic_year='2025/2026')])
+        self.assertIsNotNone(refdata.academic_years.get('2025/2026', 'academic_year'))
+        self.assertIsNone(refdata.academic_years.get('1999/2000', 'academic_year'))
+        self.assertIsNone(refdata.academic_years.get('not a year id'))
+
+    def test_complaint_deadline_for_a_course_added_elsewhere(self):
+        department = create_department('IT')
+        Department.objects.filter(pk='IT').update(complaint_sla_hours=48)
+        Course.objects.bulk_create([Course(course_code='BIT', course_name='BSc IT', dep_code=department)])
+        student = Student.objects.create(
+            reg_no='BIT/B/01-00001/2023', username='bit1', first_name='Jane', last_name='Roe',
+            email_address='bit1@mmust.ac.ke', phone_number='0712345678', course_code_id='BIT'
+        )
+        complaint = Complaint(complaint_code='ABC123', unit_code=self.unit, reg_no=student, academic_year=self.year)
+        complaint.set_deadline()
+        self.assertEqual(complaint.dep_code_id, 'IT')
+        self.assertEqual(complaint.due_at - complaint.created_at, timedelta(hours=48))
+
+
+class DashboardQueryTests(ComplaintsTestCase):
+    # Reading the dashboard version is a query when the shared cache is the database one
+    VERSION_QUERIES = int(settings.CACHES['shared']['BACKEND'].endswith('DatabaseCache'))
+
+    def setUp(self):
+        cache.clear()
+        dashboard_version()
+        # Reference tables are process-local copies loaded once; keep their loads out of the counts
+        for table in refdata.TABLES.values():
+            table.all()
+
+    def test_cold_cache(self):
+        # Department counts, assigned units, assigned complaints and the live overdue count
+        with self.assertNumQueries(4 + self.VERSION_QUERIES):
+            context = dashboard_context(self.lecturer)
+        self.assertEqual(context['total_units_for_lecturer'], 1)
+        self.assertEqual(context['department_name'], 'Computer Science')
+
+    def test_warm_cache(self):
+        dashboard_context(self.lecturer)
+        # Only the overdue count, which is never cached
+        with self.assertNumQueries(1 + self.VERSION_QUERIES):
+            context = dashboard_context(self.lecturer)
+        self.assertEqual([unit.unit_code for unit in context['units']], ['SCO101'])
+
+    def test_change_in_another_process_reaches_cached_dashboard(self):
+        self.assertEqual(dashboard_context(self.lecturer)['related_complaints_count'], 0)
+        # The worker has a local cache of its own; only the shared version tells this process
+        with mock.patch('complaints.dashboard.cache', LocMemCache('worker', {})):
+            self.create_complaint(self.create_students(1)[0], 'ABC123')
+        self.assertEqual(dashboard_context(self.lecturer)['related_complaints_count'], 1)
+
+
+class ComplaintCounterTests(ComplaintsTestCase):
+    def post_complaint(self, student, code):
+        complaint = self.create_complaint(student, code)
+        complaint_posted(complaint)
+        return complaint
+
+    def make_overdue(self, complaint):
+        complaint.due_at = timezone.now() - timedelta(hours=1)
+        Complaint.objects.filter(pk=complaint.pk).update(due_at=complaint.due_at)
+
+    def counter(self):
+        return ComplaintCounter.objects.get(dep_code=self.department, unit_code=self.unit, academic_year=self.year)
+
+    def test_answering_a_complaint_that_turned_overdue_after_the_rebuild(self):
+        student, = self.create_students(1)
+        complaint = self.post_complaint(student, 'AAA111')
+        self.make_overdue(complaint)
+        # Never counted as overdue, so nothing to take off
+        complaint_answered(complaint, Response(response='No Result'))
+        self.assertEqual((self.counter().open_complaints, self.counter().overdue_complaints), (0, 0))
+
+    def test_answering_a_complaint_counted_overdue_by_the_rebuild(self):
+        first, second = self.create_students(2)
+        counted = self.post_complaint(first, 'AAA111')
+        self.make_overdue(counted)
+        rebuild_counters()
+        self.assertEqual(self.counter().overdue_complaints, 1)
+
+        late = self.post_complaint(second, 'BBB222')
+        self.make_overdue(late)
+        complaint_answered(late, Response(response='No Result'))
+        self.assertEqual(self.counter().overdue_complaints, 1)
+        complaint_answered(counted, Response(response='Result Loaded'))
+        counter = self.counter()
+        self.assertEqual((counter.open_complaints, counter.overdue_complaints), (0, 0))
+        self.assertEqual((counter.no_result_responses, counter.result_loaded_responses), (1, 1))
+
+    def test_sla_change_stops_overdue_decrements_until_the_next_rebuild(self):
+        student, = self.create_students(1)
+        complaint = self.post_complaint(student, 'AAA111')
+        rebuild_counters()
+        # A shorter SLA makes the complaint overdue without the rebuild having counted it
+        self.department.complaint_sla_hours = 1
+        self.department.save()
+        complaint.refresh_from_db()
+        self.make_overdue(complaint)
+        complaint_answered(complaint, Response(response='No Result'))
+        self.assertEqual(self.counter().overdue_complaints, 0)
+
+
+@skipUnless(connection.vendor == 'sqlite', "Plans are read from SQLite's EXPLAIN QUERY PLAN")
+class QueryPlanTests(ComplaintsTestCase):
+    """
+    Every query the hot views run over a seeded dataset keeps seeking an
+    index; a plan that falls back to a full table scan fails here.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.students = cls.create_students(200)
+        now = timezone.now()
+        Complaint.objects.bulk_create([
+            Complaint(
+                complaint_code=f'C{number:05d}', unit_code=cls.other_unit if number % 2 else cls.unit, reg_no=student,
+                academic_year=cls.year, missing_mark='CAT', exam_date=now.date(), description='My CAT mark is missing.',
+                dep_code=cls.department, due_at=now if number % 3 else now + timedelta(days=1),
+            )
+            for number, student in enumerate(cls.students)
+        ])
+        for model, marks in [(Result, {'cat': 20, 'exam': 40}), (NominalRoll, {})]:
+            model.objects.bulk_create([
+                model(unit_code=unit, reg_no=student, academic_year=year, **marks)
+                for student in cls.students for unit in (cls.unit, cls.other_unit) for year in (cls.year, cls.next_year)
+            ])
+        Response.objects.bulk_create([
+            Response(
+                response_code=f'R{number:05d}', responder=cls.lecturer, response='No Result', reg_no=student,
+                unit_code=cls.unit, academic_year=cls.year
+            )
+            for number, student in enumerate(cls.students[:50])
+        ])
+
+    def assertNoTableScan(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            plan = [row[-1] for row in cursor.fetchall()]
+        scans = [step for step in plan if step.startswith('SCAN ') and step != 'SCAN CONSTANT ROW']
+        self.assertEqual(scans, [], f"{sql}\n{plan}")
+
+    def assertSelectsSeek(self, queries):
+        # The database cache counts its whole (small) table before each write to decide on culling
+        cache_table = f'"{settings.CACHES["shared"]["LOCATION"]}"'
+        selects = [
+            query['sql'] for query in queries if query['sql'].startswith('SELECT') and cache_table not in query['sql']
+        ]
+        self.assertTrue(selects)
+        for sql in selects:
+            self.assertNoTableScan(sql)
+
+    def assertViewSeeks(self, name, data=None):
+        # The first request loads the reference tables and the session identity, then the
+        # local cache is dropped so the measured request also runs the cached dashboard queries
+        self.client.get(reverse(name), data)
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(name), data)
+        self.assertEqual(response.status_code, 200)
+        self.assertSelectsSeek(queries)
+
+    def test_complaint_lists(self):
+        self.log_in()
+        for name in ['complaints', 'exam-complaints', 'cod-complaints']:
+            with self.subTest(name):
+                self.assertViewSeeks(name)
+
+    def test_result_lists(self):
+        self.log_in()
+        for data in [{}, {'academic_year': self.year.pk}, {'ordering': 'total'}, {'min_total': 50}]:
+            with self.subTest(**data):
+                self.assertViewSeeks('cod-result', data=data)
+
+    def test_nominal_roll_lists(self):
+        self.log_in()
+        for data in [{}, {'academic_year': self.year.pk}]:
+            with self.subTest(**data):
+                self.assertViewSeeks('cod-nominal-roll', data=data)
+
+    def test_dashboards_and_overdue_lists(self):
+        self.log_in()
+        for name in ['cod-dashboard', 'overdue-lecturer-complaints', 'overdue-student-complaints', 'responses']:
+            with self.subTest(name):
+                self.assertViewSeeks(name)
+
+    def test_post_complaint(self):
+        # Two students who sat the other unit with no complaint or result for it yet: the first warms the
+        # caches, the second is measured
+        students = self.students[0:4:2]
+        Result.objects.filter(reg_no__in=students, unit_code=self.other_unit, academic_year=self.next_year).delete()
+        for student in students:
+            session = self.client.session
+            session['registration_number'] = student.reg_no
+            session.save()
+            self.client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(reverse('post-complaint'), {
+                    'unit_code': self.other_unit.pk, 'academic_year': self.next_year.pk, 'missing_mark': 'CAT',
+                    'description': 'My CAT mark is missing.', 'exam_date': timezone.localdate().isoformat(),
+                })
+            self.assertEqual(response.status_code, 302)
+        self.assertSelectsSeek(queries)
+
+    def test_unit_analytics_marks(self):
+        with CaptureQueriesContext(connection) as queries:
+            load_marks(self.year.pk, dep_code=self.department.pk)
+        self.assertNoTableScan(queries.captured_queries[-1]['sql'])
+
+
+class KeysetCursorTests(ComplaintsTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        Result.objects.bulk_create([
+            Result(unit_code=cls.unit, reg_no=student, academic_year=cls.year, cat=20, exam=number % 70)
+            for number, student in enumerate(cls.create_students(5))
+        ])
+
+    def get_page(self, values, ordering=''):
+        return self.client.get(reverse('cod-result'), {'page_size': 2, 'ordering': ordering, 'cursor': encode_cursor('n', values)})
+
+    def test_cursor_from_a_page_link(self):
+        self.log_in()
+        response = self.get_page(['SCO101', 'COM/B/01-00001/2023', self.year.pk])
+        self.assertEqual([str(result.reg_no) for result in response.context['page']], ['COM/B/01-00002/2023', 'COM/B/01-00003/2023'])
+
+    def test_wrongly_typed_cursor_values_fall_back_to_the_first_page(self):
+        self.log_in()
+        for values, ordering in [
+            (['SCO101', 'COM/B/01-00001/2023', 'not a year'], ''),
+            (['many', 'SCO101', 'COM/B/01-00001/2023', self.year.pk], 'total'),
+            ([[1], 'SCO101', 'COM/B/01-00001/2023', {'pk': 1}], '-total'),
+        ]:
+            response = self.get_page(values, ordering)
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(response.context['page'].has_previous)
+            self.assertEqual(len(response.context['page']), 2)
+
+
+class ListViewQueryTests(ComplaintsTestCase):
+    """List pages join what they print: the query count is the same for 10 rows as for 500."""
+
+    urls = [
+        'complaints', 'exam-complaints', 'cod-complaints', 'result', 'exam-result', 'cod-result',
+        'nominal-roll', 'exam-nominal-roll', 'cod-nominal-roll',
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        students = cls.create_students(1000)
+        due_at = timezone.now() + timedelta(days=1)
+        Complaint.objects.bulk_create([
+            Complaint(
+                complaint_code=f'C{number:05d}', unit_code=cls.unit, reg_no=student, academic_year=cls.year,
+                missing_mark='CAT', exam_date=timezone.localdate(), description='Missing mark', due_at=due_at,
+                dep_code=cls.department,
+            )
+            for number, student in enumerate(students)
+        ])
+        Result.objects.bulk_create([
+            Result(unit_code=cls.unit, reg_no=student, academic_year=cls.year, cat=20, exam=40) for student in students
+        ])
+        NominalRoll.objects.bulk_create([
+            NominalRoll(unit_code=cls.unit, reg_no=student, academic_year=cls.year) for student in students
+        ])
+
+    def setUp(self):
+        cache.clear()
+        self.log_in()
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        for name in self.urls:
+            for params in ({}, {'ordering': '-total'}) if name.endswith('result') else ({},):
+                with self.subTest(name, **params):
+                    # The first request also fills the session and reference caches
+                    self.client.get(reverse(name), {'page_size': 10, **params})
+                    with CaptureQueriesContext(connection) as small:
+                        response = self.client.get(reverse(name), {'page_size': 10, **params})
+                    self.assertEqual(len(response.context['page']), 10)
+                    with self.assertNumQueries(len(small)):
+                        response = self.client.get(reverse(name), {'page_size': 500, **params})
+                    self.assertEqual(len(response.context['page']), 500)
+
+
+class PostComplaintTests(ComplaintsTestCase):
+    def setUp(self):
+        self.student, self.classmate = self.create_students(2)
+        NominalRoll.objects.create(unit_code=self.unit, reg_no=self.student, academic_year=self.year)
+        session = self.client.session
+        session['registration_number'] = self.student.reg_no
+        session.save()
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+
+    def post(self):
+        return self.client.post(reverse('post-complaint'), {
+            'unit_code': self.unit.pk, 'academic_year': self.year.pk, 'missing_mark': 'CAT',
+            'description': 'My CAT mark is missing.', 'exam_date': timezone.localdate().isoformat(),
+        }, follow=True)
+
+    def test_code_taken_by_a_legacy_complaint_is_replaced(self):
+        self.create_complaint(self.classmate, 'ABC123')
+        with mock.patch('complaints.forms.next_code', return_value='ABC123'):
+            response = self.post()
+        self.assertContains(response, 'Complaint posted successfully!')
+        complaint = Complaint.objects.get(reg_no=self.student)
+        self.assertNotEqual(complaint.complaint_code, 'ABC123')
+
+    def test_second_complaint_for_the_same_unit_is_refused(self):
+        self.create_complaint(self.student, 'ABC123')
+        response = self.post()
+        self.assertContains(response, 'A complaint for this unit already exists.')
+        self.assertEqual(Complaint.objects.filter(reg_no=self.student).count(), 1)
+
+
+class LecturerIdentityTests(ComplaintsTestCase):
+    def setUp(self):
+        cache.clear()
+        self.log_in()
+        self.client.get(reverse('cod-dashboard'))
+
+    def get_dashboard(self, later=0):
+        # Another process would start with an empty local cache; the identity version must survive that
+        cache.clear()
+        with mock.patch('complaints.identity.time') as clock:
+            clock.time.return_value = time.time() + later
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse('cod-dashboard'))
+        reloaded = any('WHERE "complaints_lecturer"."username" =' in query['sql'] for query in queries)
+        # The dashboard reads its own version from the shared cache; only the identity version counts here
+        checked = any(version_key(self.lecturer.username) in query['sql'] for query in queries)
+        return response, reloaded, checked
+
+    def test_identity_is_trusted_within_ttl(self):
+        response, reloaded, checked = self.get_dashboard()
+        self.assertFalse(reloaded)
+        self.assertFalse(checked)
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+
+    def test_unchanged_lecturer_is_renewed_after_ttl(self):
+        response, reloaded, checked = self.get_dashboard(later=settings.LECTURER_IDENTITY_TTL + 1)
+        self.assertFalse(reloaded)
+        self.assertTrue(checked)
+        self.assertIn(settings.SESSION_COOKIE_NAME, response.cookies)
+
+    def test_saved_lecturer_is_reloaded_after_ttl(self):
+        self.lecturer.last_name = 'Smith'
+        self.lecturer.save()
+        response, reloaded, _ = self.get_dashboard()
+        self.assertFalse(reloaded)
+        response, reloaded, _ = self.get_dashboard(later=settings.LECTURER_IDENTITY_TTL + 1)
+        self.assertTrue(reloaded)
+        self.assertContains(response, 'Smith')
+
+
+class NotifyOverdueTests(ComplaintsTestCase):
+    def setUp(self):
+        self.colleague = Lecturer.objects.create(
+            lec_no='L2', email_address='asmith@mmust.ac.ke', username='asmith@mmust.ac.ke', first_name='Ann',
+            last_name='Smith', phone_number='0712345678', role='Member', dep_code=self.department
+        )
+        LecturerUnit.objects.create(unit_code=self.other_unit, lec_no=self.colleague, academic_year=self.year, course_code=self.course)
+        first, second, third, fourth, fifth = self.create_students(5)
+        overdue = [
+            self.create_complaint(first, 'AAA111'),
+            self.create_complaint(second, 'BBB222'),
+            self.create_complaint(third, 'CCC333', unit=self.other_unit),
+            self.create_complaint(fourth, 'DDD444'),
+        ]
+        Complaint.objects.filter(pk__in=[complaint.pk for complaint in overdue]).update(due_at=timezone.now() - timedelta(hours=1))
+        # Nobody is assigned to SCO101 for the next year
+        Complaint.objects.filter(pk='DDD444').update(academic_year=self.next_year)
+        self.create_complaint(fifth, 'EEE555')
+
+    def notify(self):
+        out = StringIO()
+        call_command('notify_overdue', rate=0, stdout=out)
+        return out.getvalue()
+
+    def test_one_digest_per_lecturer_with_their_complaints(self):
+        self.notify()
+        digests = {message.to[0]: message for message in mail.outbox}
+        self.assertEqual(sorted(digests), ['asmith@mmust.ac.ke', 'jdoe@mmust.ac.ke'])
+
+        own = digests['jdoe@mmust.ac.ke']
+        self.assertEqual(own.subject, '2 overdue complaint(s) awaiting your response')
+        self.assertIn('[AAA111]', own.body)
+        self.assertIn('[BBB222]', own.body)
+        for code in ['CCC333', 'DDD444', 'EEE555']:
+            self.assertNotIn(code, own.body)
+        self.assertIn('[CCC333]', digests['asmith@mmust.ac.ke'].body)
+        self.assertEqual(
+            dict(OverdueDigest.objects.values_list('lec_no', 'complaint_count')), {'L1': 2, 'L2': 1}
+        )
+
+    def test_rerun_on_the_same_day_sends_nothing(self):
+        self.notify()
+        self.assertIn('Queued 0 overdue complaint digests', self.notify())
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(OverdueDigest.objects.count(), 2)
+
+    def test_next_day_queues_again(self):
+        self.notify()
+        self.assertEqual(queue_overdue_digests(today=timezone.localdate() + timedelta(days=1)), 2)
+
+
+class OutboxExpiryTests(ComplaintsTestCase):
+    def test_message_is_not_retried_past_its_expiry(self):
+        message = enqueue_email('Reset Your Password', 'Link', 'jdoe@mmust.ac.ke', expires_at=timezone.now() + timedelta(minutes=2))
+        message.attempts = 3  # the next retry would be 2 minutes away
+        mark_failed(message, 'Connection refused')
+        message.refresh_from_db()
+        self.assertEqual(message.status, 'Failed')
+
+    def test_message_is_retried_within_its_expiry(self):
+        message = enqueue_email('Reset Your Password', 'Link', 'jdoe@mmust.ac.ke', expires_at=timezone.now() + timedelta(minutes=5))
+        message.attempts = 1
+        mark_failed(message, 'Connection refused')
+        message.refresh_from_db()
+        self.assertEqual(message.status, 'Pending')
+
+    def test_expired_message_is_not_claimed(self):
+        expired = enqueue_email('Reset Your Password', 'Link', 'jdoe@mmust.ac.ke', expires_at=timezone.now())
+        current = enqueue_email('Reset Your Password', 'Link', 'jdoe@mmust.ac.ke')
+        self.assertEqual(claim_batch(10), [current])
+        expired.refresh_from_db()
+        self.assertEqual(expired.status, 'Failed')
+
+    def test_reset_email_expires_with_its_link(self):
+        System_User.objects.create(username='jdoe@mmust.ac.ke', password_hash='unused')
+        self.client.post(reverse('reset-password'), {'username': 'jdoe@mmust.ac.ke'})
+        token = PasswordResetToken.objects.get()
+        self.assertEqual(OutboxMessage.objects.get().expires_at, token.expires_at)
+
+
+@skipUnless(connection.vendor == 'sqlite', "SQLite transaction modes")
+@override_settings(SQLITE_TRANSACTION_MODE='IMMEDIATE', BULK_WRITE_PAUSE=0)
+class WriteLockTests(TransactionTestCase):
+    def test_only_bulk_writes_begin_immediate(self):
+        with CaptureQueriesContext(connection) as queries:
+            with transaction.atomic():
+                AcademicYear.objects.create(academic_year='2023/2024')
+            with write_lock():
+                AcademicYear.objects.create(academic_year='2024/2025')
+            with transaction.atomic():
+                AcademicYear.objects.create(academic_year='2025/2026')
+        begins = [query['sql'] for query in queries if query['sql'].startswith('BEGIN')]
+        self.assertEqual(begins, ['BEGIN', 'BEGIN IMMEDIATE', 'BEGIN'])
+
+    def test_counter_rebuild_reads_under_the_lock(self):
+        # Counts read before BEGIN IMMEDIATE could miss a complaint posted before the counters are replaced
+        with CaptureQueriesContext(connection) as queries:
+            rebuild_counters()
+        statements = [query['sql'] for query in queries]
+        begin = statements.index('BEGIN IMMEDIATE')
+        reads = [index for index, sql in enumerate(statements) if sql.startswith('SELECT')]
+        self.assertTrue(reads)
+        self.assertGreater(min(reads), begin)
+
+    def test_code_reservation_begins_immediate(self):
+        # It reads the sequence row before bumping it; a plain BEGIN could not upgrade to a write
+        with CaptureQueriesContext(connection) as queries:
+            CodeAllocator('complaint').reserve(10)
+        begins = [query['sql'] for query in queries if query['sql'].startswith('BEGIN')]
+        self.assertEqual(begins, ['BEGIN IMMEDIATE'])
+
+
+@skipUnless(REPLICA in settings.DATABASES, "No replica configured")
+class ReplicaRouterTests(TestCase):
+    def assertReadsFrom(self, alias):
+        self.assertEqual(ReplicaRouter().db_for_read(Result), alias)
+        self.assertEqual(Result.objects.all().db, alias)
+
+    def test_reads_in_a_read_only_view_go_to_the_replica(self):
+        # Outside the transaction TestCase wraps each test in, as in a request
+        with mock.patch.object(connection, 'in_atomic_block', False):
+            self.assertReadsFrom('default')
+            with read_from_replica():
+                self.assertReadsFrom(REPLICA)
+                self.assertEqual(ReplicaRouter().db_for_write(Result), 'default')
+        # Inside a transaction on the primary, reads stay there to see its writes
+        with read_from_replica():
+            self.assertReadsFrom('default')
+
+
+@skipUnless(REPLICA in settings.DATABASES, "No replica configured")
+class ReplicaListViewTests(TransactionTestCase):
+    # A TransactionTestCase: under TestCase, the replica (a test mirror of default, on SQLite a second
+    # connection to the same in-memory database) could not read tables the open test transaction wrote to
+    databases = '__all__'
+
+    def setUp(self):
+        department = create_department()
+        course = Course.objects.create(course_code='BCS', course_name='BSc Computer Science', dep_code=department)
+        unit = Unit.objects.create(unit_code='SCO101', unit_name='Introduction', dep_code=department)
+        year = AcademicYear.objects.create(academic_year='2023/2024')
+        lecturer = Lecturer.objects.create(
+            lec_no='L1', email_address='jdoe@mmust.ac.ke', username='jdoe@mmust.ac.ke', first_name='John',
+            last_name='Doe', phone_number='0712345678', role='COD', dep_code=department
+        )
+        LecturerUnit.objects.create(unit_code=unit, lec_no=lecturer, academic_year=year, course_code=course)
+        student = Student.objects.create(
+            reg_no='COM/B/01-00001/2023', username='student1', first_name='Jane', last_name='Roe',
+            email_address='student1@mmust.ac.ke', phone_number='0712345678', course_code=course
+        )
+        Result.objects.create(unit_code=unit, reg_no=student, academic_year=year, cat=20, exam=40)
+
+        cache.clear()
+        self.client.force_login(User.objects.create(username='staff'))
+        session = self.client.session
+        session['username'] = lecturer.username
+        session.save()
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+
+    def test_result_list_reads_from_the_replica(self):
+        with CaptureQueriesContext(connection) as primary, CaptureQueriesContext(connections[REPLICA]) as replica:
+            response = self.client.get(reverse('cod-result'))
+        self.assertEqual(len(response.context['page']), 1)
+        self.assertTrue(any('FROM "complaints_result"' in query['sql'] for query in replica))
+        self.assertFalse(any('FROM "complaints_result"' in query['sql'] for query in primary))
+
+
+class ResultAnalyticsCacheTests(ComplaintsTestCase):
+    def setUp(self):
+        cache.clear()
+        self.students = self.create_students(3)
+        Result.objects.create(unit_code=self.unit, reg_no=self.students[0], academic_year=self.year, cat=20, exam=40)
+
+    def test_upload_in_another_process_reaches_cached_analytics(self):
+        self.assertEqual(result_analytics(self.year.pk, dep_code='CS')['result_count'], 1)
+
+        # The worker uploads with a local cache of its own; only the shared version tells this process
+        with mock.patch('complaints.analytics.cache', LocMemCache('worker', {})):
+            ingest_results(pd.DataFrame({
+                'unit_code': ['SCO101', 'SCO101'],
+                'reg_no': [student.reg_no for student in self.students[1:]],
+                'academic_year': ['2023/2024', '2023/2024'],
+                'cat': ['25', '10'],
+                'exam': ['50', '20'],
+            }), self.lecturer)
+
+        self.assertEqual(result_analytics(self.year.pk, dep_code='CS')['result_count'], 3)
+
+
+class IngestionTests(ComplaintsTestCase):
+    def setUp(self):
+        self.students = self.create_students(3)
+
+    def upload(self, rows, chunksize, **kwargs):
+        lines = ['unit_code,reg_no,academic_year,cat,exam'] + [','.join(row) for row in rows]
+        file = SimpleUploadedFile('results.csv', '\n'.join(lines).encode())
+        return ingest_upload(UploadReader(file, chunksize=chunksize), ingest_results, self.lecturer, **kwargs)
+
+    def test_duplicate_in_a_later_chunk_is_skipped(self):
+        first, second = [student.reg_no for student in self.students[:2]]
+        report = self.upload([
+            ('SCO101', first, '2023/2024', '20', '40'),
+            ('SCO101', second, '2023/2024', '21', '41'),
+            ('SCO101', first, '2023/2024', '25', '50'),
+        ], chunksize=2, replace=True)
+        self.assertEqual((report.processed, report.inserted, report.updated), (3, 2, 0))
+        self.assertEqual(report.skipped, [{
+            'row': 4, 'level': 'warning',
+            'reason': f"Duplicate result for {first} in SCO101 (2023/2024) further up the file.",
+        }])
+        self.assertEqual(Result.objects.get(reg_no=first).cat, 20)
+
+    def results(self, rows, **kwargs):
+        frame = pd.DataFrame(rows, columns=['unit_code', 'reg_no', 'academic_year', 'cat', 'exam'])
+        return ingest_results(frame, self.lecturer, **kwargs)
+
+    def test_rejected_rows_are_skipped_with_their_reason(self):
+        first, second, third = [student.reg_no for student in self.students]
+        report = self.results([
+            ('SCO101', first, '2023/2024', 'abc', '40'),
+            ('SCO101', second, '2023/2024', '12.5', '40'),
+            ('SCO102', third, '2023/2024', '20', '40'),
+            ('SCO101', 'COM/B/01-99999/2023', '2023/2024', '20', '40'),
+            ('SCO101', third, '2023/2024', '31', '40'),
+            ('SCO101', third, '2023/2024', '20', '40'),
+        ])
+        self.assertEqual((report.processed, report.inserted, report.updated, report.rejected), (6, 1, 0, 5))
+        self.assertEqual([(entry['row'], entry['reason']) for entry in report.skipped], [
+            (2, "Invalid numeric value for CAT or exam in unit 'SCO101'."),
+            (3, "Invalid numeric value for CAT or exam in unit 'SCO101'."),
+            (4, "You are not assigned to unit 'SCO102' for 2023/2024."),
+            (5, "Student 'COM/B/01-99999/2023' not found."),
+            (6, f"Invalid CAT mark (31) for student '{third}' in 'SCO101'. Should be between 0-30."),
+        ])
+        self.assertEqual(list(Result.objects.values_list('reg_no', 'cat', 'exam')), [(third, 20, 40)])
+
+    def test_duplicate_further_down_the_frame_is_skipped(self):
+        first = self.students[0].reg_no
+        report = self.results([('SCO101', first, '2023/2024', '20', '40'), ('SCO101', first, '2023/2024', '25', '50')])
+        self.assertEqual((report.inserted, report.rejected), (1, 1))
+        self.assertEqual(report.skipped[0]['level'], 'warning')
+        self.assertEqual(Result.objects.get().cat, 20)
+
+    def test_results_on_record_are_kept_unless_replacing(self):
+        first, second = [student.reg_no for student in self.students[:2]]
+        Result.objects.create(unit_code=self.unit, reg_no=self.students[0], academic_year=self.year, cat=10, exam=10)
+        rows = [('SCO101', first, '2023/2024', '20', '40'), ('SCO101', second, '2023/2024', '21', '41')]
+
+        report = self.results(rows)
+        self.assertEqual((report.inserted, report.updated), (1, 0))
+        self.assertEqual(report.skipped, [{
+            'row': 2, 'level': 'warning', 'reason': f"Result for {first} in SCO101 (2023/2024) already exists.",
+        }])
+
+        report = self.results(rows, replace=True)
+        self.assertEqual((report.inserted, report.updated, report.rejected), (0, 2, 0))
+        self.assertEqual(dict(Result.objects.values_list('reg_no', 'cat')), {first: 20, second: 21})
+
+    def test_rows_dropped_as_conflicts_are_not_counted_as_inserted(self):
+        first, second = [student.reg_no for student in self.students[:2]]
+        # Another upload inserted the first student's row after existing_keys() read the table
+        Result.objects.create(unit_code=self.unit, reg_no=self.students[0], academic_year=self.year, cat=10, exam=10)
+        NominalRoll.objects.create(unit_code=self.unit, reg_no=self.students[0], academic_year=self.year)
+        rows = [('SCO101', first, '2023/2024', '20', '40'), ('SCO101', second, '2023/2024', '21', '41')]
+        with mock.patch('complaints.ingestion.existing_keys', return_value={}):
+            report = self.results(rows)
+            self.assertEqual((report.inserted, report.updated), (1, 0))
+            report = self.results(rows, replace=True)
+            self.assertEqual((report.inserted, report.updated), (0, 2))
+            roll = ingest_nominal_roll(pd.DataFrame([row[:3] for row in rows], columns=['unit_code', 'reg_no', 'academic_year']), self.lecturer)
+            self.assertEqual(roll.inserted, 1)
+        self.assertEqual(NominalRoll.objects.count(), 2)
+
+
+class CodeAllocationTests(ComplaintsTestCase):
+    def test_block_is_not_reserved_inside_a_callers_transaction(self):
+        allocator = CodeAllocator('response')
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                allocator.take()
+        self.assertFalse(CodeSequence.objects.filter(name='response').exists())
+
+    def test_response_code_taken_by_a_legacy_response_is_replaced(self):
+        student, classmate = self.create_students(2)
+        complaint = self.create_complaint(student, 'ABC123')
+        Response.objects.create(
+            response_code='QXD481', responder=self.lecturer, response='No Result', reg_no=classmate,
+            unit_code=self.unit, academic_year=self.year
+        )
+        self.log_in()
+        with mock.patch('complaints.views.next_code', side_effect=['QXD481', 'QXD482']):
+            self.client.post(reverse('cod-response-form', args=[complaint.pk]), {'response': 'No Result', 'cat': '-', 'exam': '-'})
+        self.assertEqual(Response.objects.get(reg_no=student).response_code, 'QXD482')
+        self.assertFalse(Complaint.objects.filter(pk=complaint.pk).exists())
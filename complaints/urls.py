@@ -7,12 +7,14 @@ from .views import (
     COD_LoadResultView, LecturerOverdueComplaintsView, PostComplaint, StudentOverdueComplaintsView, ResponsesView,
     StudentResponsesView, LecturerStudentResponsesView, DeleteResponseView, NominalRollListView, ResultListView,
     Exam_NominalRollListView, Exam_ResultListView, COD_NominalRollListView, COD_ResultListView, ResetPasswordView,
-    ResetPasswordConfirmView
+    ResetPasswordConfirmView, UploadJobStatusView, UploadJobErrorReportView, UnitAutocompleteView,
+    Exam_ResultExportView, COD_NominalRollExportView, ResponsesExportView, Exam_UnitAnalyticsView, COD_UnitAnalyticsView
 )
 
 urlpatterns = [
     path('student/', StudentRegNo.as_view(), name='student'),
     path('post-complaint/', PostComplaint.as_view(), name='post-complaint'),
+    path('post-complaint/units/', UnitAutocompleteView.as_view(), name='unit-autocomplete'),
 
     path('complaints/', ComplaintsView.as_view(), name='complaints'),
     path('exam/complaints/', Exam_ComplaintsView.as_view(), name='exam-complaints'),
@@ -35,13 +37,17 @@ urlpatterns = [
     path('cod/load-result/', COD_LoadResultView.as_view(), name='cod-load-result'),
 
     path('cod/nominal-roll/', COD_NominalRollListView.as_view(), name='cod-nominal-roll'),
+    path('cod/nominal-roll/export/', COD_NominalRollExportView.as_view(), name='cod-nominal-roll-export'),
     path('cod/result/', COD_ResultListView.as_view(), name='cod-result'),
+    path('cod/result/analytics/', COD_UnitAnalyticsView.as_view(), name='cod-result-analytics'),
     
     path('exam/load-nominal-roll/', Exam_LoadNominalRollView.as_view(), name='exam-load-nominal-roll'),
     path('exam/load-result/', Exam_LoadResultView.as_view(), name='exam-load-result'),
     
     path('exam/nominal-roll/', Exam_NominalRollListView.as_view(), name='exam-nominal-roll'),
     path('exam/result/', Exam_ResultListView.as_view(), name='exam-result'),
+    path('exam/result/export/', Exam_ResultExportView.as_view(), name='exam-result-export'),
+    path('exam/result/analytics/', Exam_UnitAnalyticsView.as_view(), name='exam-result-analytics'),
 
     path('load-nominal-roll/', LoadNominalRollView.as_view(), name='load-nominal-roll'),
     path('load-result/', LoadResultView.as_view(), name='load-result'),
@@ -49,10 +55,14 @@ urlpatterns = [
     path('nominal-roll/', NominalRollListView.as_view(), name='nominal-roll'),
     path('result/', ResultListView.as_view(), name='result'),
 
+    path('upload-jobs/<int:job_id>/', UploadJobStatusView.as_view(), name='upload-job-status'),
+    path('upload-jobs/<int:job_id>/errors/', UploadJobErrorReportView.as_view(), name='upload-job-errors'),
+
     path('overdue-lecturer-complaints/', LecturerOverdueComplaintsView.as_view(), name='overdue-lecturer-complaints'),
     path('overdue-student-complaints/', StudentOverdueComplaintsView.as_view(), name='overdue-student-complaints'),
 
     path('responses/', ResponsesView.as_view(), name='responses'),
+    path('responses/export/', ResponsesExportView.as_view(), name='responses-export'),
     path('students/responses/', StudentResponsesView.as_view(), name='student-responses'),
 
     path('student/responses/', LecturerStudentResponsesView.as_view(), name='lecturer-student-responses'),
@@ -1,16 +1,16 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views import View
+from django.http import JsonResponse, FileResponse, Http404
 from django.urls import reverse_lazy, reverse
 from django.contrib.auth import logout  # Import the logout function
 from django.views.generic import DeleteView, ListView, FormView
-from django.conf import settings
-from django.core.mail import send_mail
 from django.utils.crypto import get_random_string
 from django.utils import timezone
-from datetime import timedelta
 
 from django.db import transaction
 from django.db import IntegrityError
+from django.db.models import Exists, OuterRef, Value
+from django.db.models.functions import Concat
 
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
@@ -18,19 +18,30 @@ from django.utils.decorators import method_decorator
 
 import re
 from django.core.exceptions import ValidationError
-import pandas as pd
-import random
-import string
 from django.contrib import messages
 
 from .models import (
 School, Department, Course, Student, Lecturer, Unit, NominalRoll, PasswordResetToken,
-Response, LecturerUnit, Result, Complaint, System_User, AcademicYear
+Response, LecturerUnit, Result, Complaint, System_User, AcademicYear, UploadJob
 )
 
 from .forms import (
-SignUpForm, LoginForm, ResponseForm, PostComplaintForm, UploadFileForm, StudentRegNoForm, PasswordResetForm , ResetForm
+SignUpForm, LoginForm, ResponseForm, PostComplaintForm, UploadFileForm, UploadResultForm, StudentRegNoForm,
+PasswordResetForm , ResetForm, student_units
 )
+from . import refdata
+from .analytics import result_analytics, FLAGS, HISTOGRAM_LABELS
+from .codes import next_code
+from .counters import complaint_posted, complaint_answered
+from .dashboard import dashboard_context, lecturer_complaints, with_assignments, complaints_with_lecturers
+from .exports import ExportMixin
+from .grades import grade_names
+from .identity import remember_lecturer
+from .ingestion import UploadReader, UPLOAD_EXTENSIONS
+from .jobs import enqueue_upload
+from .outbox import enqueue_email
+from .pagination import paginate, KeysetPaginationMixin, COMPLAINT_ORDERING, RECORD_ORDERING, RESULT_TOTAL_ORDERING
+from .routers import ReadReplicaMixin
 
 class SignUpView(View):
     template_name = 'signup.html'
@@ -96,6 +107,7 @@ class LoginView(View):
                     if lecturer is not None:
                         role = lecturer.role
                         request.session['username'] = user.username  # Store username in session
+                        remember_lecturer(request.session, lecturer)  # Spare later requests the lookups
                         if role == "Member":
                             return redirect(reverse('lecturer-dashboard'))
                         elif role == "Exam Officer":
@@ -120,194 +132,57 @@ class LogoutView(View):
         logout(request)  # Use logout directly
         return redirect('login')  # Redirect to the login page or another appropriate page
 
-class Lecturer_DashboardView(View):
+class Lecturer_DashboardView(ReadReplicaMixin, View):
     def get(self, request):
         # Retrieve username from session
         username = request.session.get('username')
         if not username:
             return redirect('login')  # Redirect to login if username is missing
 
-        # Get logged-in lecturer details
-        lecturer = Lecturer.objects.filter(username=username).first()
-        last_name = lecturer.last_name  # Add last name to context
-        user = System_User.objects.get(username=username)
+        # Get logged-in lecturer details, cached in the session at login
+        lecturer = request.lecturer_context.lecturer
         if not lecturer:
             return redirect('login')  # Redirect if no matching lecturer found
 
-        department_name = lecturer.dep_code.dep_name
-
-        # Total students taking courses related to the lecturer's department
-        total_students = Student.objects.filter(
-            course_code__dep_code=lecturer.dep_code
-        ).count()
-
-        # Total lecturers within the same department
-        total_lecturers_in_department = Lecturer.objects.filter(
-            dep_code=lecturer.dep_code
-        ).count()
-
-        # Total units related to the lecturer from LecturerUnit model
-        total_units_for_lecturer = LecturerUnit.objects.filter(
-            lec_no=lecturer.lec_no
-        ).count()
-
-        # Filter complaints related to lecturer's unit codes, academic year, and course codes
-        lecturer_unit_codes = LecturerUnit.objects.filter(
-            lec_no=lecturer.lec_no
-        ).values_list('unit_code', flat=True)
-
-        related_complaints_count = Complaint.objects.filter(
-            unit_code__in=lecturer_unit_codes,
-            academic_year__in=LecturerUnit.objects.filter(lec_no=lecturer).values_list('academic_year', flat=True),
-            reg_no__course_code__in=LecturerUnit.objects.filter(lec_no=lecturer).values_list('course_code', flat=True)
-        ).count()
-
-
-        # Get all LecturerUnit instances for the lecturer
-        units = LecturerUnit.objects.filter(lec_no=lecturer.lec_no)
-
-
-        # Fetch all courses in the lecturer's department
-        courses = Course.objects.filter(dep_code=lecturer.dep_code)
-
-        # Pass calculated counts, units, and courses to the template
-        context = {
-            'total_students': total_students,
-            'total_lecturers_in_department': total_lecturers_in_department,
-            'total_units_for_lecturer': total_units_for_lecturer,
-            'related_complaints_count': related_complaints_count,
-            'last_name': last_name,
-            'user': user,
-            'units': units,
-            'courses': courses,
-            'department_name': department_name,
-        }
+        # Counts, units and courses come from the dashboard cache; a cold cache costs three queries
+        context = dashboard_context(lecturer)
+        context['last_name'] = lecturer.last_name
 
         return render(request, 'lecturer_dashboard.html', context)
 
-class Exam_DashboardView(View):
+class Exam_DashboardView(ReadReplicaMixin, View):
     def get(self, request):
         # Retrieve username from session
         username = request.session.get('username')
         if not username:
             return redirect('login')  # Redirect to login if username is missing
 
-        # Get logged-in lecturer details
-        lecturer = Lecturer.objects.filter(username=username).first()
-        last_name = lecturer.last_name  # Add last name to context
-        user = System_User.objects.get(username=username)
+        # Get logged-in lecturer details, cached in the session at login
+        lecturer = request.lecturer_context.lecturer
         if not lecturer:
             return redirect('login')  # Redirect if no matching lecturer found
 
-        department_name = lecturer.dep_code.dep_name
-
-        # Total students taking courses related to the lecturer's department
-        total_students = Student.objects.filter(
-            course_code__dep_code=lecturer.dep_code
-        ).count()
-
-        # Total lecturers within the same department
-        total_lecturers_in_department = Lecturer.objects.filter(
-            dep_code=lecturer.dep_code
-        ).count()
-
-        # Total units related to the lecturer from LecturerUnit model
-        total_units_for_lecturer = LecturerUnit.objects.filter(
-            lec_no=lecturer.lec_no
-        ).count()
-
-        # Filter complaints related to lecturer's unit codes, academic year, and course codes
-        lecturer_unit_codes = LecturerUnit.objects.filter(
-            lec_no=lecturer.lec_no
-        ).values_list('unit_code', flat=True)
-
-        related_complaints_count = Complaint.objects.filter(
-            unit_code__in=lecturer_unit_codes,
-            academic_year__in=LecturerUnit.objects.filter(lec_no=lecturer).values_list('academic_year', flat=True),
-            reg_no__course_code__in=LecturerUnit.objects.filter(lec_no=lecturer).values_list('course_code', flat=True)
-        ).count()
-
-        # Get all LecturerUnit instances for the lecturer
-        units = LecturerUnit.objects.filter(lec_no=lecturer.lec_no)
-
-        # Fetch all courses in the lecturer's department
-        courses = Course.objects.filter(dep_code=lecturer.dep_code)
-
-        # Pass calculated counts, units, and courses to the template
-        context = {
-            'total_students': total_students,
-            'total_lecturers_in_department': total_lecturers_in_department,
-            'total_units_for_lecturer': total_units_for_lecturer,
-            'related_complaints_count': related_complaints_count,
-            'last_name': last_name,
-            'user': user,
-            'units': units,
-            'courses': courses,
-            'department_name': department_name,
-        }
+        # Counts, units and courses come from the dashboard cache; a cold cache costs three queries
+        context = dashboard_context(lecturer)
+        context['last_name'] = lecturer.last_name
 
         return render(request, 'exam_dashboard.html', context)
 
-class COD_DashboardView(View):
+class COD_DashboardView(ReadReplicaMixin, View):
     def get(self, request):
         # Retrieve username from session
         username = request.session.get('username')
         if not username:
             return redirect('login')  # Redirect to login if username is missing
 
-        # Get logged-in lecturer details
-        lecturer = Lecturer.objects.filter(username=username).first()
-        last_name = lecturer.last_name  # Add last name to context
-        user = System_User.objects.get(username=username)
+        # Get logged-in lecturer details, cached in the session at login
+        lecturer = request.lecturer_context.lecturer
         if not lecturer:
             return redirect('login')  # Redirect if no matching lecturer found
 
-        department_name = lecturer.dep_code.dep_name
-
-        # Total students taking courses related to the lecturer's department
-        total_students = Student.objects.filter(
-            course_code__dep_code=lecturer.dep_code
-        ).count()
-
-        # Total lecturers within the same department
-        total_lecturers_in_department = Lecturer.objects.filter(
-            dep_code=lecturer.dep_code
-        ).count()
-
-        # Total units related to the lecturer from LecturerUnit model
-        total_units_for_lecturer = LecturerUnit.objects.filter(
-            lec_no=lecturer.lec_no
-        ).count()
-
-        # Filter complaints related to lecturer's unit codes, academic year, and course codes
-        lecturer_unit_codes = LecturerUnit.objects.filter(
-            lec_no=lecturer.lec_no
-        ).values_list('unit_code', flat=True)
-
-        related_complaints_count = Complaint.objects.filter(
-            unit_code__in=lecturer_unit_codes,
-            academic_year__in=LecturerUnit.objects.filter(lec_no=lecturer).values_list('academic_year', flat=True),
-            reg_no__course_code__in=LecturerUnit.objects.filter(lec_no=lecturer).values_list('course_code', flat=True)
-        ).count()
-
-        # Get all LecturerUnit instances for the lecturer
-        units = LecturerUnit.objects.filter(lec_no=lecturer.lec_no)
-
-        # Fetch all courses in the lecturer's department
-        courses = Course.objects.filter(dep_code=lecturer.dep_code)
-
-        # Pass calculated counts, units, and courses to the template
-        context = {
-            'total_students': total_students,
-            'total_lecturers_in_department': total_lecturers_in_department,
-            'total_units_for_lecturer': total_units_for_lecturer,
-            'related_complaints_count': related_complaints_count,
-            'last_name': last_name,
-            'user': user,
-            'units': units,
-            'courses': courses,
-            'department_name': department_name,
-        }
+        # Counts, units and courses come from the dashboard cache; a cold cache costs three queries
+        context = dashboard_context(lecturer)
+        context['last_name'] = lecturer.last_name
 
         return render(request, 'cod_dashboard.html', context)
 
@@ -336,6 +211,10 @@ from django.views import View
 from .models import Student, Complaint, NominalRoll, Result
 from .forms import PostComplaintForm
 
+# Fresh codes to try when a new complaint's or response's code is already taken by an older one
+CODE_ATTEMPTS = 5
+
+
 class PostComplaint(View):
     def get(self, request):
         reg_no = request.session.get('registration_number')
@@ -357,38 +236,74 @@ class PostComplaint(View):
         if form.is_valid():
             complaint = form.save(commit=False)
             complaint.reg_no = student
-            complaint.complaint_code = form.generate_complaint_code()
             complaint.exam_date = form.cleaned_data['exam_date']
 
             unit_code = form.cleaned_data['unit_code']
             academic_year = form.cleaned_data['academic_year']
 
+            # Nominal roll and result checks in a single query
+            eligibility = Student.objects.filter(pk=student.pk).annotate(
+                sat_exam=Exists(NominalRoll.objects.filter(
+                    reg_no=OuterRef('pk'), unit_code=unit_code, academic_year=academic_year
+                )),
+                has_result=Exists(Result.objects.filter(
+                    reg_no=OuterRef('pk'), unit_code=unit_code, academic_year=academic_year
+                )),
+            ).values('sat_exam', 'has_result').get()
+
             # Check if the student sat for this unit
-            if not NominalRoll.objects.filter(reg_no=student, unit_code=unit_code, academic_year=academic_year).exists():
+            if not eligibility['sat_exam']:
                 messages.error(request, "You did not sit exam for this particular unit, confirm with your COD or Lecturer.")
                 return render(request, 'post_complaint.html', {'form': form, 'student': student})
 
             # Check if results exist for this unit
-            if Result.objects.filter(reg_no=student, unit_code=unit_code, academic_year=academic_year).exists():
+            if eligibility['has_result']:
                 messages.error(request, "You already have result for this particular unit, confirm with your School Exam Office.")
                 return render(request, 'post_complaint.html', {'form': form, 'student': student})
 
-            # Prevent duplicate complaints
-            if Complaint.objects.filter(reg_no=student, unit_code=unit_code, academic_year=academic_year).exists():
-                messages.error(request, "A complaint for this unit and academic year already exists.")
-                return render(request, 'post_complaint.html', {'form': form, 'student': student})
-
-            try:
-                complaint.save()
-                messages.success(request, "Complaint posted successfully!")
-                return redirect('post-complaint')
-            except IntegrityError:
-                messages.error(request, "Failed to post complaint due to a unique constraint violation.")
+            # Duplicates are left to unique_complaint_per_unit_student, so two concurrent
+            # submissions cannot both pass a check and then both insert
+            for _ in range(CODE_ATTEMPTS):
+                try:
+                    with transaction.atomic():
+                        # The code is the primary key: insert outright rather than UPDATE-then-INSERT
+                        complaint.save(force_insert=True)
+                        complaint_posted(complaint)
+                    messages.success(request, "Complaint posted successfully!")
+                    return redirect('post-complaint')
+                except IntegrityError:
+                    # Codes written before the generator existed can match a generated one;
+                    # that is not the student's duplicate, so draw the next code and retry
+                    if not Complaint.objects.filter(complaint_code=complaint.complaint_code).exists():
+                        break
+                    complaint.complaint_code = next_code('complaint')
+            messages.error(request, "A complaint for this unit already exists.")
+            return render(request, 'post_complaint.html', {'form': form, 'student': student})
 
         messages.error(request, "Failed to post complaint. Please check the details and try again.")
         return render(request, 'post_complaint.html', {'form': form, 'student': student})
 
 
+class UnitAutocompleteView(View):
+    # Units on the signed-in student's nominal roll whose code or name starts with ?q=
+    def get(self, request):
+        reg_no = request.session.get('registration_number')
+        if not reg_no:
+            return JsonResponse({'error': 'Enter your registration number first.'}, status=403)
+
+        academic_year = request.GET.get('academic_year')
+        if academic_year and not academic_year.isdigit():
+            academic_year = None
+        units = student_units(reg_no, academic_year)
+
+        query = request.GET.get('q', '').strip()
+        if query:
+            matches = refdata.units.startswith(query, allowed=units)
+        else:
+            matches = [unit for unit in refdata.units.all() if unit.unit_code in units]
+        return JsonResponse({'units': [{'unit_code': unit.unit_code, 'unit_name': unit.unit_name} for unit in matches]})
+
+
 class ComplaintsView(ListView):
     template_name = 'complaints_list.html'
     context_object_name = 'complaints'
@@ -398,29 +313,19 @@ class ComplaintsView(ListView):
         if not username:
             return redirect('login')  # Redirect to login if username is not in session
 
-        # Retrieve the lecturer based on the username
-        lecturer = get_object_or_404(Lecturer, username=username)
-
-        # Fetch the lecturer's units with academic years and course codes
-        lecturer_units = LecturerUnit.objects.filter(lec_no=lecturer.lec_no)
-
-        # Extract unit codes, course codes, and academic years into sets for optimized querying
-        unit_codes = lecturer_units.values_list('unit_code', flat=True).distinct()
-        academic_years = lecturer_units.values_list('academic_year', flat=True).distinct()
-        course_codes = lecturer_units.values_list('course_code', flat=True).distinct()
+        # The lecturer, loaded once per request by LecturerContextMiddleware
+        lecturer = request.lecturer_context.get_or_404()
 
-        # Fetch student registration numbers associated with the courses taught by the lecturer
-        reg_nos = Student.objects.filter(course_code__in=course_codes).values_list('reg_no', flat=True)
-
-        # Query complaints associated with the lecturer's units, academic years, and student registration numbers
-        complaints = Complaint.objects.filter(
-            reg_no__in=reg_nos,
-            unit_code__in=unit_codes,
-            academic_year__in=academic_years
+        # Complaints matching one of the lecturer's assignments on unit, academic year and student course
+        complaints = lecturer_complaints(lecturer).select_related('reg_no', 'unit_code', 'academic_year').only(
+            # Just the columns the list template shows
+            'complaint_code', 'missing_mark', 'exam_date', 'date',
+            'reg_no__reg_no', 'unit_code__unit_code', 'academic_year__academic_year'
         )
 
-        # Render the complaints in the template
-        return render(request, self.template_name, {'complaints': complaints})
+        # Render one page of complaints in the template
+        page = paginate(request, complaints, COMPLAINT_ORDERING)
+        return render(request, self.template_name, {'complaints': page.object_list, 'page': page})
 
 class Exam_ComplaintsView(ListView):
     template_name = 'exam_complaints_list.html'
@@ -431,29 +336,19 @@ class Exam_ComplaintsView(ListView):
         if not username:
             return redirect('login')  # Redirect to login if username is not in session
 
-        # Retrieve the lecturer based on the username
-        lecturer = get_object_or_404(Lecturer, username=username)
-
-        # Fetch the lecturer's units with academic years and course codes
-        lecturer_units = LecturerUnit.objects.filter(lec_no=lecturer.lec_no)
-
-        # Extract unit codes, course codes, and academic years into sets for optimized querying
-        unit_codes = lecturer_units.values_list('unit_code', flat=True).distinct()
-        academic_years = lecturer_units.values_list('academic_year', flat=True).distinct()
-        course_codes = lecturer_units.values_list('course_code', flat=True).distinct()
+        # The lecturer, loaded once per request by LecturerContextMiddleware
+        lecturer = request.lecturer_context.get_or_404()
 
-        # Fetch student registration numbers associated with the courses taught by the lecturer
-        reg_nos = Student.objects.filter(course_code__in=course_codes).values_list('reg_no', flat=True)
-
-        # Query complaints associated with the lecturer's units, academic years, and student registration numbers
-        complaints = Complaint.objects.filter(
-            reg_no__in=reg_nos,
-            unit_code__in=unit_codes,
-            academic_year__in=academic_years
+        # Complaints matching one of the lecturer's assignments on unit, academic year and student course
+        complaints = lecturer_complaints(lecturer).select_related('reg_no', 'unit_code', 'academic_year').only(
+            # Just the columns the list template shows
+            'complaint_code', 'missing_mark', 'exam_date', 'date',
+            'reg_no__reg_no', 'unit_code__unit_code', 'academic_year__academic_year'
         )
 
-        # Render the complaints in the template
-        return render(request, self.template_name, {'complaints': complaints})
+        # Render one page of complaints in the template
+        page = paginate(request, complaints, COMPLAINT_ORDERING)
+        return render(request, self.template_name, {'complaints': page.object_list, 'page': page})
 
 class COD_ComplaintsView(ListView):
     template_name = 'cod_complaints_list.html'
@@ -464,43 +359,48 @@ class COD_ComplaintsView(ListView):
         if not username:
             return redirect('login')  # Redirect to login if username is not in session
 
-        # Retrieve the lecturer based on the username
-        lecturer = get_object_or_404(Lecturer, username=username)
-
-        # Fetch the lecturer's units with academic years and course codes
-        lecturer_units = LecturerUnit.objects.filter(lec_no=lecturer.lec_no)
-
-        # Extract unit codes, course codes, and academic years into sets for optimized querying
-        unit_codes = lecturer_units.values_list('unit_code', flat=True).distinct()
-        academic_years = lecturer_units.values_list('academic_year', flat=True).distinct()
-        course_codes = lecturer_units.values_list('course_code', flat=True).distinct()
+        # The lecturer, loaded once per request by LecturerContextMiddleware
+        lecturer = request.lecturer_context.get_or_404()
 
-        # Fetch student registration numbers associated with the courses taught by the lecturer
-        reg_nos = Student.objects.filter(course_code__in=course_codes).values_list('reg_no', flat=True)
-
-        # Query complaints associated with the lecturer's units, academic years, and student registration numbers
-        complaints = Complaint.objects.filter(
-            reg_no__in=reg_nos,
-            unit_code__in=unit_codes,
-            academic_year__in=academic_years
+        # Complaints matching one of the lecturer's assignments on unit, academic year and student course
+        complaints = lecturer_complaints(lecturer).select_related('reg_no', 'unit_code', 'academic_year').only(
+            # Just the columns the list template shows
+            'complaint_code', 'missing_mark', 'exam_date', 'date',
+            'reg_no__reg_no', 'unit_code__unit_code', 'academic_year__academic_year'
         )
 
-        # Render the complaints in the template
-        return render(request, self.template_name, {'complaints': complaints})
+        # Render one page of complaints in the template
+        page = paginate(request, complaints, COMPLAINT_ORDERING)
+        return render(request, self.template_name, {'complaints': page.object_list, 'page': page})
+
+
+def answer_complaint(response, complaint):
+    """
+    Save `response` under a new response code, move `complaint` from open to
+    answered in the department counters and delete it, in one transaction.
+    Codes are drawn before the transaction starts, so a rollback cannot hand
+    a reserved block of codes back to CodeSequence. Returns False when the
+    complaint already has a response.
+    """
+    for _ in range(CODE_ATTEMPTS):
+        response.response_code = next_code('response')
+        try:
+            with transaction.atomic():
+                response.save()
+                complaint_answered(complaint, response)
+                complaint.delete()
+            return True
+        except IntegrityError:
+            # As with complaints, a code written before the generator existed may already be taken
+            if not Response.objects.filter(response_code=response.response_code).exists():
+                return False
+    return False
 
 
 class ResponseView(FormView):
     template_name = 'response_form.html'
     form_class = ResponseForm
 
-    def generate_response_code(self):
-        while True:
-            letters = ''.join(random.choices(string.ascii_uppercase, k=3))
-            numbers = ''.join(random.choices(string.digits, k=3))
-            code = letters + numbers
-            if not Response.objects.filter(response_code=code).exists():
-                return code
-
     def dispatch(self, request, *args, **kwargs):
         # Ensure the user is logged in
         username = request.session.get('username')
@@ -523,37 +423,25 @@ class ResponseView(FormView):
     def form_valid(self, form):
         complaint_code = self.kwargs['complaint_code']
         complaint = get_object_or_404(Complaint, complaint_code=complaint_code)
-        username = self.request.session.get('username')
-        lecturer = get_object_or_404(Lecturer, username=username)
+        lecturer = self.request.lecturer_context.get_or_404()
 
         # Check if a response already exists for the given reg_no and unit_code
         if Response.objects.filter(reg_no=complaint.reg_no, unit_code=complaint.unit_code).exists():
             messages.error(self.request, 'A response already exists for this unit and student.')
             return self.form_invalid(form)
 
-        # Wrap save and delete operations in a transaction
-        with transaction.atomic():
-            try:
-                # Create response instance but don't save it yet
-                response = form.save(commit=False)
-                response.response_code = self.generate_response_code()
-                response.responder = lecturer
-                response.reg_no = complaint.reg_no
-                response.academic_year = complaint.academic_year
-                response.unit_code = complaint.unit_code
-                response.date = timezone.now()
-
-                # Attempt to save the response instance
-                response.save()
-
-                # Delete the complaint after saving the response
-                complaint.delete()
+        # Create response instance but don't save it yet
+        response = form.save(commit=False)
+        response.responder = lecturer
+        response.reg_no = complaint.reg_no
+        response.academic_year = complaint.academic_year
+        response.unit_code = complaint.unit_code
+        response.date = timezone.now()
 
-                # Add a success message
-                messages.success(self.request, 'Response saved successfully.')
-            except IntegrityError:
-                messages.error(self.request, 'Error: Response with this unit and registration number already exists.')
-                return self.form_invalid(form)
+        if not answer_complaint(response, complaint):
+            messages.error(self.request, 'Error: Response with this unit and registration number already exists.')
+            return self.form_invalid(form)
+        messages.success(self.request, 'Response saved successfully.')
 
         return redirect(reverse('complaints'))
 
@@ -564,14 +452,6 @@ class Exam_ResponseView(FormView):
     template_name = 'exam_response_form.html'
     form_class = ResponseForm
 
-    def generate_response_code(self):
-        while True:
-            letters = ''.join(random.choices(string.ascii_uppercase, k=3))
-            numbers = ''.join(random.choices(string.digits, k=3))
-            code = letters + numbers
-            if not Response.objects.filter(response_code=code).exists():
-                return code
-
     def dispatch(self, request, *args, **kwargs):
         # Ensure the user is logged in
         username = request.session.get('username')
@@ -594,37 +474,25 @@ class Exam_ResponseView(FormView):
     def form_valid(self, form):
         complaint_code = self.kwargs['complaint_code']
         complaint = get_object_or_404(Complaint, complaint_code=complaint_code)
-        username = self.request.session.get('username')
-        lecturer = get_object_or_404(Lecturer, username=username)
+        lecturer = self.request.lecturer_context.get_or_404()
 
         # Check if a response already exists for the given reg_no and unit_code
         if Response.objects.filter(reg_no=complaint.reg_no, unit_code=complaint.unit_code).exists():
             messages.error(self.request, 'A response already exists for this unit and student.')
             return self.form_invalid(form)
 
-        # Wrap save and delete operations in a transaction
-        with transaction.atomic():
-            try:
-                # Create response instance but don't save it yet
-                response = form.save(commit=False)
-                response.response_code = self.generate_response_code()
-                response.responder = lecturer
-                response.reg_no = complaint.reg_no
-                response.academic_year = complaint.academic_year
-                response.unit_code = complaint.unit_code
-                response.date = timezone.now()
-
-                # Attempt to save the response instance
-                response.save()
-
-                # Delete the complaint after saving the response
-                complaint.delete()
+        # Create response instance but don't save it yet
+        response = form.save(commit=False)
+        response.responder = lecturer
+        response.reg_no = complaint.reg_no
+        response.academic_year = complaint.academic_year
+        response.unit_code = complaint.unit_code
+        response.date = timezone.now()
 
-                # Add a success message
-                messages.success(self.request, 'Response saved successfully.')
-            except IntegrityError:
-                messages.error(self.request, 'Error: Response with this unit and registration number already exists.')
-                return self.form_invalid(form)
+        if not answer_complaint(response, complaint):
+            messages.error(self.request, 'Error: Response with this unit and registration number already exists.')
+            return self.form_invalid(form)
+        messages.success(self.request, 'Response saved successfully.')
 
         return redirect(reverse('exam-complaints'))
 
@@ -635,14 +503,6 @@ class COD_ResponseView(FormView):
     template_name = 'cod_response_form.html'
     form_class = ResponseForm
 
-    def generate_response_code(self):
-        while True:
-            letters = ''.join(random.choices(string.ascii_uppercase, k=3))
-            numbers = ''.join(random.choices(string.digits, k=3))
-            code = letters + numbers
-            if not Response.objects.filter(response_code=code).exists():
-                return code
-
     def dispatch(self, request, *args, **kwargs):
         # Ensure the user is logged in
         username = request.session.get('username')
@@ -665,50 +525,46 @@ class COD_ResponseView(FormView):
     def form_valid(self, form):
         complaint_code = self.kwargs['complaint_code']
         complaint = get_object_or_404(Complaint, complaint_code=complaint_code)
-        username = self.request.session.get('username')
-        lecturer = get_object_or_404(Lecturer, username=username)
+        lecturer = self.request.lecturer_context.get_or_404()
 
         # Check if a response already exists for the given reg_no and unit_code
         if Response.objects.filter(reg_no=complaint.reg_no, unit_code=complaint.unit_code).exists():
             messages.error(self.request, 'A response already exists for this unit and student.')
             return self.form_invalid(form)
 
-        # Wrap save and delete operations in a transaction
-        with transaction.atomic():
-            try:
-                # Create response instance but don't save it yet
-                response = form.save(commit=False)
-                response.response_code = self.generate_response_code()
-                response.responder = lecturer
-                response.reg_no = complaint.reg_no
-                response.academic_year = complaint.academic_year
-                response.unit_code = complaint.unit_code
-                response.date = timezone.now()
-
-                # Attempt to save the response instance
-                response.save()
-
-                # Delete the complaint after saving the response
-                complaint.delete()
+        # Create response instance but don't save it yet
+        response = form.save(commit=False)
+        response.responder = lecturer
+        response.reg_no = complaint.reg_no
+        response.academic_year = complaint.academic_year
+        response.unit_code = complaint.unit_code
+        response.date = timezone.now()
 
-                # Add a success message
-                messages.success(self.request, 'Response saved successfully.')
-            except IntegrityError:
-                messages.error(self.request, 'Error: Response with this unit and registration number already exists.')
-                return self.form_invalid(form)
+        if not answer_complaint(response, complaint):
+            messages.error(self.request, 'Error: Response with this unit and registration number already exists.')
+            return self.form_invalid(form)
+        messages.success(self.request, 'Response saved successfully.')
 
         return redirect(reverse('cod-complaints'))
 
     def form_invalid(self, form):
         return self.render_to_response(self.get_context_data(form=form))
 
+def lecturer_upload_job(request):
+    # The job a load view redirected to after queueing an upload, if it belongs to this lecturer
+    job_id = request.GET.get('job', '')
+    lecturer = request.lecturer_context.lecturer
+    if not job_id.isdigit() or lecturer is None:
+        return None
+    return UploadJob.objects.filter(job_id=job_id, lec_no=lecturer.pk).first()
+
 class LoadNominalRollView(View):
     template_name = 'load_nominal_roll.html'
 
     @method_decorator(login_required)
     def get(self, request):
         form = UploadFileForm()
-        return render(request, self.template_name, {'form': form})
+        return render(request, self.template_name, {'form': form, 'job': lecturer_upload_job(request)})
 
     @method_decorator(login_required)
     def post(self, request):
@@ -717,16 +573,15 @@ class LoadNominalRollView(View):
             file = request.FILES['file']
 
             try:
-                if file.name.endswith('.csv'):
-                    df = pd.read_csv(file)
-                elif file.name.endswith(('.xls', '.xlsx')):
-                    df = pd.read_excel(file)
-                else:
+                if not file.name.endswith(UPLOAD_EXTENSIONS):
                     messages.error(request, "Invalid file format. Upload CSV or Excel file.")
                     return redirect('load-nominal-roll')
 
+                # Stream the sheet in bounded chunks instead of loading it whole
+                reader = UploadReader(file)
+
                 required_columns = {'unit_code', 'reg_no', 'academic_year'}
-                if not required_columns.issubset(df.columns):
+                if not required_columns.issubset(reader.columns):
                     messages.error(request, "Invalid file format. Ensure all required columns are present.")
                     return redirect('load-nominal-roll')
 
@@ -735,54 +590,11 @@ class LoadNominalRollView(View):
                 if not username:
                     return redirect('login')
 
-                lecturer = get_object_or_404(Lecturer, username=username)
-                lec_no = lecturer.lec_no
-
-                # Process each row
-                for _, row in df.iterrows():
-                    unit_code = row['unit_code'].strip()
-                    reg_no = row['reg_no'].strip()
-                    academic_year_name = row['academic_year'].strip()
-
-                    # Ensure unit exists
-                    unit = Unit.objects.filter(unit_code=unit_code).first()
-                    if not unit:
-                        messages.error(request, f"Unit '{unit_code}' not found.")
-                        continue
-
-                    # Ensure student exists
-                    student = Student.objects.filter(reg_no=reg_no).first()
-                    if not student:
-                        messages.error(request, f"Student '{reg_no}' not found.")
-                        continue
-
-                    # Ensure academic year exists
-                    academic_year = AcademicYear.objects.filter(academic_year=academic_year_name).first()
-                    if not academic_year:
-                        messages.error(request, f"Academic year '{academic_year_name}' not found.")
-                        continue
-
-                    # Ensure the lecturer is assigned to the unit in the specified academic year
-                    lecturer_unit = LecturerUnit.objects.filter(
-                        unit_code=unit,
-                        lec_no=lecturer,
-                        academic_year=academic_year
-                    ).first()
-
-                    if not lecturer_unit:
-                        messages.error(request, f"You are not assigned to unit '{unit_code}' for {academic_year_name}.")
-                        continue
-
-                    # Check if the entry already exists
-                    if NominalRoll.objects.filter(unit_code=unit, reg_no=student, academic_year=academic_year).exists():
-                        messages.warning(request, f"Entry for {reg_no} in {unit_code} ({academic_year_name}) already exists.")
-                        continue
-
-                    # Save the nominal roll entry
-                    NominalRoll.objects.create(unit_code=unit, reg_no=student, academic_year=academic_year)
-
-                messages.success(request, "Nominal roll loaded successfully.")
-                return redirect('load-nominal-roll')
+                lecturer = request.lecturer_context.get_or_404()
+                # Hand the file to the upload workers; the page polls the job for progress
+                job = enqueue_upload('Nominal Roll', lecturer, file)
+                messages.success(request, f"Nominal roll queued for processing as job #{job.job_id}.")
+                return redirect(f"{reverse('load-nominal-roll')}?job={job.job_id}")
 
             except Exception as e:
                 messages.error(request, f"Error processing file: {e}")
@@ -795,7 +607,6 @@ from django.contrib import messages
 from django.utils.decorators import method_decorator
 from django.contrib.auth.decorators import login_required
 from django.views import View
-import pandas as pd
 from .forms import UploadFileForm
 from .models import Lecturer, LecturerUnit, Unit, Student, AcademicYear, Result
 
@@ -804,26 +615,25 @@ class LoadResultView(View):
 
     @method_decorator(login_required)
     def get(self, request):
-        form = UploadFileForm()
-        return render(request, self.template_name, {'form': form})
+        form = UploadResultForm()
+        return render(request, self.template_name, {'form': form, 'job': lecturer_upload_job(request)})
 
     @method_decorator(login_required)
     def post(self, request):
-        form = UploadFileForm(request.POST, request.FILES)
+        form = UploadResultForm(request.POST, request.FILES)
         if form.is_valid():
             file = request.FILES['file']
 
             try:
-                if file.name.endswith('.csv'):
-                    df = pd.read_csv(file)
-                elif file.name.endswith(('.xls', '.xlsx')):
-                    df = pd.read_excel(file)
-                else:
+                if not file.name.endswith(UPLOAD_EXTENSIONS):
                     messages.error(request, "Invalid file format. Upload CSV or Excel file.")
                     return redirect('load-result')
 
+                # Stream the sheet in bounded chunks instead of loading it whole
+                reader = UploadReader(file)
+
                 required_columns = {'unit_code', 'reg_no', 'academic_year', 'cat', 'exam'}
-                if not required_columns.issubset(df.columns):
+                if not required_columns.issubset(reader.columns):
                     messages.error(request, "Invalid file format. Ensure all required columns are present.")
                     return redirect('load-result')
 
@@ -831,98 +641,63 @@ class LoadResultView(View):
                 if not username:
                     return redirect('login')
 
-                lecturer = get_object_or_404(Lecturer, username=username)
-                lec_no = lecturer.lec_no
-
-                for _, row in df.iterrows():
-                    try:
-                        unit_code = row['unit_code'].strip()
-                        reg_no = row['reg_no'].strip()
-                        academic_year_name = row['academic_year'].strip()
-
-                        unit = Unit.objects.filter(unit_code=unit_code).first()
-                        if not unit:
-                            messages.error(request, f"Unit '{unit_code}' not found.")
-                            continue
-
-                        student = Student.objects.filter(reg_no=reg_no).first()
-                        if not student:
-                            messages.error(request, f"Student '{reg_no}' not found.")
-                            continue
-
-                        academic_year = AcademicYear.objects.filter(academic_year=academic_year_name).first()
-                        if not academic_year:
-                            messages.error(request, f"Academic year '{academic_year_name}' not found.")
-                            continue
-
-                        lecturer_unit = LecturerUnit.objects.filter(
-                            unit_code=unit,
-                            lec_no=lecturer,
-                            academic_year=academic_year
-                        ).first()
-
-                        if not lecturer_unit:
-                            messages.error(request, f"You are not assigned to unit '{unit_code}' for {academic_year_name}.")
-                            continue
-
-                        try:
-                            cat = int(row['cat'])
-                            exam = int(row['exam'])
-                        except ValueError:
-                            messages.error(request, f"Invalid numeric value for CAT or exam in unit '{unit_code}'.")
-                            continue
-
-                        if not (0 <= cat <= 30):
-                            messages.error(request, f"Invalid CAT mark ({cat}) for student '{reg_no}' in '{unit_code}'. Should be between 0-30.")
-                            continue
-                        if not (0 <= exam <= 70):
-                            messages.error(request, f"Invalid exam mark ({exam}) for student '{reg_no}' in '{unit_code}'. Should be between 0-70.")
-                            continue
-
-                        if Result.objects.filter(unit_code=unit, reg_no=student, academic_year=academic_year).exists():
-                            messages.warning(request, f"Result for {reg_no} in {unit_code} ({academic_year_name}) already exists.")
-                            continue
-
-                        Result.objects.create(
-                            unit_code=unit,
-                            reg_no=student,
-                            academic_year=academic_year,
-                            cat=cat,
-                            exam=exam
-                        )
-
-                    except Exception as e:
-                        messages.error(request, f"Error processing row: {e}")
-
-                messages.success(request, "Results loaded successfully.")
-                return redirect('load-result')
+                lecturer = request.lecturer_context.get_or_404()
+                # Hand the file to the upload workers; the page polls the job for progress
+                job = enqueue_upload('Result', lecturer, file, form.cleaned_data['replace_existing'])
+                messages.success(request, f"Results queued for processing as job #{job.job_id}.")
+                return redirect(f"{reverse('load-result')}?job={job.job_id}")
 
             except Exception as e:
                 messages.error(request, f"Error processing file: {e}")
 
         return render(request, self.template_name, {'form': form})
 
-class ResultListView(ListView):
+class ResultTotalsMixin:
+    """
+    For the result lists: annotate each result's total and grade, filter by
+    ?min_total= and ?grade=, and order by total with ?ordering=total or
+    ?ordering=-total. All of it runs in the database on result_total_idx.
+    """
+
+    def filter_totals(self, results):
+        results = results.with_totals()
+
+        min_total = self.request.GET.get('min_total')
+        if min_total:
+            try:
+                results = results.filter(total__gte=int(min_total))
+            except ValueError:
+                pass
+
+        grade = self.request.GET.get('grade')
+        if grade:
+            results = results.in_grade(grade)
+        return results
+
+    def get_keyset_ordering(self):
+        ordering = self.request.GET.get('ordering')
+        if ordering == 'total':
+            return RESULT_TOTAL_ORDERING
+        if ordering == '-total':
+            return tuple(f'-{field}' for field in RESULT_TOTAL_ORDERING)
+        return self.keyset_ordering
+
+class ResultListView(ReadReplicaMixin, ResultTotalsMixin, KeysetPaginationMixin, ListView):
+    keyset_ordering = RECORD_ORDERING
     model = Result
     template_name = 'result_list.html'
     context_object_name = 'results'
 
     def get_queryset(self):
-        username = self.request.session.get('username')
-        lecturer = get_object_or_404(Lecturer, username=username)
-
-        # Get unit codes assigned to the lecturer
-        lecturer_units = LecturerUnit.objects.filter(lec_no=lecturer)
+        self.request.lecturer_context.get_or_404()
 
         # Get filter parameters
         academic_year_id = self.request.GET.get('academic_year')
         reg_no = self.request.GET.get('reg_no')
         unit_code = self.request.GET.get('unit_code')
 
-        if academic_year_id:
-            lecturer_units = lecturer_units.filter(academic_year_id=academic_year_id)
-
-        unit_codes = lecturer_units.values_list('unit_code', flat=True)
+        # Get unit codes assigned to the lecturer, for the chosen academic year if any
+        unit_codes = self.request.lecturer_context.unit_codes(academic_year_id)
 
         # Filter results based on lecturer's assigned units
         results = Result.objects.filter(unit_code__in=unit_codes)
@@ -936,35 +711,37 @@ class ResultListView(ListView):
         if unit_code:
             results = results.filter(unit_code__unit_code__icontains=unit_code)
 
-        return results
+        # Totals, grade and the ?min_total= / ?grade= filters are evaluated by the database
+        results = self.filter_totals(results)
+
+        # Join the related rows the template prints instead of fetching them one by one
+        return results.select_related('reg_no', 'unit_code', 'academic_year').only(
+            'cat', 'exam', 'reg_no__reg_no', 'unit_code__unit_code', 'academic_year__academic_year'
+        )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["academic_years"] = AcademicYear.objects.all()
+        context["academic_years"] = refdata.academic_years.all()
+        context["grades"] = grade_names()
         return context
 
 
-class NominalRollListView(ListView):
+class NominalRollListView(ReadReplicaMixin, KeysetPaginationMixin, ListView):
+    keyset_ordering = RECORD_ORDERING
     model = NominalRoll
     template_name = 'nominal_roll_list.html'
     context_object_name = 'nominal_rolls'
 
     def get_queryset(self):
-        username = self.request.session.get('username')
-        lecturer = get_object_or_404(Lecturer, username=username)
+        self.request.lecturer_context.get_or_404()
 
         # Get the academic year filter from the request
         academic_year_id = self.request.GET.get('academic_year')
         reg_no = self.request.GET.get('reg_no')
         unit_code = self.request.GET.get('unit_code')
 
-        # Get unit codes assigned to the lecturer
-        lecturer_units = LecturerUnit.objects.filter(lec_no=lecturer)
-
-        if academic_year_id:
-            lecturer_units = lecturer_units.filter(academic_year_id=academic_year_id)
-
-        unit_codes = lecturer_units.values_list('unit_code', flat=True)
+        # Get unit codes assigned to the lecturer, for the chosen academic year if any
+        unit_codes = self.request.lecturer_context.unit_codes(academic_year_id)
 
         # Filter nominal roll based on lecturer's assigned units
         nominal_rolls = NominalRoll.objects.filter(unit_code__in=unit_codes)
@@ -978,11 +755,14 @@ class NominalRollListView(ListView):
         if unit_code:
             nominal_rolls = nominal_rolls.filter(unit_code__unit_code__icontains=unit_code)
 
-        return nominal_rolls
+        # Join the related rows the template prints instead of fetching them one by one
+        return nominal_rolls.select_related('reg_no', 'unit_code', 'academic_year').only(
+            'date', 'reg_no__reg_no', 'unit_code__unit_code', 'academic_year__academic_year'
+        )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["academic_years"] = AcademicYear.objects.all()
+        context["academic_years"] = refdata.academic_years.all()
         return context
 
 
@@ -992,7 +772,7 @@ class Exam_LoadNominalRollView(View):
     @method_decorator(login_required)
     def get(self, request):
         form = UploadFileForm()
-        return render(request, self.template_name, {'form': form})
+        return render(request, self.template_name, {'form': form, 'job': lecturer_upload_job(request)})
 
     @method_decorator(login_required)
     def post(self, request):
@@ -1001,16 +781,15 @@ class Exam_LoadNominalRollView(View):
             file = request.FILES['file']
 
             try:
-                if file.name.endswith('.csv'):
-                    df = pd.read_csv(file)
-                elif file.name.endswith(('.xls', '.xlsx')):
-                    df = pd.read_excel(file)
-                else:
+                if not file.name.endswith(UPLOAD_EXTENSIONS):
                     messages.error(request, "Invalid file format. Upload CSV or Excel file.")
                     return redirect('exam-load-nominal-roll')
 
+                # Stream the sheet in bounded chunks instead of loading it whole
+                reader = UploadReader(file)
+
                 required_columns = {'unit_code', 'reg_no', 'academic_year'}
-                if not required_columns.issubset(df.columns):
+                if not required_columns.issubset(reader.columns):
                     messages.error(request, "Invalid file format. Ensure all required columns are present.")
                     return redirect('exam-load-nominal-roll')
 
@@ -1018,47 +797,11 @@ class Exam_LoadNominalRollView(View):
                 if not username:
                     return redirect('login')
 
-                lecturer = get_object_or_404(Lecturer, username=username)
-                lec_no = lecturer.lec_no
-
-                for _, row in df.iterrows():
-                    unit_code = row['unit_code'].strip()
-                    reg_no = row['reg_no'].strip()
-                    academic_year_name = row['academic_year'].strip()
-
-                    unit = Unit.objects.filter(unit_code=unit_code).first()
-                    if not unit:
-                        messages.error(request, f"Unit '{unit_code}' not found.")
-                        continue
-
-                    student = Student.objects.filter(reg_no=reg_no).first()
-                    if not student:
-                        messages.error(request, f"Student '{reg_no}' not found.")
-                        continue
-
-                    academic_year = AcademicYear.objects.filter(academic_year=academic_year_name).first()
-                    if not academic_year:
-                        messages.error(request, f"Academic year '{academic_year_name}' not found.")
-                        continue
-
-                    lecturer_unit = LecturerUnit.objects.filter(
-                        unit_code=unit,
-                        lec_no=lecturer,
-                        academic_year=academic_year
-                    ).first()
-
-                    if not lecturer_unit:
-                        messages.error(request, f"You are not assigned to unit '{unit_code}' for {academic_year_name}.")
-                        continue
-
-                    if NominalRoll.objects.filter(unit_code=unit, reg_no=student, academic_year=academic_year).exists():
-                        messages.warning(request, f"Entry for {reg_no} in {unit_code} ({academic_year_name}) already exists.")
-                        continue
-
-                    NominalRoll.objects.create(unit_code=unit, reg_no=student, academic_year=academic_year)
-
-                messages.success(request, "Nominal roll loaded successfully.")
-                return redirect('exam-load-nominal-roll')
+                lecturer = request.lecturer_context.get_or_404()
+                # Hand the file to the upload workers; the page polls the job for progress
+                job = enqueue_upload('Nominal Roll', lecturer, file)
+                messages.success(request, f"Nominal roll queued for processing as job #{job.job_id}.")
+                return redirect(f"{reverse('exam-load-nominal-roll')}?job={job.job_id}")
 
             except Exception as e:
                 messages.error(request, f"Error processing file: {e}")
@@ -1071,26 +814,25 @@ class Exam_LoadResultView(View):
 
     @method_decorator(login_required)
     def get(self, request):
-        form = UploadFileForm()
-        return render(request, self.template_name, {'form': form})
+        form = UploadResultForm()
+        return render(request, self.template_name, {'form': form, 'job': lecturer_upload_job(request)})
 
     @method_decorator(login_required)
     def post(self, request):
-        form = UploadFileForm(request.POST, request.FILES)
+        form = UploadResultForm(request.POST, request.FILES)
         if form.is_valid():
             file = request.FILES['file']
 
             try:
-                if file.name.endswith('.csv'):
-                    df = pd.read_csv(file)
-                elif file.name.endswith(('.xls', '.xlsx')):
-                    df = pd.read_excel(file)
-                else:
+                if not file.name.endswith(UPLOAD_EXTENSIONS):
                     messages.error(request, "Invalid file format. Upload CSV or Excel file.")
                     return redirect('exam-load-result')
 
+                # Stream the sheet in bounded chunks instead of loading it whole
+                reader = UploadReader(file)
+
                 required_columns = {'unit_code', 'reg_no', 'academic_year', 'cat', 'exam'}
-                if not required_columns.issubset(df.columns):
+                if not required_columns.issubset(reader.columns):
                     messages.error(request, "Invalid file format. Ensure all required columns are present.")
                     return redirect('exam-load-result')
 
@@ -1098,98 +840,33 @@ class Exam_LoadResultView(View):
                 if not username:
                     return redirect('login')
 
-                lecturer = get_object_or_404(Lecturer, username=username)
-                lec_no = lecturer.lec_no
-
-                for _, row in df.iterrows():
-                    try:
-                        unit_code = row['unit_code'].strip()
-                        reg_no = row['reg_no'].strip()
-                        academic_year_name = row['academic_year'].strip()
-
-                        unit = Unit.objects.filter(unit_code=unit_code).first()
-                        if not unit:
-                            messages.error(request, f"Unit '{unit_code}' not found.")
-                            continue
-
-                        student = Student.objects.filter(reg_no=reg_no).first()
-                        if not student:
-                            messages.error(request, f"Student '{reg_no}' not found.")
-                            continue
-
-                        academic_year = AcademicYear.objects.filter(academic_year=academic_year_name).first()
-                        if not academic_year:
-                            messages.error(request, f"Academic year '{academic_year_name}' not found.")
-                            continue
-
-                        lecturer_unit = LecturerUnit.objects.filter(
-                            unit_code=unit,
-                            lec_no=lecturer,
-                            academic_year=academic_year
-                        ).first()
-
-                        if not lecturer_unit:
-                            messages.error(request, f"You are not assigned to unit '{unit_code}' for {academic_year_name}.")
-                            continue
-
-                        try:
-                            cat = int(row['cat'])
-                            exam = int(row['exam'])
-                        except ValueError:
-                            messages.error(request, f"Invalid numeric value for CAT or exam in unit '{unit_code}'.")
-                            continue
-
-                        if not (0 <= cat <= 30):
-                            messages.error(request, f"Invalid CAT mark ({cat}) for student '{reg_no}' in '{unit_code}'. Should be between 0-30.")
-                            continue
-                        if not (0 <= exam <= 70):
-                            messages.error(request, f"Invalid exam mark ({exam}) for student '{reg_no}' in '{unit_code}'. Should be between 0-70.")
-                            continue
-
-                        if Result.objects.filter(unit_code=unit, reg_no=student, academic_year=academic_year).exists():
-                            messages.warning(request, f"Result for {reg_no} in {unit_code} ({academic_year_name}) already exists.")
-                            continue
-
-                        Result.objects.create(
-                            unit_code=unit,
-                            reg_no=student,
-                            academic_year=academic_year,
-                            cat=cat,
-                            exam=exam
-                        )
-
-                    except Exception as e:
-                        messages.error(request, f"Error processing row: {e}")
-
-                messages.success(request, "Results loaded successfully.")
-                return redirect('exam-load-result')
+                lecturer = request.lecturer_context.get_or_404()
+                # Hand the file to the upload workers; the page polls the job for progress
+                job = enqueue_upload('Result', lecturer, file, form.cleaned_data['replace_existing'])
+                messages.success(request, f"Results queued for processing as job #{job.job_id}.")
+                return redirect(f"{reverse('exam-load-result')}?job={job.job_id}")
 
             except Exception as e:
                 messages.error(request, f"Error processing file: {e}")
 
         return render(request, self.template_name, {'form': form})
 
-class Exam_ResultListView(ListView):
+class Exam_ResultListView(ReadReplicaMixin, ResultTotalsMixin, KeysetPaginationMixin, ListView):
+    keyset_ordering = RECORD_ORDERING
     model = Result
-    template_name = 'cod_result_list.html'
+    template_name = 'exam_result_list.html'
     context_object_name = 'results'
 
     def get_queryset(self):
-        username = self.request.session.get('username')
-        lecturer = get_object_or_404(Lecturer, username=username)
-
-        # Get unit codes assigned to the lecturer
-        lecturer_units = LecturerUnit.objects.filter(lec_no=lecturer)
+        self.request.lecturer_context.get_or_404()
 
         # Get filter parameters
         academic_year_id = self.request.GET.get('academic_year')
         reg_no = self.request.GET.get('reg_no')
         unit_code = self.request.GET.get('unit_code')
 
-        if academic_year_id:
-            lecturer_units = lecturer_units.filter(academic_year_id=academic_year_id)
-
-        unit_codes = lecturer_units.values_list('unit_code', flat=True)
+        # Get unit codes assigned to the lecturer, for the chosen academic year if any
+        unit_codes = self.request.lecturer_context.unit_codes(academic_year_id)
 
         # Filter results based on lecturer's assigned units
         results = Result.objects.filter(unit_code__in=unit_codes)
@@ -1203,34 +880,112 @@ class Exam_ResultListView(ListView):
         if unit_code:
             results = results.filter(unit_code__unit_code__icontains=unit_code)
 
-        return results
+        # Totals, grade and the ?min_total= / ?grade= filters are evaluated by the database
+        results = self.filter_totals(results)
+
+        # Join the related rows the template prints instead of fetching them one by one
+        return results.select_related('reg_no', 'unit_code', 'academic_year').only(
+            'cat', 'exam', 'reg_no__reg_no', 'unit_code__unit_code', 'academic_year__academic_year'
+        )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["academic_years"] = AcademicYear.objects.all()
+        context["academic_years"] = refdata.academic_years.all()
+        context["grades"] = grade_names()
+        return context
+
+class Exam_ResultExportView(ExportMixin, Exam_ResultListView):
+    # The results table as filtered on the page, as CSV or XLSX
+    export_filename = 'results'
+    export_ordering = RECORD_ORDERING
+    export_columns = (
+        ('Reg No', 'reg_no'),
+        ('Unit Code', 'unit_code'),
+        ('Academic Year', 'academic_year__academic_year'),
+        ('CAT', 'cat'),
+        ('Exam', 'exam'),
+        ('Total', 'total'),
+        ('Grade', 'grade'),
+    )
+
+    def get_export_ordering(self):
+        return self.get_keyset_ordering()
+
+class UnitAnalyticsMixin:
+    """
+    Per-unit mean, median, standard deviation, pass rate, histograms and
+    flagged marks for one academic year (?academic_year=, the latest by
+    default), from analytics.result_analytics. get_scope picks whose units.
+    """
+    template_name = None
+
+    def get_scope(self, lecturer):
+        # The lecturer's own department
+        return {'dep_code': lecturer.dep_code_id}
+
+    def get_academic_year(self):
+        # ?academic_year= when it names a year, otherwise the latest one
+        academic_year_id = self.request.GET.get('academic_year', '')
+        if academic_year_id.isdigit() and refdata.academic_years.get(int(academic_year_id)):
+            return refdata.academic_years.get(int(academic_year_id))
+        academic_years = refdata.academic_years.all()
+        return academic_years[-1] if academic_years else None
+
+    def get_context_data(self, lecturer):
+        academic_year = self.get_academic_year()
+        context = {
+            'academic_years': refdata.academic_years.all(),
+            'academic_year': academic_year,
+            'histogram_labels': HISTOGRAM_LABELS,
+            'grades': grade_names(),
+            'flag_labels': list(FLAGS.values()),
+            'units': [],
+        }
+        if academic_year is not None:
+            context.update(result_analytics(academic_year.pk, **self.get_scope(lecturer)))
+        for unit in context['units']:
+            unit['unit_name'] = getattr(refdata.units.get(unit['unit_code']), 'unit_name', '')
+        return context
+
+    def get(self, request):
+        lecturer = request.lecturer_context.get_or_404()
+        return render(request, self.template_name, self.get_context_data(lecturer))
+
+class Exam_UnitAnalyticsView(ReadReplicaMixin, UnitAnalyticsMixin, View):
+    template_name = 'exam_analytics.html'
+
+    def school_departments(self, lecturer):
+        school_code = refdata.departments.get(lecturer.dep_code_id).school_code_id
+        return [department for department in refdata.departments.all() if department.school_code_id == school_code]
+
+    def get_scope(self, lecturer):
+        # The whole school (faculty) by default; ?department= narrows it to one of the school's departments
+        department = refdata.departments.get(self.request.GET.get('department'))
+        if department in self.school_departments(lecturer):
+            return {'dep_code': department.pk}
+        return {'school_code': refdata.departments.get(lecturer.dep_code_id).school_code_id}
+
+    def get_context_data(self, lecturer):
+        context = super().get_context_data(lecturer)
+        context['departments'] = self.school_departments(lecturer)
         return context
 
-class Exam_NominalRollListView(ListView):
+class Exam_NominalRollListView(ReadReplicaMixin, KeysetPaginationMixin, ListView):
+    keyset_ordering = RECORD_ORDERING
     model = NominalRoll
     template_name = 'exam_nominal_roll_list.html'
     context_object_name = 'nominal_rolls'
 
     def get_queryset(self):
-        username = self.request.session.get('username')
-        lecturer = get_object_or_404(Lecturer, username=username)
+        self.request.lecturer_context.get_or_404()
 
         # Get the academic year filter from the request
         academic_year_id = self.request.GET.get('academic_year')
         reg_no = self.request.GET.get('reg_no')
         unit_code = self.request.GET.get('unit_code')
 
-        # Get unit codes assigned to the lecturer
-        lecturer_units = LecturerUnit.objects.filter(lec_no=lecturer)
-
-        if academic_year_id:
-            lecturer_units = lecturer_units.filter(academic_year_id=academic_year_id)
-
-        unit_codes = lecturer_units.values_list('unit_code', flat=True)
+        # Get unit codes assigned to the lecturer, for the chosen academic year if any
+        unit_codes = self.request.lecturer_context.unit_codes(academic_year_id)
 
         # Filter nominal roll based on lecturer's assigned units
         nominal_rolls = NominalRoll.objects.filter(unit_code__in=unit_codes)
@@ -1244,11 +999,14 @@ class Exam_NominalRollListView(ListView):
         if unit_code:
             nominal_rolls = nominal_rolls.filter(unit_code__unit_code__icontains=unit_code)
 
-        return nominal_rolls
+        # Join the related rows the template prints instead of fetching them one by one
+        return nominal_rolls.select_related('reg_no', 'unit_code', 'academic_year').only(
+            'date', 'reg_no__reg_no', 'unit_code__unit_code', 'academic_year__academic_year'
+        )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["academic_years"] = AcademicYear.objects.all()
+        context["academic_years"] = refdata.academic_years.all()
         return context
 
 
@@ -1258,7 +1016,7 @@ class COD_LoadNominalRollView(View):
     @method_decorator(login_required)
     def get(self, request):
         form = UploadFileForm()
-        return render(request, self.template_name, {'form': form})
+        return render(request, self.template_name, {'form': form, 'job': lecturer_upload_job(request)})
 
     @method_decorator(login_required)
     def post(self, request):
@@ -1267,16 +1025,15 @@ class COD_LoadNominalRollView(View):
             file = request.FILES['file']
             
             try:
-                if file.name.endswith('.csv'):
-                    df = pd.read_csv(file)
-                elif file.name.endswith(('.xls', '.xlsx')):
-                    df = pd.read_excel(file)
-                else:
+                if not file.name.endswith(UPLOAD_EXTENSIONS):
                     messages.error(request, "Invalid file format. Upload CSV or Excel file.")
                     return redirect('cod-load-nominal-roll')
 
+                # Stream the sheet in bounded chunks instead of loading it whole
+                reader = UploadReader(file)
+
                 required_columns = {'unit_code', 'reg_no', 'academic_year'}
-                if not required_columns.issubset(df.columns):
+                if not required_columns.issubset(reader.columns):
                     messages.error(request, "Invalid file format. Ensure all required columns are present.")
                     return redirect('cod-load-nominal-roll')
 
@@ -1285,54 +1042,11 @@ class COD_LoadNominalRollView(View):
                 if not username:
                     return redirect('login')
 
-                lecturer = get_object_or_404(Lecturer, username=username)
-                lec_no = lecturer.lec_no
-
-                # Process each row
-                for _, row in df.iterrows():
-                    unit_code = row['unit_code'].strip()
-                    reg_no = row['reg_no'].strip()
-                    academic_year_name = row['academic_year'].strip()
-
-                    # Ensure unit exists
-                    unit = Unit.objects.filter(unit_code=unit_code).first()
-                    if not unit:
-                        messages.error(request, f"Unit '{unit_code}' not found.")
-                        continue
-
-                    # Ensure student exists
-                    student = Student.objects.filter(reg_no=reg_no).first()
-                    if not student:
-                        messages.error(request, f"Student '{reg_no}' not found.")
-                        continue
-
-                    # Ensure academic year exists
-                    academic_year = AcademicYear.objects.filter(academic_year=academic_year_name).first()
-                    if not academic_year:
-                        messages.error(request, f"Academic year '{academic_year_name}' not found.")
-                        continue
-
-                    # Ensure the lecturer is assigned to the unit in the specified academic year
-                    lecturer_unit = LecturerUnit.objects.filter(
-                        unit_code=unit,
-                        lec_no=lecturer,
-                        academic_year=academic_year
-                    ).first()
-
-                    if not lecturer_unit:
-                        messages.error(request, f"You are not assigned to unit '{unit_code}' for {academic_year_name}.")
-                        continue
-
-                    # Check if the entry already exists
-                    if NominalRoll.objects.filter(unit_code=unit, reg_no=student, academic_year=academic_year).exists():
-                        messages.warning(request, f"Entry for {reg_no} in {unit_code} ({academic_year_name}) already exists.")
-                        continue
-
-                    # Save the nominal roll entry
-                    NominalRoll.objects.create(unit_code=unit, reg_no=student, academic_year=academic_year)
-                
-                messages.success(request, "Nominal roll loaded successfully.")
-                return redirect('cod-load-nominal-roll')
+                lecturer = request.lecturer_context.get_or_404()
+                # Hand the file to the upload workers; the page polls the job for progress
+                job = enqueue_upload('Nominal Roll', lecturer, file)
+                messages.success(request, f"Nominal roll queued for processing as job #{job.job_id}.")
+                return redirect(f"{reverse('cod-load-nominal-roll')}?job={job.job_id}")
 
             except Exception as e:
                 messages.error(request, f"Error processing file: {e}")
@@ -1344,26 +1058,25 @@ class COD_LoadResultView(View):
 
     @method_decorator(login_required)
     def get(self, request):
-        form = UploadFileForm()
-        return render(request, self.template_name, {'form': form})
+        form = UploadResultForm()
+        return render(request, self.template_name, {'form': form, 'job': lecturer_upload_job(request)})
 
     @method_decorator(login_required)
     def post(self, request):
-        form = UploadFileForm(request.POST, request.FILES)
+        form = UploadResultForm(request.POST, request.FILES)
         if form.is_valid():
             file = request.FILES['file']
             
             try:
-                if file.name.endswith('.csv'):
-                    df = pd.read_csv(file)
-                elif file.name.endswith(('.xls', '.xlsx')):
-                    df = pd.read_excel(file)
-                else:
+                if not file.name.endswith(UPLOAD_EXTENSIONS):
                     messages.error(request, "Invalid file format. Upload CSV or Excel file.")
                     return redirect('cod-load-result')
 
+                # Stream the sheet in bounded chunks instead of loading it whole
+                reader = UploadReader(file)
+
                 required_columns = {'unit_code', 'reg_no', 'academic_year', 'cat', 'exam'}
-                if not required_columns.issubset(df.columns):
+                if not required_columns.issubset(reader.columns):
                     messages.error(request, "Invalid file format. Ensure all required columns are present.")
                     return redirect('cod-load-result')
 
@@ -1372,104 +1085,66 @@ class COD_LoadResultView(View):
                 if not username:
                     return redirect('login')
 
-                lecturer = get_object_or_404(Lecturer, username=username)
-                lec_no = lecturer.lec_no
-
-                # Process each row
-                for _, row in df.iterrows():
-                    try:
-                        unit_code = row['unit_code'].strip()
-                        reg_no = row['reg_no'].strip()
-                        academic_year_name = row['academic_year'].strip()
-
-                        # Ensure foreign key instances exist
-                        unit = Unit.objects.filter(unit_code=unit_code).first()
-                        if not unit:
-                            messages.error(request, f"Unit '{unit_code}' not found.")
-                            continue
-
-                        student = Student.objects.filter(reg_no=reg_no).first()
-                        if not student:
-                            messages.error(request, f"Student '{reg_no}' not found.")
-                            continue
-
-                        academic_year = AcademicYear.objects.filter(academic_year=academic_year_name).first()
-                        if not academic_year:
-                            messages.error(request, f"Academic year '{academic_year_name}' not found.")
-                            continue
-
-                        # Check lecturer assignment
-                        lecturer_unit = LecturerUnit.objects.filter(
-                            unit_code=unit,
-                            lec_no=lecturer,
-                            academic_year=academic_year
-                        ).first()
-
-                        if not lecturer_unit:
-                            messages.error(request, f"You are not assigned to unit '{unit_code}' for {academic_year_name}.")
-                            continue
-
-                        # Validate and check result entry
-                        try:
-                            cat = int(row['cat'])
-                            exam = int(row['exam'])
-                        except ValueError:
-                            messages.error(request, f"Invalid numeric value for CAT or exam in unit '{unit_code}'.")
-                            continue
-
-                        if not (0 <= cat <= 30):
-                            messages.error(request, f"Invalid CAT mark ({cat}) for student '{reg_no}' in '{unit_code}'. Should be between 0-30.")
-                            continue
-                        if not (0 <= exam <= 70):
-                            messages.error(request, f"Invalid exam mark ({exam}) for student '{reg_no}' in '{unit_code}'. Should be between 0-70.")
-                            continue
-
-                        # Check if result already exists
-                        if Result.objects.filter(unit_code=unit, reg_no=student, academic_year=academic_year).exists():
-                            messages.warning(request, f"Result for {reg_no} in {unit_code} ({academic_year_name}) already exists.")
-                            continue
-
-                        # Save the result
-                        Result.objects.create(
-                            unit_code=unit,
-                            reg_no=student,
-                            academic_year=academic_year,
-                            cat=cat,
-                            exam=exam
-                        )
-
-                    except Exception as e:
-                        messages.error(request, f"Error processing row: {e}")
-                
-                messages.success(request, "Results loaded successfully.")
-                return redirect('cod-load-result')
+                lecturer = request.lecturer_context.get_or_404()
+                # Hand the file to the upload workers; the page polls the job for progress
+                job = enqueue_upload('Result', lecturer, file, form.cleaned_data['replace_existing'])
+                messages.success(request, f"Results queued for processing as job #{job.job_id}.")
+                return redirect(f"{reverse('cod-load-result')}?job={job.job_id}")
 
             except Exception as e:
                 messages.error(request, f"Error processing file: {e}")
         
         return render(request, self.template_name, {'form': form})
 
-class COD_ResultListView(ListView):
+class UploadJobStatusView(View):
+    def get(self, request, job_id):
+        username = request.session.get('username')
+        if not username:
+            return JsonResponse({'error': 'Login required.'}, status=403)
+
+        lecturer = request.lecturer_context.get_or_404()
+        job = get_object_or_404(UploadJob, job_id=job_id, lec_no=lecturer.pk)
+        return JsonResponse({
+            'job_id': job.job_id,
+            'kind': job.kind,
+            'status': job.status,
+            'processed': job.processed,
+            'inserted': job.inserted,
+            'updated': job.updated,
+            'rejected': job.rejected,
+            'peak_memory': job.peak_memory,
+            'error': job.error_message,
+            'error_report_url': reverse('upload-job-errors', args=[job.job_id]) if job.error_report else None,
+        })
+
+class UploadJobErrorReportView(View):
+    def get(self, request, job_id):
+        username = request.session.get('username')
+        if not username:
+            return redirect('login')
+
+        lecturer = request.lecturer_context.get_or_404()
+        job = get_object_or_404(UploadJob, job_id=job_id, lec_no=lecturer.pk)
+        if not job.error_report:
+            raise Http404("This upload has no error report.")
+        return FileResponse(job.error_report.open('rb'), as_attachment=True, filename=f'upload-{job.job_id}-errors.csv')
+
+class COD_ResultListView(ReadReplicaMixin, ResultTotalsMixin, KeysetPaginationMixin, ListView):
+    keyset_ordering = RECORD_ORDERING
     model = Result
     template_name = 'cod_result_list.html'
     context_object_name = 'results'
 
     def get_queryset(self):
-        username = self.request.session.get('username')
-        lecturer = get_object_or_404(Lecturer, username=username)
-
-        # Get unit codes assigned to the lecturer
-        lecturer_units = LecturerUnit.objects.filter(lec_no=lecturer)
+        self.request.lecturer_context.get_or_404()
 
         # Get filter parameters
         academic_year_id = self.request.GET.get('academic_year')
         reg_no = self.request.GET.get('reg_no')
         unit_code = self.request.GET.get('unit_code')
 
-        if academic_year_id:
-            lecturer_units = lecturer_units.filter(academic_year_id=academic_year_id)
-
-        unit_codes = lecturer_units.values_list('unit_code', flat=True)
+        # Get unit codes assigned to the lecturer, for the chosen academic year if any
+        unit_codes = self.request.lecturer_context.unit_codes(academic_year_id)
 
         # Filter results based on lecturer's assigned units
         results = Result.objects.filter(unit_code__in=unit_codes)
@@ -1483,34 +1158,39 @@ class COD_ResultListView(ListView):
         if unit_code:
             results = results.filter(unit_code__unit_code__icontains=unit_code)
 
-        return results
+        # Totals, grade and the ?min_total= / ?grade= filters are evaluated by the database
+        results = self.filter_totals(results)
+
+        # Join the related rows the template prints instead of fetching them one by one
+        return results.select_related('reg_no', 'unit_code', 'academic_year').only(
+            'cat', 'exam', 'reg_no__reg_no', 'unit_code__unit_code', 'academic_year__academic_year'
+        )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["academic_years"] = AcademicYear.objects.all()
+        context["academic_years"] = refdata.academic_years.all()
+        context["grades"] = grade_names()
         return context
 
-class COD_NominalRollListView(ListView):
+class COD_UnitAnalyticsView(ReadReplicaMixin, UnitAnalyticsMixin, View):
+    template_name = 'cod_analytics.html'
+
+class COD_NominalRollListView(ReadReplicaMixin, KeysetPaginationMixin, ListView):
+    keyset_ordering = RECORD_ORDERING
     model = NominalRoll
     template_name = 'cod_nominal_roll_list.html'
     context_object_name = "nominal_rolls"
 
     def get_queryset(self):
-        username = self.request.session.get('username')
-        lecturer = get_object_or_404(Lecturer, username=username)
+        self.request.lecturer_context.get_or_404()
 
         # Get the academic year filter from the request
         academic_year_id = self.request.GET.get('academic_year')
         reg_no = self.request.GET.get('reg_no')
         unit_code = self.request.GET.get('unit_code')
 
-        # Get unit codes assigned to the lecturer in the given academic year
-        lecturer_units = LecturerUnit.objects.filter(lec_no=lecturer)
-
-        if academic_year_id:
-            lecturer_units = lecturer_units.filter(academic_year_id=academic_year_id)
-
-        unit_codes = lecturer_units.values_list('unit_code', flat=True)
+        # Get unit codes assigned to the lecturer, for the chosen academic year if any
+        unit_codes = self.request.lecturer_context.unit_codes(academic_year_id)
 
         # Filter nominal roll based on lecturer's assigned units
         nominal_rolls = NominalRoll.objects.filter(unit_code__in=unit_codes)
@@ -1524,14 +1204,29 @@ class COD_NominalRollListView(ListView):
         if unit_code:
             nominal_rolls = nominal_rolls.filter(unit_code__unit_code__icontains=unit_code)
 
-        return nominal_rolls
+        # Join the related rows the template prints instead of fetching them one by one
+        return nominal_rolls.select_related('reg_no', 'unit_code', 'academic_year').only(
+            'date', 'reg_no__reg_no', 'unit_code__unit_code', 'academic_year__academic_year'
+        )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["academic_years"] = AcademicYear.objects.all()
+        context["academic_years"] = refdata.academic_years.all()
         return context
 
 
+class COD_NominalRollExportView(ExportMixin, COD_NominalRollListView):
+    # The nominal roll as filtered on the page, as CSV or XLSX
+    export_filename = 'nominal-roll'
+    export_ordering = RECORD_ORDERING
+    export_columns = (
+        ('Reg No', 'reg_no'),
+        ('Unit Code', 'unit_code'),
+        ('Academic Year', 'academic_year__academic_year'),
+        ('Date Added', 'date'),
+    )
+
+
 class LecturerOverdueComplaintsView(View):
     def get(self, request):
         # Access the logged-in user's username from the session
@@ -1541,49 +1236,18 @@ class LecturerOverdueComplaintsView(View):
 
         try:
             # Get the COD's department
-            cod_lecturer = Lecturer.objects.get(username=username)
-            department_lecturers = Lecturer.objects.filter(dep_code=cod_lecturer.dep_code)
-
-            # Retrieve units taught by lecturers in the department
-            lecturer_units = LecturerUnit.objects.filter(lec_no__in=department_lecturers)
-            department_unit_codes = lecturer_units.values_list('unit_code', flat=True)
-            department_course_codes = lecturer_units.values_list('course_code', flat=True)
-            department_academic_years = lecturer_units.values_list('academic_year', flat=True)
-
-            # Calculate the time threshold for overdue complaints (more than 24 hours)
-            overdue_threshold = timezone.now() - timedelta(hours=24)
-
-            # Retrieve overdue complaints related to the department's unit codes
-            overdue_complaints = Complaint.objects.filter(
-                date__lt=overdue_threshold,
-                unit_code__in=department_unit_codes,
-                academic_year__in=department_academic_years
-            ).select_related('reg_no', 'academic_year', 'unit_code')  # Optimize with select_related
-
-            # Extract reg_nos, unit codes, and academic years from the overdue complaints
-            reg_nos = overdue_complaints.values_list('reg_no', flat=True)
-            unit_codes = overdue_complaints.values_list('unit_code', flat=True)
-            academic_years = overdue_complaints.values_list('academic_year', flat=True)
-
-            # Get all course codes associated with the students in overdue complaints
-            student_courses = Student.objects.filter(reg_no__in=reg_nos).values_list('course_code', flat=True).distinct()
-
-            # Retrieve lec_no based on unit codes, academic years, and course codes
-            relevant_lecturer_units = LecturerUnit.objects.filter(
-                unit_code__in=unit_codes,
-                academic_year__in=academic_years,
-                course_code__in=student_courses
-            ).values_list('lec_no', flat=True).distinct()
-
-            # Retrieve lecturers with relevant lec_no to the complaints
-            overdue_lecturers = Lecturer.objects.filter(
-                lec_no__in=relevant_lecturer_units
-            ).only('phone_number', 'email_address')
+            cod_lecturer = request.lecturer_context.get()
+
+            # Overdue complaints assigned to lecturers in the department, each paired with those lecturers
+            overdue_complaints = complaints_with_lecturers(
+                with_assignments(Complaint.objects.overdue()).filter(
+                    assignment__lec_no__dep_code=cod_lecturer.dep_code_id
+                )
+            )
 
             # Prepare context data
             context = {
                 'overdue_complaints': overdue_complaints,
-                'overdue_lecturers': overdue_lecturers,
             }
             return render(request, 'lecturer_complaints.html', context)
 
@@ -1599,51 +1263,24 @@ class StudentOverdueComplaintsView(View):
 
         try:
             # Get the COD's department
-            cod_lecturer = Lecturer.objects.get(username=username)
-            department_code = cod_lecturer.dep_code
+            cod_lecturer = request.lecturer_context.get()
+            department_code = request.lecturer_context.department
 
-            # Calculate the time threshold for overdue complaints (more than 24 hours)
-            overdue_threshold = timezone.now() - timedelta(hours=24)
-
-            # Step 1: Query for overdue complaints related to students in the COD's department
-            overdue_complaints = Complaint.objects.filter(
-                reg_no__course_code__dep_code=department_code,
-                date__lt=overdue_threshold
-            ).select_related('reg_no', 'unit_code', 'academic_year')  # Optimize queries
-
-            #lecturer_units = LecturerUnit.objects.all()
-
-           # Extract reg_nos, unit codes, and academic years from the overdue complaints
-            reg_nos = overdue_complaints.values_list('reg_no', flat=True)
-            unit_codes = overdue_complaints.values_list('unit_code', flat=True)
-            academic_years = overdue_complaints.values_list('academic_year', flat=True)
-
-            # Get all course codes associated with the students in overdue complaints
-            student_courses = Student.objects.filter(reg_no__in=reg_nos).values_list('course_code', flat=True).distinct()
-
-            # Retrieve lec_no based on unit codes, academic years, and course codes
-            relevant_lecturer_units = LecturerUnit.objects.filter(
-                unit_code__in=unit_codes,
-                academic_year__in=academic_years,
-                course_code__in=student_courses
-            ).values_list('lec_no', flat=True).distinct()
-
-            # Retrieve lecturers with relevant lec_no to the complaints
-            overdue_lecturers = Lecturer.objects.filter(
-                lec_no__in=relevant_lecturer_units
-            ).only('phone_number', 'email_address')
+            # Overdue complaints from students in the COD's department, each paired with its lecturers
+            overdue_complaints = complaints_with_lecturers(
+                with_assignments(Complaint.objects.overdue().filter(dep_code=department_code))
+            )
 
             # Prepare context data
             context = {
                 'overdue_complaints': overdue_complaints,
-                'overdue_lecturers': overdue_lecturers,
             }
             return render(request, 'overdue_student_complaints.html', context)
 
         except Lecturer.DoesNotExist:
             return render(request, 'overdue_student_complaints.html', {'error': 'Lecturer not found.'})
 
-class ResponsesView(View):
+class ResponsesView(ReadReplicaMixin, View):
     def get(self, request):
         username = request.session.get('username')
         if not username:
@@ -1651,14 +1288,8 @@ class ResponsesView(View):
 
         try:
             # Get the COD's department
-            cod_lecturer = Lecturer.objects.get(username=username)
-            department_code = cod_lecturer.dep_code
-
-            # Query for responses from the lecturers in the COD's department
-            responses = Response.objects.filter(
-                responder__dep_code=department_code
-            ).select_related('reg_no', 'unit_code', 'responder')
-
+            cod_lecturer = request.lecturer_context.get()
+            responses = self.get_queryset()
 
             context = {
                 'responses': responses,
@@ -1668,6 +1299,32 @@ class ResponsesView(View):
         except Lecturer.DoesNotExist:
             return render(request, 'responses.html', {'error': 'Lecturer not found.'})
 
+    def get_queryset(self):
+        self.request.lecturer_context.get_or_404()
+        department_code = self.request.lecturer_context.department
+
+        # Query for responses from the lecturers in the COD's department
+        return Response.objects.filter(
+            responder__dep_code=department_code
+        ).select_related('reg_no', 'unit_code', 'responder')
+
+class ResponsesExportView(ExportMixin, ResponsesView):
+    # The department's responses, as CSV or XLSX
+    export_filename = 'responses'
+    export_ordering = ('date', 'response_id')
+    export_columns = (
+        ('Responder (Lecturer)', Concat('responder__first_name', Value(' '), 'responder__last_name')),
+        ('Email Address', 'responder__email_address'),
+        ('Phone Number', 'responder__phone_number'),
+        ('Response', 'response'),
+        ('Reg No', 'reg_no'),
+        ('Unit Code', 'unit_code'),
+        ('Academic Year', 'academic_year__academic_year'),
+        ('CAT', 'cat'),
+        ('Exam', 'exam'),
+        ('Date', 'date'),
+    )
+
 class StudentResponsesView(View):
     def get(self, request):
         username = request.session.get('username')
@@ -1676,8 +1333,8 @@ class StudentResponsesView(View):
 
         try:
             # Get the COD's lecturer object
-            cod_lecturer = Lecturer.objects.get(username=username)
-            department_code = cod_lecturer.dep_code
+            cod_lecturer = request.lecturer_context.get()
+            department_code = request.lecturer_context.department
 
             # Query responses and loaded results for students in the COD's department
             student_responses = Response.objects.filter(
@@ -1701,8 +1358,8 @@ class LecturerStudentResponsesView(View):
 
         try:
             # Get the COD's lecturer object
-            lecturer = Lecturer.objects.get(username=username)
-            department_code = lecturer.dep_code
+            lecturer = request.lecturer_context.get()
+            department_code = request.lecturer_context.department
 
             # Query responses and loaded results for students in the COD's department
             student_responses = Response.objects.filter(
@@ -1751,18 +1408,19 @@ class ResetPasswordView(View):
                 try:
                     # Generate a unique token
                     token = get_random_string(length=32)
-                    # Save the token to the database
-                    PasswordResetToken.objects.create(username=user, token=token)
                     # Generate the reset link
                     reset_link = request.build_absolute_uri(f'/reset-password/{token}/')
-                    # Send password reset email
-                    send_mail(
-                        'Reset Your Password',
-                        f'Click the link to reset your password: {reset_link}',
-                        settings.EMAIL_HOST_USER,
-                        [user.username],  # Use the username as the email address
-                        fail_silently=False,
-                    )
+                    with transaction.atomic():
+                        # Save the token to the database
+                        reset_token = PasswordResetToken.objects.create(username=user, token=token)
+                        # Queue the password reset email; the send_outbox worker delivers it, unless the
+                        # link has expired by the time it could
+                        enqueue_email(
+                            'Reset Your Password',
+                            f'Click the link to reset your password: {reset_link}',
+                            user.username,  # Use the username as the email address
+                            expires_at=reset_token.expires_at,
+                        )
                     success_message = f"A password reset link has been sent to {user.username}."
                     return render(request, self.template_name, {'form': form, 'success_message': success_message})
                 except Exception as e:
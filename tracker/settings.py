@@ -30,6 +30,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'complaints.middleware.LecturerContextMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -55,12 +56,66 @@ TEMPLATES = [
 WSGI_APPLICATION = 'tracker.wsgi.application'
 
 # Database Configuration
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# SQLite by default. DB_ENGINE=postgresql selects PostgreSQL, configured by DB_NAME, DB_USER, DB_PASSWORD,
+# DB_HOST and DB_PORT; connections are kept open for DB_CONN_MAX_AGE seconds (point DB_HOST/DB_PORT at
+# PgBouncer for pooling across processes). DB_REPLICA_HOST (and DB_REPLICA_PORT) add a read replica.
+# The read-only list views and dashboards read from the 'replica' alias (complaints.routers); with SQLite
+# a second connection to the same file stands in for it. Tests mirror the replica onto the test database
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'tracker'),
+            'USER': os.environ.get('DB_USER', 'tracker'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+        }
+    }
+    if os.environ.get('DB_REPLICA_HOST'):
+        DATABASES['replica'] = dict(
+            DATABASES['default'],
+            HOST=os.environ['DB_REPLICA_HOST'],
+            PORT=os.environ.get('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+            TEST={'MIRROR': 'default'},
+        )
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+        },
+        'replica': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'TEST': {'MIRROR': 'default'},
+        },
     }
+
+DATABASE_ROUTERS = ['complaints.routers.ReplicaRouter']
+
+# SQLite production profile, applied to every new connection. WAL lets readers run alongside a writer;
+# synchronous=NORMAL is durable in WAL mode except for the last commits on power loss; writers wait up
+# to busy_timeout ms for the lock instead of failing with "database is locked"; mmap_size (bytes) and
+# cache_size (negative = KiB) keep hot pages in memory. Long bulk writes go through complaints.db.write_lock
+# and other transactions that read before writing through complaints.db.write_transaction; both start with
+# BEGIN SQLITE_TRANSACTION_MODE: IMMEDIATE takes the write lock (and waits
+# busy_timeout for it) up front, where a plain BEGIN that reads before writing fails at once if another
+# writer committed in between. Other transactions use a plain BEGIN. `manage.py benchmark_sqlite` compares
+# this profile with stock settings
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64000,
 }
+SQLITE_TRANSACTION_MODE = 'IMMEDIATE'
+BULK_WRITE_PAUSE = 0.2
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -74,7 +129,8 @@ AUTH_PASSWORD_VALIDATORS = [
 #AUTH_USER_MODEL = 'users.CustomUser'  # Uncomment this line to use your custom user model
 
 # Email settings
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+# Set EMAIL_BACKEND to e.g. django.core.mail.backends.console.EmailBackend to try the outbox without SMTP
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
@@ -98,6 +154,90 @@ STATICFILES_DIRS = [APP_STATIC_ROOT]
 # Absolute filesystem path to the directory that will hold collected static files.
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
+# The default cache is local to each process. Versions that other processes must see (a lecturer's
+# identity, bumped when the Lecturer row is saved, the dashboard version, bumped by complaint, response and
+# assignment changes, and the result analytics version, bumped by uploads in the worker) live in the "shared" cache, a table in the main database unless SHARED_CACHE_BACKEND/SHARED_CACHE_LOCATION point it at e.g. Redis or Memcached
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': os.environ.get('SHARED_CACHE_BACKEND', 'django.core.cache.backends.db.DatabaseCache'),
+        'LOCATION': os.environ.get('SHARED_CACHE_LOCATION', 'complaints_shared_cache'),
+        'TIMEOUT': None,
+    },
+}
+
+# Seconds a worker keeps its in-memory copy of Unit, AcademicYear, Course and Department before
+# re-reading them; edits made in the same process invalidate the copy immediately
+REFERENCE_DATA_TTL = 300
+
+# Seconds dashboard counts are cached for, per department and per lecturer. Saving or deleting a
+# complaint, response or unit assignment invalidates them straight away
+DASHBOARD_DEPARTMENT_CACHE_TTL = 300
+DASHBOARD_LECTURER_CACHE_TTL = 60
+
+# Grade for a result's total (CAT + exam): each band is (grade, lowest total), and a total gets the best
+# band it reaches. Adjust to the senate's grading regulations
+RESULT_GRADE_BANDS = [
+    ('A', 70),
+    ('B', 60),
+    ('C', 50),
+    ('D', 40),
+    ('E', 35),
+    ('Supplementary', 30),
+    ('Fail', 0),
+]
+
+# Lowest total counted as a pass in the unit analytics
+RESULT_PASS_MARK = 40
+
+# Unit analytics are cached until the next result upload or edit, and for at most ANALYTICS_CACHE_TTL
+# seconds (None for no limit). Results further than ANALYTICS_OUTLIER_Z standard deviations from their unit's mean are flagged,
+# and at most ANALYTICS_FLAGGED_ROWS flagged results are listed
+ANALYTICS_CACHE_TTL = 3600
+ANALYTICS_OUTLIER_Z = 3
+ANALYTICS_FLAGGED_ROWS = 200
+
+# Rows per page on the complaint, result and nominal roll lists; ?page_size= may ask for up to the maximum
+LIST_PAGE_SIZE = 50
+LIST_PAGE_SIZE_MAX = 500
+
+# Complaint and response codes each process reserves from the database at a time
+CODE_BLOCK_SIZE = 100
+
+# Sessions live in a signed cookie by default, so reading one costs no database or cache round trip.
+# Set SESSION_ENGINE (e.g. django.contrib.sessions.backends.cache or .db) to keep them server-side
+SESSION_ENGINE = os.environ.get('SESSION_ENGINE', 'django.contrib.sessions.backends.signed_cookies')
+
+# Seconds the lecturer identity cached in the session is trusted without any lookup. After that, one read
+# of the "shared" cache tells whether the Lecturer row was saved since, and only then is it reloaded,
+# so a role or department change reaches signed-in lecturers within this many seconds
+LECTURER_IDENTITY_TTL = 300
+
+# Outgoing mail is queued in OutboxMessage and delivered by `manage.py send_outbox`. A failed message
+# is retried after OUTBOX_RETRY_BASE_DELAY seconds, doubling each time, up to OUTBOX_MAX_ATTEMPTS tries;
+# a password reset email is not retried past its link's 5-minute lifetime.
+# A claimed batch that is not finished within OUTBOX_LEASE seconds (sender crashed) becomes due again.
+# OUTBOX_SEND_RATE caps messages per second per sender so bulk mail stays under the SMTP relay's limits (0 = no cap)
+OUTBOX_BATCH_SIZE = 50
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_RETRY_BASE_DELAY = 30
+OUTBOX_LEASE = 300
+OUTBOX_SEND_RATE = 5
+
+# An upload still Running UPLOAD_JOB_LEASE seconds after a worker claimed it is taken to have died with
+# its worker: it goes back to Pending, or is marked Failed after UPLOAD_JOB_MAX_ATTEMPTS claims. Uploaded
+# sheets and skipped-row reports are deleted UPLOAD_RETENTION_DAYS after their job finishes
+UPLOAD_JOB_LEASE = 3600
+UPLOAD_JOB_MAX_ATTEMPTS = 2
+UPLOAD_RETENTION_DAYS = 30
+
+# Uploaded nominal roll / result sheets and their error reports, kept until the upload workers
+# (`python manage.py process_uploads`) have processed them
+MEDIA_URL = '/media/'
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'